@@ -0,0 +1,25 @@
+import msgpack
+import numpy as np
+import pytest
+import xarray as xr
+
+from bioimageio.workflows.server._utils import decode_xarray, encode_xarray
+
+
+def _roundtrip(tensor: xr.DataArray) -> xr.DataArray:
+    encoded = encode_xarray(tensor)
+    data = encoded["data"]
+    packed = msgpack.packb(
+        {**encoded, "data": data.tobytes(), "dtype": data.dtype.str, "shape": data.shape}, use_bin_type=True
+    )
+    unpacked = msgpack.unpackb(packed, raw=False)
+    unpacked["data"] = np.frombuffer(unpacked["data"], dtype=unpacked["dtype"]).reshape(unpacked["shape"])
+    return decode_xarray(unpacked)
+
+
+@pytest.mark.parametrize("size", [256, 2048])
+@pytest.mark.parametrize("dtype", ["uint8", "float32"])
+def bench_xarray_codec(measure, size, dtype):
+    tensor = xr.DataArray(np.ones((1, 1, size, size), dtype=dtype), dims=tuple("bcyx"), attrs={"name": "raw"})
+    out = measure(_roundtrip, tensor, n_elements=tensor.size)
+    assert out.shape == tensor.shape
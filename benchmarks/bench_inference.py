@@ -0,0 +1,79 @@
+import asyncio
+
+import dask
+import numpy as np
+import pytest
+import xarray as xr
+
+
+@pytest.mark.parametrize("size", [512, 2048])
+@pytest.mark.parametrize("tile", [128, 512])
+@pytest.mark.parametrize(
+    "scheduler,num_workers", [("synchronous", 1), ("threads", 1), ("threads", 4), ("processes", 4)]
+)
+def bench_inference_with_dask(measure, identity_model_rdf, identity_model_adapter, size, tile, scheduler, num_workers):
+    from bioimageio.workflows.envs.default import inference_with_dask
+
+    tensor = xr.DataArray(np.random.rand(1, 1, size, size).astype("float32"), dims=tuple("bcyx"))
+
+    def run():
+        outputs = asyncio.run(
+            inference_with_dask(
+                identity_model_rdf,
+                [tensor],
+                enable_preprocessing=False,
+                enable_postprocessing=False,
+                tiles=[dict(b=1, c=1, y=tile, x=tile)],
+                scheduler=scheduler,
+                num_workers=num_workers,
+            )
+        )
+        return outputs["output"].data
+
+    # forked worker processes inherit the patched identity model adapter
+    with dask.config.set({"multiprocessing.context": "fork"}):
+        out = measure(run, n_elements=tensor.size)
+
+    assert out.shape == tensor.shape
+
+
+@pytest.mark.parametrize("fuse_tiles", [True, False])
+def bench_inference_with_dask_many_tiles(measure, identity_model_rdf, identity_model_adapter, fuse_tiles):
+    from bioimageio.workflows.envs.default import inference_with_dask
+
+    tensor = xr.DataArray(np.random.rand(1, 1, 4096, 4096).astype("float32"), dims=tuple("bcyx"))
+
+    def run():
+        outputs = asyncio.run(
+            inference_with_dask(
+                identity_model_rdf,
+                [tensor],
+                enable_preprocessing=False,
+                enable_postprocessing=False,
+                tiles=[dict(b=1, c=1, y=64, x=64)],
+                scheduler="threads",
+                fuse_tiles=fuse_tiles,
+            )
+        )
+        return outputs["output"].data
+
+    out = measure(run, n_elements=tensor.size)
+    assert out.shape == tensor.shape
+
+
+@pytest.mark.parametrize("size", [512, 2048, 4096])
+@pytest.mark.parametrize("engine", ["inference_tiled", "inference_with_dask"])
+def bench_inference_tiled(measure, identity_model_rdf, identity_model_adapter, size, engine):
+    from bioimageio.workflows.envs.default import inference_tiled, inference_with_dask
+
+    tensor = xr.DataArray(np.random.rand(1, 1, size, size).astype("float32"), dims=tuple("bcyx"))
+    kwargs = dict(enable_preprocessing=False, enable_postprocessing=False, tiles=[dict(b=1, c=1, y=256, x=256)])
+    if engine == "inference_with_dask":
+        kwargs["scheduler"] = "threads"
+
+    def run():
+        workflow = inference_tiled if engine == "inference_tiled" else inference_with_dask
+        return asyncio.run(workflow(identity_model_rdf, [tensor], **kwargs))["output"].data
+
+    out = measure(run, n_elements=tensor.size)
+    assert out.shape == tensor.shape
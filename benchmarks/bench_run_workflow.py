@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+import xarray as xr
+
+pytest.importorskip("bioimageio.spec.workflow")
+
+
+@pytest.fixture(scope="module")
+def elementwise_workflow_rdf():
+    tensor = dict(type="tensor", axes=[dict(type="space", name="y"), dict(type="space", name="x")])
+    return dict(
+        format_version="0.2.3",
+        type="workflow",
+        id="bioimageio/elementwise_benchmark",
+        name="elementwise benchmark",
+        description="fused chain of elementwise operators",
+        authors=[{"name": "bioimage.io"}],
+        cite=[{"text": "BioImage.IO", "url": "https://doi.org/10.1101/2022.06.07.495102"}],
+        license="MIT",
+        inputs=[dict(name="raw", **tensor)],
+        options=[],
+        outputs=[dict(name="mask", **tensor)],
+        steps=[
+            dict(op="scale_linear", options=dict(gain=2.0, offset=-1.0)),
+            dict(op="binarize", options=dict(threshold=0.2)),
+            dict(op="cast", options=dict(dtype="uint8")),
+        ],
+    )
+
+
+@pytest.mark.parametrize("size", [1024, 4096])
+def bench_run_workflow(measure, elementwise_workflow_rdf, size):
+    from bioimageio.workflows.operators import run_workflow
+
+    raw = xr.DataArray(np.random.rand(size, size).astype("float32"), dims=("y", "x"))
+    outputs = measure(run_workflow, elementwise_workflow_rdf, inputs=[raw], n_elements=raw.size)
+    assert outputs["mask"].shape == raw.shape
+
+
+@pytest.mark.parametrize("compiled", [False, True])
+def bench_run_workflow_overhead(benchmark, elementwise_workflow_rdf, compiled):
+    """per-run overhead for small inputs, e.g. of a service running the same workflow many times"""
+    from bioimageio.workflows.operators import compile_workflow, run_workflow
+
+    workflow = compile_workflow(elementwise_workflow_rdf) if compiled else elementwise_workflow_rdf
+    raw = xr.DataArray(np.random.rand(16, 16).astype("float32"), dims=("y", "x"))
+    outputs = benchmark(run_workflow, workflow, inputs=[raw])
+    assert outputs["mask"].shape == raw.shape
@@ -0,0 +1,43 @@
+from bioimageio.spec import load_raw_resource_description
+from bioimageio.workflows.utils import get_chunk, get_corrected_chunks, get_output_rois, get_tile_grid
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize("size", [1024, 16384])
+@pytest.mark.parametrize("tile", [64, 512])
+def bench_tiling_helpers(measure, identity_model_rdf, size, tile):
+    model = load_raw_resource_description(identity_model_rdf)
+    ipt = model.inputs[0]
+    tensor = np.empty((1, 1, size, size), dtype="uint8")
+
+    def run():
+        chunk, overlap, padding = get_chunk(dict(b=1, c=1, y=tile, x=tile), ipt, model.outputs, tensor)
+        output_tile_roi, output_roi = get_output_rois(
+            model.outputs[0],
+            input_overlaps={ipt.name: overlap},
+            input_paddings={ipt.name: padding},
+            ipt_by_name={ipt.name: ipt},
+        )
+        n_chunks = [-(-s // chunk[a]) for s, a in zip(tensor.shape, ipt.axes)]
+        chunks = tuple((chunk[a] + 2 * overlap[i],) * n for i, (a, n) in enumerate(zip(ipt.axes, n_chunks)))
+        return get_corrected_chunks(dict(enumerate(chunks)), [sum(c) for c in chunks], output_roi)
+
+    measure(run)
+
+
+@pytest.mark.parametrize("n_tiles", [256, 2048])
+def bench_tile_grid(measure, n_tiles):
+    def run():
+        get_tile_grid.cache_clear()
+        grid = get_tile_grid(
+            (1, 1, n_tiles * 56 + 8, n_tiles * 56 + 8),
+            (1, 1, 64, 64),
+            (1, 1, 56, 56),
+            (0, 1, 2, 3),
+            (1, 1, 56, 56),
+            ((0, 0), (0, 0), (0, 3), (0, 5)),
+        )
+        return grid.input_slices(), grid.output_slices()
+
+    measure(run)
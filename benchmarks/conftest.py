@@ -0,0 +1,102 @@
+import os
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pytest
+import yaml
+
+os.environ["BIOIMAGEIO_COUNT_RDF_DOWNLOADS"] = "false"
+
+_extra_infos: List[Tuple[str, Dict[str, Any]]] = []
+
+
+class IdentityModelAdapter:
+    """stand-in for a model adapter that returns its first input; isolates the workflow overhead from the model"""
+
+    def __init__(self, bioimageio_model, devices=None):
+        self.bioimageio_model = bioimageio_model
+
+    def forward(self, *tensors):
+        return [tensors[0]]
+
+
+@pytest.fixture(scope="session")
+def identity_model_rdf(tmp_path_factory) -> Path:
+    """local model RDF of an (identity) model with a halo of 8 and tiles of multiples of 32"""
+    root = tmp_path_factory.mktemp("identity_model")
+    np.save(root / "test_input.npy", np.zeros((1, 1, 64, 64), dtype="float32"))
+    np.save(root / "test_output.npy", np.zeros((1, 1, 64, 64), dtype="float32"))
+    (root / "weights.pt").write_bytes(b"")
+    (root / "README.md").write_text("identity model for benchmarks")
+    tensor = dict(axes="bcyx", data_type="float32", data_range=[-np.inf, np.inf])
+    rdf = dict(
+        format_version="0.4.9",
+        type="model",
+        name="identity",
+        description="identity model for benchmarks",
+        authors=[{"name": "bioimage.io"}],
+        cite=[{"text": "BioImage.IO", "url": "https://doi.org/10.1101/2022.06.07.495102"}],
+        license="MIT",
+        documentation="README.md",
+        timestamp="2023-01-01T00:00:00",
+        test_inputs=["test_input.npy"],
+        test_outputs=["test_output.npy"],
+        inputs=[dict(name="input", shape=dict(min=[1, 1, 32, 32], step=[0, 0, 32, 32]), **tensor)],
+        outputs=[
+            dict(
+                name="output",
+                halo=[0, 0, 8, 8],
+                shape=dict(reference_tensor="input", scale=[1, 1, 1, 1], offset=[0, 0, 0, 0]),
+                **tensor,
+            )
+        ],
+        weights=dict(torchscript=dict(source="weights.pt")),
+    )
+    rdf_path = root / "rdf.yaml"
+    rdf_path.write_text(yaml.safe_dump(rdf))
+    return rdf_path
+
+
+@pytest.fixture
+def identity_model_adapter(monkeypatch):
+    from bioimageio.workflows.envs.default import _inference
+
+    monkeypatch.setattr(_inference, "create_model_adapter", IdentityModelAdapter)
+
+
+@pytest.fixture
+def measure(request, benchmark):
+    """benchmark a function and report its peak (traced) memory and throughput in `benchmark.extra_info`"""
+
+    def run(func: Callable, *args, n_elements: Optional[int] = None, **kwargs):
+        tracemalloc.start()
+        try:
+            func(*args, **kwargs)
+            benchmark.extra_info["peak_memory_mb"] = tracemalloc.get_traced_memory()[1] / 1e6
+        finally:
+            tracemalloc.stop()
+
+        ret = benchmark(func, *args, **kwargs)
+        if n_elements is not None and benchmark.stats is not None:  # no stats with --benchmark-disable
+            benchmark.extra_info["throughput_melements_per_s"] = n_elements / 1e6 / benchmark.stats.stats.mean
+
+        _extra_infos.append((request.node.name, benchmark.extra_info))
+        return ret
+
+    return run
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _extra_infos:
+        return
+
+    terminalreporter.section("peak memory and throughput")
+    width = max(len(name) for name, _ in _extra_infos)
+    terminalreporter.write_line(f"{'Name':<{width}} {'peak memory (MB)':>17} {'throughput (M elements/s)':>26}")
+    for name, info in sorted(_extra_infos):
+        throughput = info.get("throughput_melements_per_s")
+        terminalreporter.write_line(
+            f"{name:<{width}} {info['peak_memory_mb']:>17.1f} {'' if throughput is None else f'{throughput:.1f}':>26}"
+        )
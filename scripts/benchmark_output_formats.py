@@ -0,0 +1,82 @@
+"""compare write throughput and size on disk of output formats for typical workflow outputs"""
+import shutil
+import tempfile
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+
+import dask.array as da
+import numpy as np
+import xarray as xr
+
+from bioimageio.workflows.utils import save_tensor
+
+
+def get_label_map(shape, chunks) -> xr.DataArray:
+    """mostly background with a few hundred labeled square objects"""
+    rng = np.random.default_rng(0)
+    labels = np.zeros(shape, dtype="uint16")
+    for i, (y, x) in enumerate(zip(rng.integers(0, shape[-2] - 32, 300), rng.integers(0, shape[-1] - 32, 300))):
+        labels[..., y : y + rng.integers(8, 32), x : x + rng.integers(8, 32)] = i + 1
+
+    return xr.DataArray(da.from_array(labels, chunks=chunks), dims=("b", "c", "y", "x"))
+
+
+def get_probability_map(shape, chunks) -> xr.DataArray:
+    """smooth float32 probabilities"""
+    y, x = np.meshgrid(np.linspace(0, 20, shape[-2]), np.linspace(0, 20, shape[-1]), indexing="ij")
+    probs = (0.5 + 0.5 * np.sin(y) * np.cos(x)).astype("float32")
+    return xr.DataArray(da.from_array(np.broadcast_to(probs, shape), chunks=chunks), dims=("b", "c", "y", "x"))
+
+
+def get_size(path: Path) -> int:
+    if path.is_dir():
+        return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+    else:
+        return path.stat().st_size
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=4096, help="size of the spatial axes")
+    parser.add_argument("--chunk", type=int, default=512, help="chunk size of the spatial axes")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    shape = (1, 1, args.size, args.size)
+    chunks = (1, 1, args.chunk, args.chunk)
+    formats = [
+        (".npy", {}),
+        (".tif", {}),
+        (".zarr", dict(codec="none")),
+        (".zarr", dict(codec="lz4", compression_level=5)),
+        (".zarr", dict(codec="zstd", compression_level=3)),
+        (".zarr", dict(codec="zstd", compression_level=9)),
+    ]
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        for name, tensor in [
+            ("labels", get_label_map(shape, chunks)),
+            ("probabilities", get_probability_map(shape, chunks)),
+        ]:
+            nbytes = tensor.nbytes
+            print(f"{name} ({tensor.dtype}, {nbytes / 1e6:.0f} MB)")
+            for suffix, kwargs in formats:
+                path = tmp / f"{name}{suffix}"
+                durations = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    save_tensor(path, tensor, **kwargs)
+                    durations.append(time.perf_counter() - start)
+
+                label = suffix + "".join(f" {v}" for v in kwargs.values())
+                print(
+                    f"  {label:<16} {nbytes / 1e6 / min(durations):8.0f} MB/s"
+                    f" {get_size(path) / 1e6:10.2f} MB on disk ({nbytes / get_size(path):7.1f}x)"
+                )
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import json
+import sys
+from argparse import ArgumentParser
+
+from bioimageio.workflows.utils._env_manifest import ENV_MANIFESTS, ENVS, generate_env_manifest, save_env_manifest
+
+
+ENV_NAMES = sorted(d.name for d in ENVS.iterdir() if (d / "local.py").exists())
+
+
+def parse_args():
+    p = ArgumentParser(description="Generate manifests of the workflow functions of env submodules")
+    p.add_argument(
+        "env_names",
+        nargs="*",
+        metavar="env_name",
+        help=f"env submodules to generate manifests for (default: all of {', '.join(ENV_NAMES)})",
+    )
+    p.add_argument(
+        "--verify", action="store_true", help="raise error if generating would change any existing (or missing) file."
+    )
+
+    args = p.parse_args()
+    unknown = set(args.env_names) - set(ENV_NAMES)
+    if unknown:
+        p.error(f"unknown env names {unknown}")
+
+    return args
+
+
+def main(env_names, verify: bool):
+    for env_name in env_names or ENV_NAMES:
+        if verify:
+            path = ENV_MANIFESTS / f"{env_name}.json"
+            if not path.exists():
+                raise RuntimeError(f"Missing {path}.")
+
+            with path.open(encoding="utf-8") as f:
+                if json.load(f) != generate_env_manifest(env_name):
+                    raise RuntimeError(f"Existing {path} differs from generated manifest.")
+        else:
+            print(f"saved {save_env_manifest(env_name)}")
+
+    print("done")
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    sys.exit(main(args.env_names, args.verify))
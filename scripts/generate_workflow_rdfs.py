@@ -1,11 +1,13 @@
-import collections.abc
-import inspect
+import ast
+import builtins
+import hashlib
+import importlib.util
+import json
 import sys
-import types
 import typing
-import warnings
 from argparse import ArgumentParser
-from importlib import import_module
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
 
 import docstring_parser
@@ -13,9 +15,9 @@ import numpy as np
 import xarray as xr
 from marshmallow import missing
 from marshmallow.utils import _Missing
+from packaging.version import Version
 
 import bioimageio.spec.workflow.schema as wf_schema
-import bioimageio.workflows.envs
 from bioimageio.spec import load_raw_resource_description, serialize_raw_resource_description_to_dict
 from bioimageio.spec.shared import field_validators, fields, yaml
 from bioimageio.spec.workflow.raw_nodes import (
@@ -27,16 +29,37 @@ from bioimageio.spec.workflow.raw_nodes import (
     UnknownAxes,
     Workflow as WorkflowRawNode,
 )
-from bioimageio.workflows import CURRENT_VERSION
 
 try:
-    from typing import Literal, get_args, get_origin
+    from typing import get_args
 except ImportError:
-    from typing_extensions import Literal, get_args, get_origin
+    from typing_extensions import get_args
 
+SRC = Path(__file__).parent / "../src/bioimageio/workflows"
+DIST = SRC / "static/workflow_rdfs"
+ENVS = SRC / "envs"
+# hashes of the sources and generated RDFs of all workflows to skip unchanged ones
+HASHES_PATH = Path(__file__).parent / "workflow_rdf_hashes.json"
+ENV_MANIFEST_PY = SRC / "utils/_env_manifest.py"
+# read the version without importing bioimageio.workflows (and its env submodules)
+CURRENT_VERSION = Version(json.loads((SRC / "VERSION").read_text())["version"])
+
+
+def _import_env_manifest_module():
+    """import the AST helpers shared with the env manifests without importing bioimageio.workflows"""
+    module_spec = importlib.util.spec_from_file_location("bioimageio_workflows_env_manifest", ENV_MANIFEST_PY)
+    assert module_spec is not None and module_spec.loader is not None
+    module = importlib.util.module_from_spec(module_spec)
+    sys.modules[module_spec.name] = module
+    module_spec.loader.exec_module(module)
+    return module
+
+
+_env_manifest = _import_env_manifest_module()
 
 TYPE_NAME_MAP = {**TYPE_NAMES, **{xr.DataArray: "tensor", np.ndarray: "tensor"}}
 UNKNOWN_AXES = get_args(UnknownAxes)
+TUPLE_NAMES = ("Tuple", "tuple")  # return annotations of several outputs
 
 # keep this axes_field in sync with wf_schema.Workflow.axes
 axes_field = fields.Union(
@@ -49,41 +72,153 @@ axes_field = fields.Union(
 )
 
 
-def get_type_name(annotation):
-    orig = get_origin(annotation)
-    if orig is list or orig is tuple or orig is collections.abc.Sequence:
-        annotation = list
-    elif orig is dict or orig is collections.OrderedDict:
-        annotation = dict
-    elif orig is typing.Union:
-        args = get_args(annotation)
-        args = [a for a in args if a is not type(None)]
-        assert args
-        annotation = get_type_name(args[0])  # use first type in union annotation
-    elif orig is Literal:
-        args = get_args(annotation)
-        assert args
-        annotation = get_type_name(type(args[0]))  # use type of first literal
-
-    if isinstance(annotation, str):
-        assert annotation in TYPE_NAME_MAP.values(), annotation
-        return annotation
+def get_type_name(annotation: ast.expr, aliases: typing.Dict[str, ast.expr]) -> str:
+    """workflow type name of an annotation (given as AST); `aliases` are module level type aliases"""
+    if isinstance(annotation, ast.Constant) and isinstance(annotation.value, str):
+        annotation = ast.parse(annotation.value, mode="eval").body  # forward reference
+
+    if isinstance(annotation, ast.Subscript):
+        orig = _env_manifest.get_name(annotation.value)
+        args = _env_manifest.get_subscript_args(annotation)
+        if orig in _env_manifest.SEQUENCE_NAMES:
+            return TYPE_NAME_MAP[list]
+        elif orig in _env_manifest.MAPPING_NAMES:
+            return TYPE_NAME_MAP[dict]
+        elif orig in ("Optional", "Union"):
+            args = [a for a in args if not (isinstance(a, ast.Constant) and a.value is None)]
+            assert args
+            return get_type_name(args[0], aliases)  # use first type in union annotation
+        elif orig == "Literal":
+            assert args and isinstance(args[0], ast.Constant)
+            return TYPE_NAME_MAP[type(args[0].value)]  # use type of first literal
+        else:
+            raise NotImplementedError(f"Unsupported annotation {ast.unparse(annotation)}")
+
+    name = _env_manifest.get_name(annotation)
+    if name is None:
+        raise TypeError(f"Unsupported annotation {ast.dump(annotation)}")
+    elif name in aliases:
+        return get_type_name(aliases[name], aliases)
+    elif name in _env_manifest.SEQUENCE_NAMES:
+        return TYPE_NAME_MAP[list]
+    elif name in _env_manifest.MAPPING_NAMES:
+        return TYPE_NAME_MAP[dict]
+    elif name == "DataArray":
+        return TYPE_NAME_MAP[xr.DataArray]
+    elif name == "ndarray":
+        return TYPE_NAME_MAP[np.ndarray]
+    elif name in TYPE_NAME_MAP.values():
+        return name
     else:
-        return TYPE_NAME_MAP[annotation]
+        return TYPE_NAME_MAP[getattr(builtins, name)]
 
 
 def parse_args():
-    p = ArgumentParser(description="Generate workflow RDFs for one workflow environment submodule")
-    p.add_argument("env_name", choices=[c for c in dir(bioimageio.workflows.envs) if not c.startswith("_")])
+    p = ArgumentParser(description="Generate workflow RDFs for workflow environment submodules")
+    p.add_argument(
+        "env_names",
+        nargs="+",
+        choices=sorted(d.name for d in ENVS.iterdir() if (d / "local.py").exists()),
+        metavar="env_name",
+    )
+    p.add_argument(
+        "--verify",
+        action="store_true",
+        help="raise error if generating would change any existing (or missing) file, including the hashes file.",
+    )
     p.add_argument(
-        "--verify", action="store_true", help="raise error if generating would change any existing (or missing) file."
+        "--force", action="store_true", help="regenerate all workflow RDFs, including those with unchanged sources."
     )
+    p.add_argument("--jobs", "-j", type=int, default=1, help="number of workflow RDFs to generate in parallel.")
 
     return p.parse_args()
 
 
-class WorkflowSignature(inspect.Signature):
-    pass
+@dataclass
+class Param:
+    name: str
+    type_name: str
+    has_default: bool
+    default: typing.Any = None
+
+
+@dataclass
+class WorkflowSource:
+    """a workflow function as extracted from its source file (without importing its env submodule)"""
+
+    wf_id: str
+    docstring: str
+    params: typing.List[Param]
+    return_type_names: typing.List[str]
+    source_hash: str
+
+
+def _hash(*parts: str) -> str:
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+def _get_params(func: typing.Union[ast.FunctionDef, ast.AsyncFunctionDef], aliases) -> typing.List[Param]:
+    args = func.args
+    positional = args.posonlyargs + args.args
+    defaults: typing.List[typing.Optional[ast.expr]] = [None] * (len(positional) - len(args.defaults))
+    defaults += args.defaults
+    params = []
+    for arg, default in zip(positional + args.kwonlyargs, defaults + args.kw_defaults):
+        if arg.annotation is None:
+            raise ValueError(f"Missing annotation of parameter '{arg.arg}' of workflow '{func.name}'")
+
+        if default is None:
+            params.append(Param(arg.arg, get_type_name(arg.annotation, aliases), has_default=False))
+        else:
+            default_value = ast.literal_eval(default)
+            if isinstance(default_value, tuple):
+                default_value = list(default_value)
+
+            params.append(Param(arg.arg, get_type_name(arg.annotation, aliases), True, default_value))
+
+    return params
+
+
+def get_workflow_sources(env_name: str) -> typing.List[WorkflowSource]:
+    """extract workflow functions imported in an env's 'local.py' from the AST of their modules"""
+    env_dir = ENVS / env_name
+    generator_hash = _hash(
+        Path(__file__).read_text(encoding="utf-8"), ENV_MANIFEST_PY.read_text(encoding="utf-8"), str(CURRENT_VERSION)
+    )
+    import_collector = _env_manifest.ImportCollector()
+    import_collector.visit(ast.parse((env_dir / "local.py").read_text(encoding="utf-8")))
+    wf_ids_by_module: typing.Dict[str, typing.List[str]] = {}
+    for wf_id, module_name in import_collector.imported.items():
+        wf_ids_by_module.setdefault(module_name, []).append(wf_id)
+
+    sources = []
+    for module_name, wf_ids in wf_ids_by_module.items():
+        module_src = (env_dir / f"{module_name}.py").read_text(encoding="utf-8")
+        module = ast.parse(module_src)
+        aliases = _env_manifest.get_aliases(env_dir, module_name)
+        aliases_src = "\n".join(ast.unparse(a) for a in aliases.values())
+        funcs = {node.name: node for node in module.body if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))}
+        for wf_id in wf_ids:
+            func = funcs[wf_id]
+            if func.returns is None:
+                raise ValueError(f"Missing return annotation of workflow '{wf_id}'")
+
+            if isinstance(func.returns, ast.Subscript) and _env_manifest.get_name(func.returns.value) in TUPLE_NAMES:
+                ret_annotations = _env_manifest.get_subscript_args(func.returns)
+            else:
+                ret_annotations = [func.returns]
+
+            sources.append(
+                WorkflowSource(
+                    wf_id=wf_id,
+                    docstring=ast.get_docstring(func, clean=False) or "",
+                    params=_get_params(func, aliases),
+                    return_type_names=[get_type_name(a, aliases) for a in ret_annotations],
+                    source_hash=_hash(generator_hash, aliases_src, ast.get_source_segment(module_src, func) or ""),
+                )
+            )
+
+    return sources
 
 
 def extract_axes_from_param_descr(
@@ -137,109 +272,118 @@ def extract_serialized_wf_kwargs(descr: str) -> typing.Tuple[str, typing.Dict[st
     return descr, kwargs
 
 
-def main(env_name: str, verify: bool):
-    dist = Path(__file__).parent / "../src/bioimageio/workflows/static/workflow_rdfs"
-    if not verify:
-        dist.mkdir(parents=True, exist_ok=True)
-
-    local_submodule = import_module(f"bioimageio.workflows.envs.{env_name}.local")
-    for wf_id in dir(local_submodule):
-        wf_func = getattr(local_submodule, wf_id)
-        if not isinstance(wf_func, types.FunctionType):
-            if not wf_id.startswith("_"):
-                warnings.warn(f"ignoring non-function {wf_id}")
-
-            continue
-
-        doc = docstring_parser.parse(wf_func.__doc__)
-
-        param_descriptions = {param.arg_name: param.description for param in doc.params}
-        inputs = []
-        options = []
-        sig = WorkflowSignature.from_callable(wf_func)
-        assert sig.return_annotation is not inspect.Signature.empty
-        for name, param in sig.parameters.items():
-            type_name = get_type_name(param.annotation)
-            descr = param_descriptions[name]
-            if type_name == "tensor":
-                descr, axes = extract_axes_from_param_descr(descr)
-                if axes is missing:
-                    raise ValueError(
-                        f"Missing axes description in description of parameter '{name}' of workflow '{wf_id}'.\n"
-                        f"Change\n    {name}: <description> \nto \n    {name}: <description>\n        axes: unknown\n"
-                        "or\n"
-                        f"    {name}: <description>\n"
-                        f"        axes:\n"
-                        "        - type: batch\n"
-                        "        - type: channel\n"
-                        "          name: ...\n"
-                        "        ...\n"
-                        f"find format details at: "
-                        "https://github.com/bioimage-io/spec-bioimage-io/blob/gh-pages/workflow_spec_latest.md#inputs:axes"
-                    )
-            else:
-                axes = missing
+def generate_workflow_rdf(wf: WorkflowSource) -> typing.Dict[str, typing.Any]:
+    wf_id = wf.wf_id
+    doc = docstring_parser.parse(wf.docstring)
+
+    param_descriptions = {param.arg_name: param.description for param in doc.params}
+    inputs = []
+    options = []
+    for param in wf.params:
+        name = param.name
+        type_name = param.type_name
+        descr = param_descriptions[name]
+        if type_name == "tensor":
+            descr, axes = extract_axes_from_param_descr(descr)
+            if axes is missing:
+                raise ValueError(
+                    f"Missing axes description in description of parameter '{name}' of workflow '{wf_id}'.\n"
+                    f"Change\n    {name}: <description> \nto \n    {name}: <description>\n        axes: unknown\n"
+                    "or\n"
+                    f"    {name}: <description>\n"
+                    f"        axes:\n"
+                    "        - type: batch\n"
+                    "        - type: channel\n"
+                    "          name: ...\n"
+                    "        ...\n"
+                    f"find format details at: "
+                    "https://github.com/bioimage-io/spec-bioimage-io/blob/gh-pages/workflow_spec_latest.md#inputs:axes"
+                )
+        else:
+            axes = missing
 
-            if param.default is inspect.Parameter.empty:
-                inputs.append(Input(name=name, description=descr, type=type_name, axes=axes))
-            else:
-                default_value: typing.Any = param.default
-                if isinstance(default_value, tuple):
-                    default_value = list(default_value)
-
-                options.append(Option(name=name, description=descr, type=type_name, axes=axes, default=default_value))
-
-        return_descriptions = {}
-        for ret_descr in doc.returns.description.split("\n\n"):
-            name, *remaining = ret_descr.split(".")
-            return_descriptions[name.strip()] = ".".join(remaining).strip()
-
-        outputs = []
-        ret_annotations = sig.return_annotation
-        ret_annotations_orig = get_origin(ret_annotations)
-        if ret_annotations_orig in (typing.Tuple, tuple):
-            ret_annotations = get_args(ret_annotations)
+        if param.has_default:
+            options.append(Option(name=name, description=descr, type=type_name, axes=axes, default=param.default))
         else:
-            ret_annotations = [ret_annotations]
+            inputs.append(Input(name=name, description=descr, type=type_name, axes=axes))
 
-        if len(return_descriptions) != len(ret_annotations):
-            raise ValueError("number of documented return values does not match return annotation")
+    return_descriptions = {}
+    for ret_descr in doc.returns.description.split("\n\n"):
+        name, *remaining = ret_descr.split(".")
+        return_descriptions[name.strip()] = ".".join(remaining).strip()
 
-        for ret_type, (name, descr) in zip(ret_annotations, return_descriptions.items()):
-            type_name = get_type_name(ret_type)
-            if type_name == "tensor":
-                descr, axes = extract_axes_from_param_descr(descr)
-            else:
-                axes = missing
-
-            assert descr
-            outputs.append(Output(name=name, description=descr, type=type_name, axes=axes))
-
-        assert doc.long_description is not None
-        description, serialized_kwargs = extract_serialized_wf_kwargs(doc.long_description)
-        wf = WorkflowRawNode(
-            name=doc.short_description,
-            description=description,
-            inputs=inputs,
-            options=options,
-            outputs=outputs,
-            version=CURRENT_VERSION,
-            id=f"bioimageio/{wf_id}",
-            license="MIT",
-            rdf_source=f"https://raw.githubusercontent.com/bioimage-io/workflows-bioimage-io-python/main/src/bioimageio/workflows/static/workflow_rdfs/{wf_id}.yaml",
-            tags=["workflow"],
-            icon="⚙",
-        )
-        serialized = serialize_raw_resource_description_to_dict(wf)
-        serialized.update(serialized_kwargs)
-
-        # round trip to ensure we will load the same workflow that we saved
-        wf = load_raw_resource_description(serialized)
-        serialized2 = serialize_raw_resource_description_to_dict(wf)
-        assert serialized == serialized2
-
-        path = (dist / wf_id).with_suffix(".yaml").resolve()
+    if len(return_descriptions) != len(wf.return_type_names):
+        raise ValueError("number of documented return values does not match return annotation")
+
+    outputs = []
+    for type_name, (name, descr) in zip(wf.return_type_names, return_descriptions.items()):
+        if type_name == "tensor":
+            descr, axes = extract_axes_from_param_descr(descr)
+        else:
+            axes = missing
+
+        assert descr
+        outputs.append(Output(name=name, description=descr, type=type_name, axes=axes))
+
+    assert doc.long_description is not None
+    description, serialized_kwargs = extract_serialized_wf_kwargs(doc.long_description)
+    wf_node = WorkflowRawNode(
+        name=doc.short_description,
+        description=description,
+        inputs=inputs,
+        options=options,
+        outputs=outputs,
+        version=CURRENT_VERSION,
+        id=f"bioimageio/{wf_id}",
+        license="MIT",
+        rdf_source=f"https://raw.githubusercontent.com/bioimage-io/workflows-bioimage-io-python/main/src/bioimageio/workflows/static/workflow_rdfs/{wf_id}.yaml",
+        tags=["workflow"],
+        icon="⚙",
+    )
+    serialized = serialize_raw_resource_description_to_dict(wf_node)
+    serialized.update(serialized_kwargs)
+
+    # round trip to ensure we will load the same workflow that we saved
+    wf_node = load_raw_resource_description(serialized)
+    serialized2 = serialize_raw_resource_description_to_dict(wf_node)
+    assert serialized == serialized2
+    return serialized
+
+
+def _file_hash(path: Path) -> typing.Optional[str]:
+    return hashlib.sha256(path.read_bytes()).hexdigest() if path.exists() else None
+
+
+def main(env_names: typing.Sequence[str], verify: bool, force: bool = False, jobs: int = 1):
+    if not verify:
+        DIST.mkdir(parents=True, exist_ok=True)
+
+    hashes: typing.Dict[str, typing.Dict[str, str]] = (
+        json.loads(HASHES_PATH.read_text()) if HASHES_PATH.exists() else {}
+    )
+    wf_sources = [wf for env_name in env_names for wf in get_workflow_sources(env_name)]
+    # skip workflows whose source and generated RDF did not change since the last generation (verify all)
+    changed = [
+        wf
+        for wf in wf_sources
+        if force
+        or verify
+        or hashes.get(wf.wf_id, {}).get("source") != wf.source_hash
+        or hashes.get(wf.wf_id, {}).get("rdf") != _file_hash((DIST / wf.wf_id).with_suffix(".yaml"))
+    ]
+    print(f"generating {len(changed)} of {len(wf_sources)} workflow RDFs ({len(wf_sources) - len(changed)} unchanged)")
+    if jobs > 1 and len(changed) > 1:
+        with ProcessPoolExecutor(min(jobs, len(changed))) as executor:
+            generated = list(executor.map(generate_workflow_rdf, changed))
+    else:
+        generated = [generate_workflow_rdf(wf) for wf in changed]
+
+    for wf, serialized in zip(changed, generated):
+        path = (DIST / wf.wf_id).with_suffix(".yaml").resolve()
         if verify:
+            if not path.exists():
+                raise RuntimeError(f"Missing {path}.")
+
             with path.open("r", encoding="utf-8") as f:
                 existing = yaml.load(f)
 
@@ -249,16 +393,22 @@ def main(env_name: str, verify: bool):
             with path.open("w", encoding="utf-8") as f:
                 yaml.dump(serialized, f)
 
+            with path.with_suffix(".json").open("w", encoding="utf-8") as f:
+                json.dump(serialized, f, ensure_ascii=False, indent=4, sort_keys=True)
+
             print(f"saved {path}")
 
-        import json
+        hashes[wf.wf_id] = {"source": wf.source_hash, "rdf": _file_hash(path)}
 
-        with path.with_suffix(".json").open("w", encoding="utf-8") as f:
-            json.dump(serialized, f, ensure_ascii=False, indent=4, sort_keys=True)
+    hashes_text = json.dumps(hashes, indent=2, sort_keys=True) + "\n"
+    if not verify:
+        HASHES_PATH.write_text(hashes_text)
+    elif not HASHES_PATH.exists() or HASHES_PATH.read_text() != hashes_text:
+        raise RuntimeError(f"Stale {HASHES_PATH.resolve()}; rerun without --verify and commit it.")
 
     print("done")
 
 
 if __name__ == "__main__":
     args = parse_args()
-    sys.exit(main(args.env_name, args.verify))
+    sys.exit(main(args.env_names, args.verify, args.force, args.jobs))
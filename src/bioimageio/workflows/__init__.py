@@ -1,3 +1,3 @@
 from ._v import CURRENT_VERSION, Version, __version__
-from .envs.default import hello, inference_with_dask
+from .envs.default import hello, inference_tiled, inference_with_dask
 from .envs.stardist import stardist_prediction_2d
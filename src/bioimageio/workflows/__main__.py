@@ -1,3 +1,4 @@
+import contextlib
 import json
 import warnings
 from argparse import ArgumentDefaultsHelpFormatter, ArgumentParser
@@ -7,12 +8,19 @@ from typing import Optional, Union
 import typer
 from bioimageio.core import load_resource_description
 from bioimageio.core.__main__ import app, help_version as help_version_core
-from bioimageio.core.image_helper import load_image, save_image
+from bioimageio.core.image_helper import load_image
 from bioimageio.core.resource_io.nodes import ResourceDescription, Workflow
 from bioimageio.spec.workflow.raw_nodes import Input, Option, TYPE_NAME_TYPES
 
 from bioimageio.workflows import __version__
 from bioimageio.workflows.operators import run_workflow as run_workflow_op
+from bioimageio.workflows.utils import (
+    DaskProgress,
+    TqdmProgressCallback,
+    load_cached_raw_resource_description,
+    progress_scope,
+    save_tensor,
+)
 
 try:
     from typing import get_args
@@ -45,6 +53,10 @@ def run_workflow(
     *,
     output_folder: Path = Path("outputs"),
     output_tensor_extension: str = ".npy",
+    output_codec: Optional[str] = None,
+    output_compression_level: int = 5,
+    output_chunks: Optional[str] = None,
+    no_progress: bool = False,
     help: bool = typer.Option(False, "--help", "-h"),
     ctx: typer.Context,
 ):
@@ -55,7 +67,9 @@ def run_workflow(
     else:
         with warnings.catch_warnings():
             warnings.simplefilter("ignore")  # ignore warnings for loading workflow as we do not develop the wf here.
-            wf = load_resource_description(workflow_rdf)
+            wf = load_resource_description(
+                load_cached_raw_resource_description(workflow_rdf, update_to_format="latest")
+            )
 
         if not isinstance(wf, Workflow):
             type_ = wf.type if wf.type != "workflow" else type(wf)
@@ -82,9 +96,37 @@ def run_workflow(
     group.add_argument(
         "--output-tensor-extension",
         dest="output_tensor_extension",
-        help="Determines how to save output tensors.",
+        help="Determines how to save output tensors. "
+        "Lazy outputs are written block by block in parallel to '.zarr', '.npy' and (tiled) '.tif' files.",
         default=".npy",
     )
+    group.add_argument(
+        "--output-codec",
+        dest="output_codec",
+        help="Compression codec for '.zarr' outputs: 'none' or a blosc codec ('zstd', 'lz4', 'lz4hc', 'blosclz', "
+        "'zlib'). Defaults to zarr's default compressor.",
+        default=None,
+    )
+    group.add_argument(
+        "--output-compression-level",
+        dest="output_compression_level",
+        help="Compression level (1-9) of '--output-codec'.",
+        type=int,
+        default=5,
+    )
+    group.add_argument(
+        "--output-chunks",
+        dest="output_chunks",
+        help="Comma separated chunk shape of '.zarr' outputs, e.g. '1,1,512,512'. Defaults to the chunks of lazy "
+        "outputs.",
+        default=None,
+    )
+    group.add_argument(
+        "--no-progress",
+        dest="no_progress",
+        help="Do not show progress bars of workflow steps, tiles and computed outputs (with throughput and ETA).",
+        action="store_true",
+    )
 
     def add_param_args(params, group):
         for param in params:
@@ -123,9 +165,24 @@ def run_workflow(
         add_param_args(wf.inputs, parser.add_argument_group(f"inputs of '{wf_name}'"))
         add_param_args(wf.options, parser.add_argument_group(f"options of '{wf_name}'"))
 
-    given_args = ["--output-folder", str(output_folder), "--output-tensor-extension", output_tensor_extension] + list(
-        ctx.args
-    )
+    given_args = [
+        "--output-folder",
+        str(output_folder),
+        "--output-tensor-extension",
+        output_tensor_extension,
+        "--output-compression-level",
+        str(output_compression_level),
+    ]
+    if output_codec is not None:
+        given_args += ["--output-codec", output_codec]
+
+    if output_chunks is not None:
+        given_args += ["--output-chunks", output_chunks]
+
+    if no_progress:
+        given_args.append("--no-progress")
+
+    given_args += list(ctx.args)
     if help:
         given_args.append("--help")
 
@@ -133,20 +190,34 @@ def run_workflow(
         given_args.insert(0, workflow_rdf)
 
     args = parser.parse_args(given_args)
-    outputs = run_workflow_op(
-        workflow_rdf,
-        inputs=[prepare_parameter(getattr(args, ipt.name), ipt) for ipt in wf.inputs],
-        options={opt.name: prepare_parameter(getattr(args, opt.name), opt) for opt in wf.options},
-    )
-    output_folder.mkdir(parents=True, exist_ok=True)
-    for out_spec, (name, out) in zip(wf.outputs, outputs.items()):
-        assert out_spec.name == name
-        out_path = output_folder / name
-        if out_spec.type == "tensor":
-            save_image(out_path.with_suffix(output_tensor_extension), out)
-        else:
-            with out_path.with_suffix(".json").open("w") as f:
-                json.dump(out, f)
+    with contextlib.ExitStack() as stack:
+        if not args.no_progress:
+            progress_callback = TqdmProgressCallback()
+            stack.callback(progress_callback.close)
+            stack.enter_context(progress_scope(progress_callback))
+            stack.enter_context(DaskProgress("tasks"))  # computation of lazy outputs
+
+        outputs = run_workflow_op(
+            workflow_rdf,
+            inputs=[prepare_parameter(getattr(args, ipt.name), ipt) for ipt in wf.inputs],
+            options={opt.name: prepare_parameter(getattr(args, opt.name), opt) for opt in wf.options},
+        )
+        chunks = None if args.output_chunks is None else [int(c) for c in args.output_chunks.split(",")]
+        output_folder.mkdir(parents=True, exist_ok=True)
+        for out_spec, (name, out) in zip(wf.outputs, outputs.items()):
+            assert out_spec.name == name
+            out_path = output_folder / name
+            if out_spec.type == "tensor":
+                save_tensor(
+                    out_path.with_suffix(output_tensor_extension),
+                    out,
+                    codec=args.output_codec,
+                    compression_level=args.output_compression_level,
+                    chunks=chunks,
+                )
+            else:
+                with out_path.with_suffix(".json").open("w") as f:
+                    json.dump(out, f)
 
 
 if __name__ == "__main__":
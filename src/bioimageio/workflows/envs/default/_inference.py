@@ -1,16 +1,31 @@
+import atexit
 import collections
+import contextlib
+import dataclasses
+import hashlib
+import os
+import threading
+from functools import partial
 from os import PathLike
-from typing import Dict, IO, Optional, OrderedDict, Sequence, Tuple, Union
+from typing import Any, Callable, Dict, IO, List, Optional, OrderedDict, Sequence, Tuple, Union
 
+import dask
 import dask.array as da
 import numpy as np
 import xarray as xr
 
+from bioimageio.workflows.envs.default._tile_graph import blended_tiled_map, tiled_map, tiled_map_outputs
 from bioimageio.workflows.utils import (
+    SPACE_TIME_AXES,
     get_chunk,
     get_corrected_chunks,
     get_default_input_tile,
+    get_dask_progress_callback,
     get_output_rois,
+    get_progress_callback,
+    load_cached_raw_resource_description,
+    raise_if_cancelled,
+    record_cache_access,
     transpose_sequence,
     tuple_roi_to_slices,
 )
@@ -18,7 +33,7 @@ from bioimageio.core.prediction_pipeline._combined_processing import CombinedPro
 from bioimageio.core.prediction_pipeline._model_adapters import ModelAdapter, create_model_adapter
 from bioimageio.core.resource_io import nodes
 from bioimageio.core.resource_io.utils import resolve_raw_node
-from bioimageio.spec import load_raw_resource_description
+from bioimageio.spec import serialize_raw_resource_description
 from bioimageio.spec.model import raw_nodes
 from bioimageio.spec.shared.raw_nodes import ResourceDescription as RawResourceDescription
 
@@ -28,18 +43,119 @@ except ImportError:
     from typing_extensions import Literal
 
 
-BoundaryMode = Literal["reflect"]
+try:
+    import distributed
+except ImportError:
+    distributed = None
+
+
+BoundaryMode = Literal["reflect", "constant", "edge", "none"]
+Scheduler = Literal["synchronous", "threads", "processes", "distributed"]
+Stitching = Literal["crop", "cosine", "gaussian"]
+
+MODEL_ADAPTER_CACHE_SIZE = int(os.getenv("BIOIMAGEIO_MODEL_ADAPTER_CACHE_SIZE", "4"))
+
+# least recently used model adapters of this (worker) process by model key and devices
+_model_adapters: OrderedDict[Tuple[str, Tuple[str, ...]], ModelAdapter] = collections.OrderedDict()
+_model_adapters_lock = threading.Lock()
+
+# client of the local distributed cluster by number of workers (only one cluster is kept running)
+_distributed_clients: Dict[Optional[int], Any] = {}
+
+
+def clear_model_adapters() -> None:
+    """drop the cached model adapters of this process (their memory is released once running tiles are done)"""
+    with _model_adapters_lock:
+        _model_adapters.clear()
+
+
+def close_distributed_clients() -> None:
+    """close the local distributed cluster started for the 'distributed' scheduler"""
+    while _distributed_clients:
+        _, client = _distributed_clients.popitem()
+        cluster = client.cluster
+        with contextlib.suppress(Exception):
+            client.close()
+
+        if cluster is not None:
+            with contextlib.suppress(Exception):
+                cluster.close()
+
+
+atexit.register(close_distributed_clients)
+
+
+def _get_model_key(model_source: Union[str, raw_nodes.Model]) -> str:
+    if isinstance(model_source, str):
+        return model_source
+    else:
+        serialized = serialize_raw_resource_description(model_source)
+        return hashlib.sha256(f"{model_source.root_path}{serialized}".encode()).hexdigest()
 
 
-def forward(*tensors, model_adapter: ModelAdapter, output_tile_roi: Tuple[slice, ...]):
-    """helper to cast dask array chunks to xr.DataArray and apply a roi to the output"""
+def _get_model_adapter(
+    model_source: Union[str, raw_nodes.Model], model_key: str, devices: Sequence[str]
+) -> ModelAdapter:
+    """create a model adapter once per (worker) process, such that tasks only carry the (small) model source
+
+    The last BIOIMAGEIO_MODEL_ADAPTER_CACHE_SIZE used model adapters are kept.
+    """
+    key = (model_key, tuple(devices))
+    with _model_adapters_lock:
+        adapter = _model_adapters.get(key)
+        record_cache_access("model_adapters", adapter is not None)
+        if adapter is None:
+            model = load_cached_raw_resource_description(model_source, update_to_format="latest")
+            adapter = create_model_adapter(bioimageio_model=model, devices=devices)
+            if MODEL_ADAPTER_CACHE_SIZE > 0:
+                _model_adapters[key] = adapter
+        else:
+            _model_adapters.move_to_end(key)
+
+        while len(_model_adapters) > max(MODEL_ADAPTER_CACHE_SIZE, 0):
+            _model_adapters.popitem(last=False)
+
+    return adapter
+
+
+def _get_distributed_client(num_workers: Optional[int]):
+    """client of a local distributed cluster (with one single-threaded worker process per core by default)"""
+    if distributed is None:
+        raise ImportError("The 'distributed' scheduler requires dask.distributed to be installed.")
+
+    client = _distributed_clients.get(num_workers)
+    if client is None or client.status != "running":
+        close_distributed_clients()  # of other numbers of workers
+        cluster = distributed.LocalCluster(n_workers=num_workers, threads_per_worker=1, processes=True)
+        client = _distributed_clients[num_workers] = distributed.Client(cluster, set_as_default=False)
+
+    return client
+
+
+def forward(
+    *tensors,
+    model_source: Union[str, raw_nodes.Model],
+    model_key: str,
+    devices: Sequence[str],
+    output_tile_rois: Sequence[Tuple[slice, ...]],
+    output_index: Optional[int] = 0,
+):
+    """helper to cast dask array chunks to xr.DataArray and apply a roi to the outputs
+
+    Returns:
+        output `output_index` or a tuple of all outputs if `output_index` is None
+    """
+    model_adapter = _get_model_adapter(model_source, model_key, devices)
     assert len(model_adapter.bioimageio_model.inputs) == len(tensors), (
         len(model_adapter.bioimageio_model.inputs),
         len(tensors),
     )
     tensors = [xr.DataArray(t, dims=tuple(ipt.axes)) for ipt, t, in zip(model_adapter.bioimageio_model.inputs, tensors)]
-    output = model_adapter.forward(*tensors)[0]  # todo: allow more than 1 output
-    return output[output_tile_roi]
+    outputs = model_adapter.forward(*tensors)
+    if output_index is None:
+        return tuple(out[roi] for out, roi in zip(outputs, output_tile_rois))
+    else:
+        return outputs[output_index][output_tile_rois[output_index]]
 
 
 async def inference_with_dask(
@@ -47,12 +163,18 @@ async def inference_with_dask(
     tensors: Sequence[xr.DataArray],
     boundary_mode: Union[
         BoundaryMode,
-        Sequence[BoundaryMode],
+        Sequence[Union[BoundaryMode, Dict[str, BoundaryMode]]],
     ] = "reflect",
     enable_preprocessing: bool = True,
     enable_postprocessing: bool = True,
     devices: Sequence[str] = ("cpu",),
     tiles: Optional[Sequence[Dict[str, int]]] = None,
+    scheduler: Optional[Scheduler] = None,
+    num_workers: Optional[int] = None,
+    fuse_tiles: bool = True,
+    stitching: Stitching = "crop",
+    halo: Optional[Dict[str, int]] = None,
+    seam_tolerance: Optional[float] = None,
 ) -> OrderedDict[str, xr.DataArray]:
     """Model inference with chunked dask arrays for tiling
 
@@ -72,20 +194,162 @@ async def inference_with_dask(
     Args:
         model_rdf: model RDF that describes the model to be used for inference
         tensors: model input tensors
-        boundary_mode: How to pad missing values.
+        boundary_mode: How to pad missing values at the image borders: 'reflect', 'constant' (zeros), 'edge'
+            (repeat border values) or 'none' (no padding; the output is cropped to the valid region, for which the
+            full halo is available, and border tiles are smaller). Either one mode for all inputs or one per input,
+            given as a mode for all axes or per axis, e.g. `[{"y": "none", "x": "reflect"}]`
+            (unspecified axes default to 'reflect').
         enable_preprocessing: If true, apply the preprocessing specified by the model
         enable_postprocessing: If true, apply the postprocessing specified by the model
         devices: devices to use by the created model adapter
         tiles: Tile shapes for model inputs. Defaults to estimates based on the model RDF.
+        scheduler: If given, compute the outputs with this dask scheduler; otherwise return lazy outputs.
+            'distributed' starts (and reuses) a local dask.distributed cluster. The model adapter is created once
+            per worker process.
+            Progress of computed tiles (tiles done, pixels/s, ETA) is reported to the current progress callback
+            (see `bioimageio.workflows.utils.progress_scope`) unless the 'distributed' scheduler is used.
+        num_workers: number of worker threads/processes for `scheduler`. Defaults to the number of cores.
+        fuse_tiles: If true, build a compact graph of one task per tile, that cuts its (padded) input window and
+            runs the model (for models with one input and outputs of the same axes). Otherwise pad, chunk,
+            overlap, map and trim the inputs with separate dask array operations.
+        stitching: How to stitch the tile outputs: 'crop' the halo off each tile output or blend the overlapping
+            tile outputs (including their halo) weighted by a 'cosine' or 'gaussian' window, such that tile borders
+            contribute less. Blending hides seams of a smaller halo than required by the model (see `halo`).
+            Blending requires `fuse_tiles`.
+        halo: Overwrite the halo of the model outputs per axis, e.g. `{"y": 8, "x": 8}`. A smaller halo means less
+            overlap and fewer tiles.
+        seam_tolerance: If given, warn if overlapping tile outputs differ by more than this value when blending.
 
     Returns:
         outputs. named model outputs
     """
-    model: raw_nodes.Model = load_raw_resource_description(model_rdf, update_to_format="latest")  # noqa
-    if len(model.outputs) > 1:
-        raise NotImplementedError("More than one model output not yet implemented")
+    if stitching not in ("crop", "cosine", "gaussian"):
+        raise ValueError(f"Invalid stitching {stitching}. Expected 'crop', 'cosine' or 'gaussian'.")
 
+    tiling = _prepare_tiling(
+        model_rdf, tensors, boundary_mode, enable_preprocessing, enable_postprocessing, tiles=tiles, halo=halo
+    )
+    model = tiling.model
+    output_tile_rois = tiling.output_tile_rois
+    if stitching == "crop":
+        out_margins = [[(0, 0)] * len(out.axes) for out in model.outputs]
+    else:
+        # blend the halo of space/time axes instead of cropping it
+        out_margins = [
+            [r if a in SPACE_TIME_AXES else (0, 0) for a, r in zip(out.axes, roi)]
+            for out, roi in zip(model.outputs, output_tile_rois)
+        ]
+        output_tile_rois = [
+            [(0, 0) if a in SPACE_TIME_AXES else r for a, r in zip(out.axes, roi)]
+            for out, roi in zip(model.outputs, output_tile_rois)
+        ]
+
+    forward_kwargs = _get_forward_kwargs(model_rdf, model, devices, output_tile_rois)
+    graph_name = (model.config or {}).get("bioimageio", {}).get("nickname") or f"model_{model.id}"
+    fused = _get_fused_tiling(tiling) if fuse_tiles else None
+    dtypes = [np.dtype(out.data_type) for out in model.outputs]
+    if fused is not None:
+        padded = _pad(tiling.tensors[0].data, fused.padding, [PAD_MODES[m] for m in fused.modes])
+        padded = _pad(padded, fused.depth_padding, [DEPTH_PAD_MODES[m] for m in fused.modes])
+        if len(model.outputs) > 1:
+            res = tiled_map_outputs(
+                partial(forward, output_index=None, **forward_kwargs),
+                padded,
+                window=fused.window,
+                step=fused.step,
+                out_to_in=fused.out_to_in,
+                out_block=fused.out_blocks,
+                out_roi=fused.output_rois,
+                dtype=dtypes,
+                name=graph_name,
+                out_margin=None if stitching == "crop" else out_margins,
+                blending=stitching,
+                seam_tolerance=seam_tolerance,
+            )
+        else:
+            tiled_map_kwargs: Dict[str, Any] = dict(
+                window=fused.window,
+                step=fused.step,
+                out_to_in=fused.out_to_in[0],
+                out_block=fused.out_blocks[0],
+                out_roi=fused.output_rois[0],
+                dtype=dtypes[0],
+                name=graph_name,
+            )
+            if stitching == "crop":
+                res = [tiled_map(partial(forward, **forward_kwargs), padded, **tiled_map_kwargs)]
+            else:
+                res = [
+                    blended_tiled_map(
+                        partial(forward, **forward_kwargs),
+                        padded,
+                        out_margin=out_margins[0],
+                        blending=stitching,
+                        seam_tolerance=seam_tolerance,
+                        **tiled_map_kwargs,
+                    )
+                ]
+    elif stitching != "crop":
+        raise NotImplementedError(
+            "Blended stitching is only implemented for `fuse_tiles` with models with one input and outputs of the "
+            "same axes."
+        )
+    else:
+        res = _blockwise_forward(
+            model,
+            tiling.tensors,
+            tiling.chunks,
+            tiling.overlap_depths,
+            tiling.paddings,
+            tiling.boundary_modes,
+            tiling.output_rois,
+            graph_name,
+            forward_kwargs,
+        )
+
+    outputs = _postprocess(
+        tiling,
+        collections.OrderedDict(
+            (out.name, xr.DataArray(r, dims=tuple(out.axes))) for out, r in zip(model.outputs, res)
+        ),
+    )
+    if scheduler is not None:
+        outputs = _compute_outputs(outputs, scheduler, num_workers, tile_key_prefix=graph_name)
+
+    return outputs
+
+
+@dataclasses.dataclass
+class _Tiling:
+    """preprocessed model inputs and their tiling (see `_prepare_tiling`)"""
+
+    model: raw_nodes.Model
+    tensors: List[xr.DataArray]  # preprocessed inputs, transposed to the model's input axes
+    postprocessing: Optional[CombinedProcessing]
+    boundary_modes: List[Dict[str, BoundaryMode]]
+    chunks: Sequence[Dict[str, int]]
+    overlap_depths: Sequence[Dict[int, int]]
+    paddings: Sequence[Dict[str, Tuple[int, int]]]
+    output_tile_rois: List[Sequence[Tuple[int, int]]]  # per output
+    output_rois: List[Sequence[Tuple[int, int]]]  # per output
+    out_valid_axes: List[List[str]]  # per output: axes without border padding ('none')
+
+
+def _prepare_tiling(
+    model_rdf: Union[str, PathLike, dict, IO, bytes, raw_nodes.URI, RawResourceDescription],
+    tensors: Sequence[xr.DataArray],
+    boundary_mode: Union[BoundaryMode, Sequence[Union[BoundaryMode, Dict[str, BoundaryMode]]]],
+    enable_preprocessing: bool,
+    enable_postprocessing: bool,
+    tiles: Optional[Sequence[Dict[str, int]]],
+    halo: Optional[Dict[str, int]] = None,
+) -> _Tiling:
+    """load the model, preprocess the inputs and plan their tiling"""
+    model: raw_nodes.Model = load_cached_raw_resource_description(model_rdf, update_to_format="latest")  # noqa
     assert isinstance(model, raw_nodes.Model)
+    if halo is not None:
+        model = _overwrite_halo(model, halo)
+
     # always remove pre-/postprocessing, but save it if enabled
     # todo: improve pre- and postprocessing!
 
@@ -96,6 +360,7 @@ async def inference_with_dask(
         sample = {ipt.name: t for ipt, t in zip(model.inputs, tensors)}
         preprocessing.apply(sample, {})
         tensors = [sample[ipt.name] for ipt in model.inputs]
+        raise_if_cancelled()
 
     if enable_postprocessing:
         postprocessing = CombinedProcessing.from_tensor_specs(
@@ -107,16 +372,226 @@ async def inference_with_dask(
     # transpose tensors to match ipt spec
     assert len(tensors) == len(model.inputs)
     tensors = [t.transpose(*s.axes) for t, s in zip(tensors, model.inputs)]
-    if isinstance(boundary_mode, str):
-        boundary_mode = [boundary_mode] * len(tensors)
+    boundary_modes = _get_axis_boundary_modes(boundary_mode, model.inputs)
 
     if tiles is None:
-        tiles = [get_default_input_tile(ipt) for ipt in model.inputs]
+        tiles = [dict(zip(ipt.axes, get_default_input_tile(ipt))) for ipt in model.inputs]
 
     # calculate chunking of the input tensors from tiles taking halo and offset into account
+    # (axes without border padding ('none') are not padded for positive output offsets either)
+    valid_axes = [[a for a, m in bm.items() if m == "none"] for bm in boundary_modes]
     chunks, overlap_depths, paddings = zip(
-        *(get_chunk(c, ipt, model.outputs, t) for c, ipt, t in zip(tiles, model.inputs, tensors))
+        *(
+            get_chunk(c, ipt, model.outputs, t, valid_axes=va)
+            for c, ipt, t, va in zip(tiles, model.inputs, tensors, valid_axes)
+        )
+    )
+    out_valid_axes = [
+        valid_axes[[ipt.name for ipt in model.inputs].index(out.shape.reference_tensor)]
+        if isinstance(out.shape, raw_nodes.ImplicitOutputShape)
+        else []
+        for out in model.outputs
+    ]
+    output_tile_rois, output_rois = [], []
+    for out, out_va in zip(model.outputs, out_valid_axes):
+        output_tile_roi, output_roi = get_output_rois(
+            out,
+            input_overlaps={ipt.name: d for ipt, d in zip(model.inputs, overlap_depths)},
+            input_paddings={ipt.name: p for ipt, p in zip(model.inputs, paddings)},
+            ipt_by_name={ipt.name: ipt for ipt in model.inputs},
+            valid_axes=out_va,
+        )
+        output_tile_rois.append(output_tile_roi)
+        output_rois.append(output_roi)
+
+    return _Tiling(
+        model=model,
+        tensors=tensors,
+        postprocessing=postprocessing,
+        boundary_modes=boundary_modes,
+        chunks=chunks,
+        overlap_depths=overlap_depths,
+        paddings=paddings,
+        output_tile_rois=output_tile_rois,
+        output_rois=output_rois,
+        out_valid_axes=out_valid_axes,
+    )
+
+
+def _get_forward_kwargs(
+    model_rdf, model: raw_nodes.Model, devices: Sequence[str], output_tile_rois: Sequence[Sequence[Tuple[int, int]]]
+) -> Dict[str, Any]:
+    # tasks get the model source (not the model adapter) and create the adapter once per worker process
+    model_source = str(model_rdf) if isinstance(model_rdf, (str, PathLike, raw_nodes.URI)) else model
+    return dict(
+        model_source=model_source,
+        model_key=_get_model_key(model_source),
+        devices=tuple(devices),
+        output_tile_rois=tuple(tuple_roi_to_slices(roi) for roi in output_tile_rois),
+    )
+
+
+def _postprocess(tiling: _Tiling, outputs: OrderedDict[str, xr.DataArray]) -> OrderedDict[str, xr.DataArray]:
+    if tiling.postprocessing is None:
+        return outputs
+
+    sample = {name: t for name, t in outputs.items()}
+    tiling.postprocessing.apply(sample, {})
+    return collections.OrderedDict({out.name: sample[out.name] for out in tiling.model.outputs})
+
+
+@dataclasses.dataclass
+class _FusedTiling:
+    """windows of the (only) padded input yielding the blocks of each output (see `_get_fused_tiling`)"""
+
+    modes: List[BoundaryMode]  # boundary mode per input axis
+    padding: List[Tuple[int, int]]  # to a multiple of the tile shape (see `PAD_MODES`)
+    depth_padding: List[Tuple[int, int]]  # followed by the halo (see `DEPTH_PAD_MODES`)
+    window: List[int]
+    step: List[int]
+    out_to_in: List[List[int]]  # per output
+    out_blocks: List[List[int]]  # per output
+    output_rois: List[Sequence[Tuple[int, int]]]  # per output
+
+
+def _get_fused_tiling(tiling: _Tiling) -> Optional[_FusedTiling]:
+    """tiling of models with one input and outputs of the same axes by windows of the padded input"""
+    model = tiling.model
+    if not (
+        len(model.inputs) == 1
+        and all(
+            isinstance(out.shape, raw_nodes.ImplicitOutputShape) and all(a in model.inputs[0].axes for a in out.axes)
+            for out in model.outputs
+        )
+    ):
+        return None
+
+    ipt = model.inputs[0]
+    chunk, depth = tiling.chunks[0], tiling.overlap_depths[0]
+    # same padding as `pad` followed by `da.overlap.overlap`, except for axes without boundary padding ('none'):
+    # their windows start at the border and the padding to complete the last window is cropped from the output
+    modes = [tiling.boundary_modes[0][a] for a in ipt.axes]
+    padding = [
+        _get_valid_padding(s, chunk[a], depth[i]) if m == "none" else tiling.paddings[0][a]
+        for i, (a, s, m) in enumerate(zip(ipt.axes, tiling.tensors[0].shape, modes))
+    ]
+    output_rois = list(tiling.output_rois)
+    if "none" in modes:
+        output_rois = [
+            get_output_rois(
+                out,
+                input_overlaps={ipt.name: depth},
+                input_paddings={ipt.name: dict(zip(ipt.axes, padding))},
+                ipt_by_name={ipt.name: ipt},
+                valid_axes=out_va,
+            )[1]
+            for out, out_va in zip(model.outputs, tiling.out_valid_axes)
+        ]
+
+    return _FusedTiling(
+        modes=modes,
+        padding=padding,
+        depth_padding=[(0, 0) if m == "none" else (depth[i], depth[i]) for i, m in enumerate(modes)],
+        window=[chunk[a] + 2 * depth[i] for i, a in enumerate(ipt.axes)],
+        step=[chunk[a] for a in ipt.axes],
+        out_to_in=[[ipt.axes.index(a) for a in out.axes] for out in model.outputs],
+        # whole pixels (see `get_chunk`)
+        out_blocks=[
+            [round(chunk[a] * (1.0 if sc is None else sc)) for a, sc in zip(out.axes, out.shape.scale)]
+            for out in model.outputs
+        ],
+        output_rois=output_rois,
     )
+
+
+# numpy padding modes per boundary mode to pad the input to a multiple of the tile shape
+PAD_MODES = {"reflect": "reflect", "constant": "constant", "edge": "edge", "none": "constant"}
+# numpy padding modes per boundary mode equivalent to the boundary of `da.overlap.overlap` (applies the halo)
+DEPTH_PAD_MODES = {"reflect": "symmetric", "constant": "constant", "edge": "edge", "none": "constant"}
+# `da.overlap.overlap` boundaries per boundary mode
+OVERLAP_BOUNDARIES: Dict[str, Any] = {"reflect": "reflect", "constant": 0, "edge": "nearest", "none": "none"}
+
+
+def _get_axis_boundary_modes(
+    boundary_mode: Union[BoundaryMode, Sequence[Union[BoundaryMode, Dict[str, BoundaryMode]]]],
+    inputs: Sequence[raw_nodes.InputTensor],
+) -> List[Dict[str, BoundaryMode]]:
+    """boundary mode per axis of each input"""
+    if isinstance(boundary_mode, str):
+        boundary_mode = [boundary_mode] * len(inputs)
+
+    if len(boundary_mode) != len(inputs):
+        raise ValueError(f"Expected {len(inputs)} boundary modes (one per input), but got {len(boundary_mode)}.")
+
+    ret = []
+    for ipt, bm in zip(inputs, boundary_mode):
+        modes: Dict[str, Any] = {a: bm for a in ipt.axes} if isinstance(bm, str) else {a: "reflect" for a in ipt.axes}
+        if isinstance(bm, dict):
+            unknown = set(bm) - set(ipt.axes)
+            if unknown:
+                raise ValueError(f"Got boundary modes for unknown axes {unknown} of input {ipt.name}.")
+
+            modes.update(bm)
+
+        invalid = {m for m in modes.values() if m not in PAD_MODES}
+        if invalid:
+            raise ValueError(f"Invalid boundary modes {invalid}. Expected any of {set(PAD_MODES)}.")
+
+        ret.append(modes)
+
+    return ret
+
+
+def _overwrite_halo(model: raw_nodes.Model, halo: Dict[str, int]) -> raw_nodes.Model:
+    """copy of `model` with the halo of its outputs overwritten per axis"""
+    unknown = set(halo) - {a for out in model.outputs for a in out.axes}
+    if unknown:
+        raise ValueError(f"Got halo for unknown axes {unknown} of outputs {[out.name for out in model.outputs]}.")
+
+    outputs = []
+    for out in model.outputs:
+        out_halo = [
+            halo.get(a, h) for a, h in zip(out.axes, out.halo if isinstance(out.halo, list) else [0] * len(out.axes))
+        ]
+        outputs.append(dataclasses.replace(out, halo=out_halo))
+
+    return dataclasses.replace(model, outputs=outputs)
+
+
+def _get_valid_padding(size: int, chunk: int, depth: int) -> Tuple[int, int]:
+    """padding to complete the last tile of an axis without border padding (covering `size` - 2 * `depth`)"""
+    if size <= 2 * depth:
+        raise ValueError(f"Axis of size {size} is too small for boundary mode 'none' with a halo of {depth}.")
+
+    return 0, (chunk - (size - 2 * depth) % chunk) % chunk
+
+
+def _pad(data, pad_width: Sequence[Tuple[int, int]], modes: Sequence[str]):
+    """pad a numpy or dask array with a numpy padding mode per axis"""
+    for mode in dict.fromkeys(modes):
+        width = [w if m == mode else (0, 0) for w, m in zip(pad_width, modes)]
+        if any(sum(w) for w in width):
+            data = (da if isinstance(data, da.Array) else np).pad(data, width, mode=mode)
+
+    return data
+
+
+def _blockwise_forward(
+    model: raw_nodes.Model,
+    tensors: Sequence[xr.DataArray],
+    chunks: Sequence[Dict[str, int]],
+    overlap_depths: Sequence[Dict[int, int]],
+    paddings: Sequence[Dict[str, Tuple[int, int]]],
+    boundary_modes: Sequence[Dict[str, BoundaryMode]],
+    output_rois: Sequence[Sequence[Tuple[int, int]]],
+    graph_name: str,
+    forward_kwargs: Dict[str, Any],
+) -> List[da.Array]:
+    """tiled forward with separate dask array operations for padding, overlapping, mapping and trimming
+
+    For several outputs the model runs once per tile into an (object) array of tile outputs, from which each output
+    is selected blockwise.
+    """
     chunks_by_name = {ipt.name: c for ipt, c in zip(model.inputs, chunks)}
     padded_input_tensor_shapes = {
         ipt.name: [ts + sum(p[a]) for ts, a in zip(t.shape, ipt.axes)]
@@ -124,25 +599,88 @@ async def inference_with_dask(
     }
 
     # note: da.overlap.overlap or da.overlap.map_overlap equivalents are not yet available in xarray
+    # ('none' boundaries yield smaller border blocks without halo on the border side)
     tensors = [
-        da.overlap.overlap(t.pad(p, mode=bm).chunk(c).data, depth=d, boundary=bm)
-        for t, c, d, p, bm in zip(tensors, chunks, overlap_depths, paddings, boundary_mode)
+        da.overlap.overlap(
+            da.asarray(_pad(t.data, [p[a] for a in ipt.axes], [PAD_MODES[bm[a]] for a in ipt.axes])).rechunk(
+                tuple(c[a] for a in ipt.axes)
+            ),
+            depth=d,
+            boundary={i: OVERLAP_BOUNDARIES[bm[a]] for i, a in enumerate(ipt.axes)},
+        )
+        for t, ipt, c, d, p, bm in zip(tensors, model.inputs, chunks, overlap_depths, paddings, boundary_modes)
     ]
 
-    output_tile_roi, output_roi = get_output_rois(
-        model.outputs[0],
-        input_overlaps={ipt.name: d for ipt, d in zip(model.inputs, overlap_depths)},
-        input_paddings={ipt.name: p for ipt, p in zip(model.inputs, paddings)},
-        ipt_by_name={ipt.name: ipt for ipt in model.inputs},
-    )
-
     n_batches = tensors[0].npartitions
     assert all(t.npartitions == n_batches for t in tensors[1:]), [t.npartitions for t in tensors]
 
-    model_adapter = create_model_adapter(bioimageio_model=model, devices=devices)
+    inputs_sequence = []
+    for t, ipt in zip(tensors, model.inputs):
+        inputs_sequence.append(t)
+        inputs_sequence.append(tuple("b" if a == "b" else f"{ipt.name}_{a}" for a in ipt.axes))
+
+    if len(model.outputs) == 1:
+        blocks_sequence = inputs_sequence
+        block_funcs: List[Callable] = [partial(forward, **forward_kwargs)]
+    else:
+        reference_tensors = {
+            out.shape.reference_tensor for out in model.outputs if isinstance(out.shape, raw_nodes.ImplicitOutputShape)
+        }
+        if len(reference_tensors) > 1:
+            raise NotImplementedError("Tiling model outputs referencing different inputs")
+
+        ref_idx = [ipt.name for ipt in model.inputs].index(
+            reference_tensors.pop() if reference_tensors else model.inputs[0].name
+        )
+        tiles_ind = inputs_sequence[2 * ref_idx + 1]
+        tiles = da.blockwise(
+            partial(forward, output_index=None, **forward_kwargs),
+            tiles_ind,
+            *inputs_sequence,
+            dtype=object,
+            meta=np.empty((0,) * len(tiles_ind), dtype=object),
+            token=f"tile-{graph_name}",  # only output blocks count as tiles of `graph_name` (for progress)
+        )
+        blocks_sequence = [tiles, tiles_ind]
+        block_funcs = [partial(_select_output, output_index=i) for i in range(len(model.outputs))]
+
+    return [
+        _blockwise_output(
+            model,
+            i,
+            tensors,
+            overlap_depths,
+            padded_input_tensor_shapes,
+            roi,
+            graph_name,
+            blocks_sequence,
+            block_func,
+        )
+        for i, (roi, block_func) in enumerate(zip(output_rois, block_funcs))
+    ]
+
+
+def _select_output(tiles, output_index: int) -> np.ndarray:
+    while isinstance(tiles, list):  # contracted blocks
+        assert len(tiles) == 1, len(tiles)
+        tiles = tiles[0]
+
+    return np.asarray(tiles[output_index])
+
 
-    # todo: generalize to multiple outputs
-    out = model.outputs[0]
+def _blockwise_output(
+    model: raw_nodes.Model,
+    output_index: int,
+    tensors: Sequence[da.Array],
+    overlap_depths: Sequence[Dict[int, int]],
+    padded_input_tensor_shapes: Dict[str, Sequence[int]],
+    output_roi: Sequence[Tuple[int, int]],
+    graph_name: str,
+    blocks_sequence: Sequence[Any],
+    block_func: Callable,
+) -> da.Array:
+    """output `output_index` of `model` mapped blockwise from `blocks_sequence` (inputs or tile outputs)"""
+    out = model.outputs[output_index]
     if isinstance(out.shape, raw_nodes.ImplicitOutputShape):
         ipt_shape = padded_input_tensor_shapes[out.shape.reference_tensor]
         ipt_by_name = {ipt.name: ipt for ipt in model.inputs}
@@ -150,9 +688,8 @@ async def inference_with_dask(
         ipt_shape = np.array(transpose_sequence(ipt_shape, ipt_axes, out.axes, 0))
         out_scale = [0.0 if s is None else s for s in out.shape.scale]
         out_offset = np.array(out.shape.offset)
-        out_shape_float = ipt_shape * out_scale + 2 * out_offset
-        assert (out_shape_float == out_shape_float.astype(int)).all(), out_shape_float
-        out_shape: Sequence[int] = out_shape_float.astype(int)
+        # only used for new output axes (not tiled); output blocks of tiled axes are whole pixels (see `get_chunk`)
+        out_shape: Sequence[int] = np.round(ipt_shape * out_scale + 2 * out_offset).astype(int)
     else:
         out_shape = out.shape
         out_scale = [1.0] * len(out_shape)
@@ -168,26 +705,27 @@ async def inference_with_dask(
         elif a in ipt_axes:
             axis_name = f"{out.shape.reference_tensor}_{a}"
             out_ind.append(axis_name)
-            adjust_chunks[axis_name] = lambda _, aa=a, scc=sc: chunks_by_name[out.shape.reference_tensor][aa] * scc
+            # output blocks are the input blocks without overlap (smaller at 'none' boundaries), scaled
+            ref_idx = model.inputs.index(ipt_by_name[out.shape.reference_tensor])
+            in_axis = ipt_axes.index(a)
+            in_chunks = np.array(tensors[ref_idx].chunks[in_axis])
+            adjust_chunks[axis_name] = tuple(
+                np.round((in_chunks - 2 * overlap_depths[ref_idx][in_axis]) * sc).astype(int).tolist()
+            )
         else:
             out_ind.append(f"{out.name}_{a}")
             new_axes[f"{out.name}_{a}"] = s
 
-    inputs_sequence = []
-    for t, ipt in zip(tensors, model.inputs):
-        inputs_sequence.append(t)
-        inputs_sequence.append(tuple("b" if a == "b" else f"{ipt.name}_{a}" for a in ipt.axes))
-
     result = da.blockwise(
-        forward,
+        block_func,
         tuple(out_ind),
-        *inputs_sequence,
+        *blocks_sequence,
         new_axes=new_axes,
         dtype=np.dtype(out.data_type),
         meta=np.empty((), dtype=np.dtype(out.data_type)),
-        name=(model.config or {}).get("bioimageio", {}).get("nickname") or f"model_{model.id}",
+        name=graph_name if len(model.outputs) == 1 else None,
+        token=None if len(model.outputs) == 1 else graph_name,
         adjust_chunks=adjust_chunks,
-        **dict(model_adapter=model_adapter, output_tile_roi=tuple_roi_to_slices(output_tile_roi)),
     )
 
     corrected_chunks, rechunk = get_corrected_chunks(result.chunks, result.shape, output_roi)
@@ -195,11 +733,21 @@ async def inference_with_dask(
     if rechunk:
         res = res.rechunk(corrected_chunks)
 
-    outputs = collections.OrderedDict({out.name: xr.DataArray(res, dims=tuple(out.axes))})
-    if enable_postprocessing:
-        assert postprocessing is not None
-        sample = {name: t for name, t in outputs.items()}
-        postprocessing.apply(sample, {})
-        outputs = collections.OrderedDict({out.name: sample[out.name] for out in model.outputs})
+    return res
 
-    return outputs
+
+def _compute_outputs(
+    outputs: OrderedDict[str, xr.DataArray], scheduler: Scheduler, num_workers: Optional[int], tile_key_prefix: str
+) -> OrderedDict[str, xr.DataArray]:
+    if scheduler == "distributed":
+        # tasks run on the cluster; its dashboard shows their progress
+        compute_kwargs: Dict[str, Any] = dict(scheduler=_get_distributed_client(num_workers))
+    else:
+        compute_kwargs = dict(scheduler=scheduler, num_workers=num_workers)
+        if get_progress_callback() is not None:
+            compute_kwargs["callbacks"] = [get_dask_progress_callback("tiles", key_prefixes=[tile_key_prefix])]
+
+    computed = dask.compute(*[t.data for t in outputs.values()], **compute_kwargs)
+    return collections.OrderedDict(
+        (name, t.copy(deep=False, data=c)) for (name, t), c in zip(outputs.items(), computed)
+    )
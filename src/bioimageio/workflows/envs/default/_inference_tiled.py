@@ -0,0 +1,185 @@
+import collections
+from concurrent.futures import ThreadPoolExecutor
+from os import PathLike, fspath
+from pathlib import Path
+from typing import Dict, IO, List, Optional, OrderedDict, Sequence, Tuple, Union
+
+import numpy as np
+import xarray as xr
+
+from bioimageio.workflows.envs.default._inference import (
+    DEPTH_PAD_MODES,
+    PAD_MODES,
+    BoundaryMode,
+    _get_forward_kwargs,
+    _get_fused_tiling,
+    _postprocess,
+    _prepare_tiling,
+    forward,
+)
+from bioimageio.workflows.utils import ProgressTracker, get_tile_grid, raise_if_cancelled
+from bioimageio.spec.model import raw_nodes
+from bioimageio.spec.shared.raw_nodes import ResourceDescription as RawResourceDescription
+
+
+def _get_index_map(size: int, pad_widths: Sequence[Tuple[int, int]], modes: Sequence[str]) -> np.ndarray:
+    """source index of each pixel of an axis padded with numpy padding `modes` one after another (-1 for zeros)"""
+    index_map = np.arange(size)
+    for width, mode in zip(pad_widths, modes):
+        if sum(width):
+            if mode == "constant":
+                index_map = np.pad(index_map, width, mode="constant", constant_values=-1)
+            else:
+                index_map = np.pad(index_map, width, mode=mode)
+
+    return index_map
+
+
+def _read_window(data, index_maps: Sequence[np.ndarray]) -> np.ndarray:
+    """read the window of (padded) `data` given by the source indices per axis, see `_get_index_map`"""
+    valid = [m[m >= 0] for m in index_maps]
+    if any(len(v) == 0 for v in valid):
+        return np.zeros(tuple(len(m) for m in index_maps), dtype=data.dtype)
+
+    # read the bounding box only; works for numpy arrays and memmaps as well as zarr or dask arrays
+    box = tuple(slice(int(v.min()), int(v.max()) + 1) for v in valid)
+    window = np.asarray(data[box])
+    local = [m - b.start for m, b in zip(index_maps, box)]
+    if all(len(m) == len(v) == s and (np.diff(m) == 1).all() for m, v, s in zip(local, valid, window.shape)):
+        return window  # no padding within this window
+
+    window = window[np.ix_(*[np.maximum(m, 0) for m in local])]
+    if any(len(m) != len(v) for m, v in zip(local, valid)):
+        outside = np.zeros(window.shape, dtype=bool)
+        for i, m in enumerate(local):
+            outside |= (m < 0).reshape([-1 if j == i else 1 for j in range(window.ndim)])
+
+        window[outside] = 0
+
+    return window
+
+
+async def inference_tiled(
+    model_rdf: Union[str, PathLike, dict, IO, bytes, raw_nodes.URI, RawResourceDescription],
+    tensors: Sequence[xr.DataArray],
+    boundary_mode: Union[
+        BoundaryMode,
+        Sequence[Union[BoundaryMode, Dict[str, BoundaryMode]]],
+    ] = "reflect",
+    enable_preprocessing: bool = True,
+    enable_postprocessing: bool = True,
+    devices: Sequence[str] = ("cpu",),
+    tiles: Optional[Sequence[Dict[str, int]]] = None,
+    output_path: Optional[Union[str, PathLike]] = None,
+    prefetch: bool = True,
+) -> OrderedDict[str, xr.DataArray]:
+    """Model inference tile by tile with numpy
+
+    Like `inference_with_dask`, but without the overhead of a dask graph: the tiles are run one after another and
+    written into a preallocated output array. The next input tile is read (and padded) while the model runs.
+
+    .. code-block:: yaml
+    authors:
+    - {name: Fynn Beuttenmüller, github_user: fynnbe, affiliation: EMBL Heidelberg}
+    cite:
+    - {text: BioImage.IO, url: "https://doi.org/10.1101/2022.06.07.495102"}
+    tags: [workflow, inference, tiling]
+    covers: ["https://github.com/bioimage-io/bioimage.io/raw/10db0410b15684cdeac19d795b0edb330a3a7b80/public/static/img/bioimage-io-icon.png"]
+
+    Args:
+        model_rdf: model RDF that describes the model to be used for inference
+        tensors: model input tensors (numpy, zarr or dask backed)
+        boundary_mode: How to pad missing values at the image borders: 'reflect', 'constant' (zeros), 'edge'
+            (repeat border values) or 'none' (no padding; the output is cropped to the valid region). Either one
+            mode for all inputs or one per input, given as a mode for all axes or per axis, e.g.
+            `[{"y": "none", "x": "reflect"}]` (unspecified axes default to 'reflect').
+        enable_preprocessing: If true, apply the preprocessing specified by the model
+        enable_postprocessing: If true, apply the postprocessing specified by the model
+        devices: devices to use by the created model adapter
+        tiles: Tile shapes for model inputs. Defaults to estimates based on the model RDF.
+        output_path: If given, write the output to a memory-mapped .npy file at this path instead of memory
+            (for models with several outputs: to '<output_path stem>_<output name>.npy' files).
+        prefetch: If true, read the next input tile in a background thread while the model runs.
+
+    Returns:
+        outputs. named model outputs
+    """
+    tiling = _prepare_tiling(model_rdf, tensors, boundary_mode, enable_preprocessing, enable_postprocessing, tiles)
+    fused = _get_fused_tiling(tiling)
+    if fused is None:
+        raise NotImplementedError(
+            "inference_tiled requires a model with one input and outputs of the same axes. "
+            "Use inference_with_dask instead."
+        )
+
+    model = tiling.model
+    data = tiling.tensors[0].data
+    padded_shape = tuple(int(s + sum(p) + sum(d)) for s, p, d in zip(data.shape, fused.padding, fused.depth_padding))
+    # output blocks (output index, crop of the tile output, output slices) per tile, in the order of the first output
+    tile_blocks: Dict[Tuple[int, ...], List[Tuple[int, Tuple[slice, ...], Tuple[slice, ...]]]] = {}
+    outputs: List[np.ndarray] = []
+    for i, out in enumerate(model.outputs):
+        grid = get_tile_grid(
+            padded_shape,
+            tuple(fused.window),
+            tuple(fused.step),
+            tuple(fused.out_to_in[i]),
+            tuple(fused.out_blocks[i]),
+            tuple((int(r0), int(r1)) for r0, r1 in fused.output_rois[i]),
+        )
+        for tile, crop, out_slice in zip(
+            grid.tile_indices().tolist(), grid.crops().tolist(), grid.output_slices().tolist()
+        ):
+            tile_blocks.setdefault(tuple(tile), []).append(
+                (i, tuple(slice(c0, c1) for c0, c1 in crop), tuple(slice(o0, o1) for o0, o1 in out_slice))
+            )
+
+        dtype = np.dtype(out.data_type)
+        if output_path is None:
+            outputs.append(np.empty(grid.output_shape, dtype=dtype))
+        else:
+            path = Path(output_path)
+            if len(model.outputs) > 1:
+                path = path.with_name(f"{path.stem}_{out.name}.npy")
+
+            outputs.append(np.lib.format.open_memmap(fspath(path), mode="w+", dtype=dtype, shape=grid.output_shape))
+
+    index_maps = [
+        _get_index_map(s, [p, d], [PAD_MODES[m], DEPTH_PAD_MODES[m]])
+        for s, p, d, m in zip(data.shape, fused.padding, fused.depth_padding, fused.modes)
+    ]
+    tiles = list(tile_blocks)
+
+    def read(t: int) -> np.ndarray:
+        starts = [tt * st for tt, st in zip(tiles[t], fused.step)]
+        return _read_window(data, [m[s : s + w] for m, s, w in zip(index_maps, starts, fused.window)])
+
+    forward_kwargs = _get_forward_kwargs(model_rdf, model, devices, tiling.output_tile_rois)
+    progress = ProgressTracker("tiles", total=len(tiles))
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        next_window = pool.submit(read, 0) if prefetch else None
+        for t, tile in enumerate(tiles):
+            window = read(t) if next_window is None else next_window.result()
+            if prefetch and t + 1 < len(tiles):
+                next_window = pool.submit(read, t + 1)
+
+            raise_if_cancelled()
+            tile_outputs = forward(window, output_index=None, **forward_kwargs)
+            elements = 0
+            for i, crop, out_slice in tile_blocks[tile]:
+                block = np.asarray(tile_outputs[i])[crop]
+                outputs[i][out_slice] = block
+                elements += block.size
+
+            progress.update(elements=elements)
+
+    for output in outputs:
+        if isinstance(output, np.memmap):
+            output.flush()
+
+    return _postprocess(
+        tiling,
+        collections.OrderedDict(
+            (out.name, xr.DataArray(output, dims=tuple(out.axes))) for out, output in zip(model.outputs, outputs)
+        ),
+    )
@@ -0,0 +1,372 @@
+import itertools
+import uuid
+import warnings
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import dask.array as da
+import numpy as np
+from dask.base import tokenize
+from dask.highlevelgraph import HighLevelGraph
+from dask.utils import apply
+
+from bioimageio.workflows.utils import TileGrid, get_tile_grid
+
+
+def _run_tile(func: Callable, data: np.ndarray, window: Tuple[slice, ...], crop: Optional[Tuple[slice, ...]]) -> Any:
+    ret = func(data[window])
+    return ret if crop is None else np.asarray(ret)[crop]
+
+
+def _run_gathered_tile(func: Callable, blocks: List[Any], window: Tuple[slice, ...], crop: Optional[Tuple[slice, ...]]):
+    """assemble the input window from the (nested list of) neighboring input blocks it intersects"""
+    return _run_tile(func, np.block(blocks), window, crop)
+
+
+def _crop_output(tile: Sequence[Any], output: int, crop: Tuple[slice, ...]) -> np.ndarray:
+    return np.asarray(tile[output])[crop]
+
+
+def get_blending_window(kind: str, size: int) -> np.ndarray:
+    """1d weights of `size` output pixels of a tile for blended stitching, tapering off towards the tile borders"""
+    x = (np.arange(size) + 0.5) / size
+    if kind == "cosine":
+        return np.sin(np.pi * x) ** 2
+    elif kind == "gaussian":
+        return np.exp(-0.5 * ((x - 0.5) / 0.125) ** 2)
+    else:
+        raise ValueError(f"Unknown blending window {kind}. Expected 'cosine' or 'gaussian'.")
+
+
+def _blend_tiles(
+    tiles: List[np.ndarray],
+    crops: List[Tuple[Tuple[slice, ...], Tuple[slice, ...]]],
+    weights: List[List[np.ndarray]],
+    shape: Tuple[int, ...],
+    dtype,
+    seam_tolerance: Optional[float],
+    block_idx: Tuple[int, ...],
+    output: Optional[int] = None,
+) -> np.ndarray:
+    """weighted average of the (cropped) tile outputs (or their output `output`) overlapping an output block"""
+    acc = np.zeros(shape, dtype=np.float64)
+    weight_sum = np.zeros(shape, dtype=np.float64)
+    if seam_tolerance is not None:
+        lower = np.full(shape, np.inf)
+        upper = np.full(shape, -np.inf)
+
+    for tile, (src, dst), axis_weights in zip(tiles, crops, weights):
+        w = np.ones((1,) * len(shape))
+        for i, aw in enumerate(axis_weights):
+            w = w * aw.reshape([-1 if j == i else 1 for j in range(len(shape))])
+
+        values = (tile if output is None else np.asarray(tile[output]))[src]
+        acc[dst] += w * values
+        weight_sum[dst] += w
+        if seam_tolerance is not None:
+            lower[dst] = np.minimum(lower[dst], values)
+            upper[dst] = np.maximum(upper[dst], values)
+
+    if seam_tolerance is not None:
+        seam = float((upper - lower).max())
+        if seam > seam_tolerance:
+            warnings.warn(
+                f"Overlapping tiles differ by up to {seam:.3g} (seam tolerance: {seam_tolerance}) in output block "
+                f"{block_idx}. Consider a larger halo."
+            )
+
+    return (acc / weight_sum).astype(dtype, copy=False)
+
+
+def _nested_keys(name: str, block_ranges: Sequence[range], prefix: Tuple[int, ...] = ()) -> Union[List, Tuple]:
+    if not block_ranges:
+        return (name,) + prefix
+
+    return [_nested_keys(name, block_ranges[1:], prefix + (i,)) for i in block_ranges[0]]
+
+
+def tiled_map(
+    func: Callable[[np.ndarray], Any],
+    data: Union[np.ndarray, da.Array],
+    window: Sequence[int],
+    step: Sequence[int],
+    out_to_in: Sequence[int],
+    out_block: Sequence[int],
+    out_roi: Sequence[Tuple[int, int]],
+    dtype,
+    name: str,
+) -> da.Array:
+    """Map `func` over overlapping windows of `data` with a graph of one task per tile.
+
+    Instead of `pad -> chunk -> overlap -> blockwise -> slice -> rechunk` layers this builds a single graph layer
+    of tile tasks (plus one key for numpy `data` or the blocks of dask `data`). Each task cuts its window from
+    `data` (gathering neighboring blocks of dask arrays), applies `func` and crops the result to its part of the
+    final output, such that no further slicing or rechunking is needed.
+
+    Args:
+        func: function applied to each window; returns an output block of shape `out_block`
+        data: (padded) input, such that windows at multiples of `step` cover it
+        window: window shape
+        step: distance between windows (per input axis)
+        out_to_in: input axis index of each output axis
+        out_block: output block shape (per output axis) of each window
+        out_roi: region to trim off the concatenated output blocks (per output axis and side)
+        dtype: output dtype
+        name: graph layer name prefix
+    """
+    grid = _get_grid(data, window, step, out_to_in, out_block, out_roi)
+    out_name = f"{name}-{tokenize(func, _get_data_token(data), window, step, out_to_in, out_block, out_roi)}"
+    dsk, dependencies, get_tile_task = _init_tile_graph(func, data, window, step, out_name)
+    tiles, crops = grid.tile_indices().tolist(), grid.crops().tolist()
+    for out_idx, tile, crop in zip(np.ndindex(*grid.blocks_shape), tiles, crops):
+        dsk[(out_name,) + out_idx] = get_tile_task(tile, tuple(slice(c0, c1) for c0, c1 in crop))
+
+    graph = HighLevelGraph.from_collections(out_name, dsk, dependencies=dependencies)
+    return da.Array(
+        graph, out_name, chunks=grid.output_chunks, dtype=dtype, meta=np.empty((0,) * len(out_block), dtype=dtype)
+    )
+
+
+def blended_tiled_map(
+    func: Callable[[np.ndarray], Any],
+    data: Union[np.ndarray, da.Array],
+    window: Sequence[int],
+    step: Sequence[int],
+    out_to_in: Sequence[int],
+    out_block: Sequence[int],
+    out_margin: Sequence[Tuple[int, int]],
+    out_roi: Sequence[Tuple[int, int]],
+    dtype,
+    name: str,
+    blending: str = "cosine",
+    seam_tolerance: Optional[float] = None,
+) -> da.Array:
+    """Like `tiled_map`, but tile outputs overlap by `out_margin` and are blended instead of cropped.
+
+    Each tile's output (an output block of shape `out_block` extended by `out_margin` on both sides) is weighted by
+    a window tapering off towards the tile borders. Each block of the final output is the weighted average of all
+    tile outputs overlapping it, such that the less reliable tile borders contribute less.
+
+    Args:
+        func: function applied to each window; returns an output block of shape `out_block` plus `out_margin`
+        data: (padded) input, such that windows at multiples of `step` cover it
+        window: window shape
+        step: distance between windows (per input axis)
+        out_to_in: input axis index of each output axis
+        out_block: output block shape (per output axis) of each window without margin
+        out_margin: additional output of each window to blend with neighboring tiles (per output axis and side)
+        out_roi: region to trim off the concatenated output blocks (per output axis and side)
+        dtype: output dtype
+        name: graph layer name prefix
+        blending: blending window; 'cosine' (Hann window) or 'gaussian'
+        seam_tolerance: if given, warn if overlapping tile outputs differ by more than this value
+    """
+    assert len(out_margin) == len(out_block)
+    grid = _get_grid(data, window, step, out_to_in, out_block, out_roi)
+    out_name = (
+        f"{name}-"
+        f"{tokenize(func, _get_data_token(data), window, step, out_to_in, out_block, out_margin, out_roi, blending)}"
+    )
+    tile_name = f"tile-{out_name}"  # only blocks of the final output count as tiles of `out_name` (for progress)
+    dsk, dependencies, get_tile_task = _init_tile_graph(func, data, window, step, out_name)
+    dsk.update(
+        _get_blend_tasks(
+            grid,
+            out_to_in,
+            out_block,
+            out_margin,
+            blending,
+            dtype,
+            seam_tolerance,
+            out_name,
+            tile_name,
+            dsk,
+            get_tile_task,
+        )
+    )
+    graph = HighLevelGraph.from_collections(out_name, dsk, dependencies=dependencies)
+    return da.Array(
+        graph, out_name, chunks=grid.output_chunks, dtype=dtype, meta=np.empty((0,) * len(out_block), dtype=dtype)
+    )
+
+
+def _get_blend_tasks(
+    grid: TileGrid,
+    out_to_in: Sequence[int],
+    out_block: Sequence[int],
+    out_margin: Sequence[Tuple[int, int]],
+    blending: str,
+    dtype,
+    seam_tolerance: Optional[float],
+    out_name: str,
+    tile_name: str,
+    tile_dsk: Dict[Any, Any],
+    get_tile_task: Callable[[Sequence[int], Optional[Tuple[slice, ...]]], tuple],
+    output: Optional[int] = None,
+) -> Dict[Any, Any]:
+    """tasks blending the output blocks of `out_name` from overlapping tiles (missing tiles are added to `tile_dsk`)"""
+    axis_weights = [
+        get_blending_window(blending, block + m0 + m1) if m0 or m1 else np.ones(block)
+        for block, (m0, m1) in zip(out_block, out_margin)
+    ]
+    # per output axis and output block: overlapping tiles with crops of their outputs, block crops and weights
+    contributions: List[List[List[Tuple[int, slice, slice, np.ndarray]]]] = []
+    for in_axis, kept, block, (m0, m1), aw in zip(out_to_in, grid.kept, out_block, out_margin, axis_weights):
+        starts = kept[:, 0] * block + kept[:, 1]
+        stops = kept[:, 0] * block + kept[:, 2]
+        # tile t covers [t * block - m0, (t + 1) * block + m1)
+        first_tiles = np.maximum((starts - m1) // block, 0)
+        last_tiles = np.minimum(-(-(stops + m0) // block), grid.n_tiles[in_axis])
+        axis_contributions = []
+        for start, stop, first, last in zip(starts.tolist(), stops.tolist(), first_tiles.tolist(), last_tiles.tolist()):
+            block_contributions = []
+            for tt in range(first, last):
+                tile_start = tt * block - m0
+                src_start, src_stop = max(start, tile_start), min(stop, (tt + 1) * block + m1)
+                if src_start < src_stop:
+                    src = slice(src_start - tile_start, src_stop - tile_start)
+                    block_contributions.append((tt, src, slice(src_start - start, src_stop - start), aw[src]))
+
+            axis_contributions.append(block_contributions)
+
+        contributions.append(axis_contributions)
+
+    dsk: Dict[Any, Any] = {}
+    for out_idx in np.ndindex(*grid.blocks_shape):
+        tile_keys, crops, weights = [], [], []
+        for contribution in itertools.product(*[c[i] for c, i in zip(contributions, out_idx)]):
+            tile = [0] * len(grid.n_tiles)
+            for in_axis, (tt, _, _, _) in zip(out_to_in, contribution):
+                tile[in_axis] = tt
+
+            tile_key = (tile_name,) + tuple(tile)
+            if tile_key not in tile_dsk:
+                tile_dsk[tile_key] = get_tile_task(
+                    tile, None if output is not None else (slice(None),) * len(out_to_in)
+                )
+
+            tile_keys.append(tile_key)
+            crops.append((tuple(src for _, src, _, _ in contribution), tuple(dst for _, _, dst, _ in contribution)))
+            weights.append([w for _, _, _, w in contribution])
+
+        shape = tuple(int(k[i, 2] - k[i, 1]) for k, i in zip(grid.kept, out_idx))
+        dsk[(out_name,) + out_idx] = (
+            apply,
+            _blend_tiles,
+            [tile_keys, crops, weights, shape, np.dtype(dtype), seam_tolerance, out_idx, output],
+        )
+
+    return dsk
+
+
+def tiled_map_outputs(
+    func: Callable[[np.ndarray], Sequence[Any]],
+    data: Union[np.ndarray, da.Array],
+    window: Sequence[int],
+    step: Sequence[int],
+    out_to_in: Sequence[Sequence[int]],
+    out_block: Sequence[Sequence[int]],
+    out_roi: Sequence[Sequence[Tuple[int, int]]],
+    dtype: Sequence[Any],
+    name: str,
+    out_margin: Optional[Sequence[Sequence[Tuple[int, int]]]] = None,
+    blending: str = "cosine",
+    seam_tolerance: Optional[float] = None,
+) -> List[da.Array]:
+    """Like `tiled_map` (or `blended_tiled_map` if `out_margin` is given) for a `func` returning several outputs.
+
+    `func` runs once per tile; the blocks of each output are cropped from (or blended of) the tiles' outputs.
+    `out_to_in`, `out_block`, `out_roi`, `dtype` and `out_margin` are given per output.
+    """
+    token = tokenize(func, _get_data_token(data), window, step)
+    tile_name = f"tile-{name}-{token}"  # only output blocks count as tiles of `name` (for progress)
+    tile_dsk, dependencies, get_tile_task = _init_tile_graph(func, data, window, step, tile_name)
+    outputs = []
+    for i, (oti, block, roi, dt) in enumerate(zip(out_to_in, out_block, out_roi, dtype)):
+        grid = _get_grid(data, window, step, oti, block, roi)
+        margin = None if out_margin is None else out_margin[i]
+        out_name = f"{name}-{tokenize(token, i, oti, block, roi, margin, blending)}"
+        if margin is None:
+            dsk: Dict[Any, Any] = {}
+            for out_idx, tile, crop in zip(
+                np.ndindex(*grid.blocks_shape), grid.tile_indices().tolist(), grid.crops().tolist()
+            ):
+                tile_key = (tile_name,) + tuple(tile)
+                if tile_key not in tile_dsk:
+                    tile_dsk[tile_key] = get_tile_task(tile, None)
+
+                dsk[(out_name,) + out_idx] = (_crop_output, tile_key, i, tuple(slice(c0, c1) for c0, c1 in crop))
+        else:
+            dsk = _get_blend_tasks(
+                grid, oti, block, margin, blending, dt, seam_tolerance, out_name, tile_name, tile_dsk, get_tile_task, i
+            )
+
+        outputs.append((out_name, dsk, grid, dt, len(block)))
+
+    # all outputs depend on the same layer of tile tasks
+    tiles_graph = HighLevelGraph.from_collections(tile_name, tile_dsk, dependencies=dependencies)
+    ret = []
+    for out_name, dsk, grid, dt, ndim in outputs:
+        graph = HighLevelGraph(
+            {**tiles_graph.layers, out_name: dsk}, {**tiles_graph.dependencies, out_name: {tile_name}}
+        )
+        ret.append(da.Array(graph, out_name, chunks=grid.output_chunks, dtype=dt, meta=np.empty((0,) * ndim, dtype=dt)))
+
+    return ret
+
+
+def _get_grid(
+    data: Union[np.ndarray, da.Array],
+    window: Sequence[int],
+    step: Sequence[int],
+    out_to_in: Sequence[int],
+    out_block: Sequence[int],
+    out_roi: Sequence[Tuple[int, int]],
+) -> TileGrid:
+    return get_tile_grid(
+        tuple(data.shape),
+        tuple(int(w) for w in window),
+        tuple(int(st) for st in step),
+        tuple(int(i) for i in out_to_in),
+        tuple(int(b) for b in out_block),
+        tuple((int(r0), int(r1)) for r0, r1 in out_roi),
+    )
+
+
+def _get_data_token(data: Union[np.ndarray, da.Array]) -> str:
+    # avoid hashing (potentially huge) numpy inputs
+    return data.name if isinstance(data, da.Array) else uuid.uuid4().hex
+
+
+def _init_tile_graph(
+    func: Callable, data: Union[np.ndarray, da.Array], window: Sequence[int], step: Sequence[int], out_name: str
+) -> Tuple[Dict[Any, Any], List[da.Array], Callable[[Sequence[int], Optional[Tuple[slice, ...]]], tuple]]:
+    """graph with the keys of `func` and numpy `data`, and a factory of tile tasks (cutting a window from `data`)
+
+    Tile tasks crop the output of `func` unless their crop is None (e.g. for `func`s returning several outputs).
+    """
+    func_key = (f"{out_name}-func",)
+    dsk: Dict[Any, Any] = {func_key: func}
+    dependencies = []
+    if isinstance(data, da.Array):
+        dependencies.append(data)
+        block_starts = [np.cumsum((0,) + c[:-1]) for c in data.chunks]
+        block_stops = [np.cumsum(c) for c in data.chunks]
+    else:
+        data_key = (f"{out_name}-input",)
+        dsk[data_key] = data
+
+    def get_tile_task(tile: Sequence[int], crop: Optional[Tuple[slice, ...]]) -> tuple:
+        starts = [t * st for t, st in zip(tile, step)]
+        if isinstance(data, da.Array):
+            block_ranges = [
+                range(int(np.searchsorted(stops, s, "right")), int(np.searchsorted(bstarts, s + w, "left")))
+                for s, w, bstarts, stops in zip(starts, window, block_starts, block_stops)
+            ]
+            offsets = [int(bstarts[r.start]) for r, bstarts in zip(block_ranges, block_starts)]
+            window_slices = tuple(slice(s - o, s - o + w) for s, o, w in zip(starts, offsets, window))
+            return (apply, _run_gathered_tile, [func_key, _nested_keys(data.name, block_ranges), window_slices, crop])
+        else:
+            window_slices = tuple(slice(s, s + w) for s, w in zip(starts, window))
+            return (apply, _run_tile, [func_key, data_key, window_slices, crop])
+
+    return dsk, dependencies, get_tile_task
@@ -1,2 +1,3 @@
 from ._demo import hello
 from ._inference import inference_with_dask
+from ._inference_tiled import inference_tiled
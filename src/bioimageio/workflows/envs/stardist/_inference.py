@@ -6,6 +6,7 @@ from pathlib import Path
 from typing import Dict, IO, List, Optional, Tuple, Union
 
 import xarray as xr
+from csbdeep.utils.tf import keras_import
 from stardist import import_bioimageio as stardist_import_bioimageio
 
 from bioimageio.core import export_resource_package, load_resource_description
@@ -15,6 +16,23 @@ from bioimageio.core.resource_io.nodes import Model
 from bioimageio.spec.model import raw_nodes
 from bioimageio.spec.shared.common import AXIS_LETTER_TO_NAME, AXIS_NAME_TO_LETTER
 from bioimageio.spec.shared.raw_nodes import ResourceDescription as RawResourceDescription
+from bioimageio.workflows.utils import (
+    CancellationToken,
+    get_cancellation_token,
+    load_cached_raw_resource_description,
+    raise_if_cancelled,
+)
+
+
+def _get_keras_cancellation_callback(token: CancellationToken):
+    """keras callback to abort a (tiled) stardist prediction between tiles once `token` is cancelled"""
+    Callback = keras_import("callbacks", "Callback")
+
+    class CancellationCallback(Callback):
+        def on_predict_batch_begin(self, batch, logs=None):
+            token.raise_if_cancelled()
+
+    return CancellationCallback()
 
 
 async def stardist_prediction_2d(
@@ -70,7 +88,8 @@ async def stardist_prediction_2d(
         import_dir = Path(tmp_dir) / "import_dir"
         imported_stardist_model = stardist_import_bioimageio(package_path, import_dir)
 
-    model = load_resource_description(package_path)
+    raise_if_cancelled()
+    model = load_resource_description(load_cached_raw_resource_description(package_path, update_to_format="latest"))
     assert isinstance(model, Model)
     if len(model.inputs) != 1:
         raise NotImplementedError("Multiple inputs for stardist models not yet implemented")
@@ -107,10 +126,13 @@ async def stardist_prediction_2d(
         warnings.warn(f"translated tile {tile} to n_tiles: {n_tiles} for stardist library.")
 
     img = preprocessed_input.transpose(*input_axis_order).to_numpy()
+    raise_if_cancelled()
+    token = get_cancellation_token()
     labels, polys = imported_stardist_model.predict_instances(
         img,
         axes="".join([{"b": "S"}.get(a[0], a[0].capitalize()) for a in model.inputs[0].axes]),
         n_tiles=n_tiles,
+        predict_kwargs={} if token is None else dict(callbacks=[_get_keras_cancellation_callback(token)]),
     )
 
     if len(labels.shape) == 2:  # batch dim got squeezed
@@ -1,4 +1,5 @@
 from ._assert import assert_shape
+from ._elementwise import binarize, cast, scale_linear
 from ._generate import generate_random_uniform_tensor
-from ._run import run_workflow
-from ._various import binarize, load_tensors, log, select_outputs
+from ._run import WorkflowPlan, compile_workflow, run_workflow
+from ._various import load_tensors, log, select_outputs
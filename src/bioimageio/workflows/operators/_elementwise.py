@@ -0,0 +1,115 @@
+import functools
+import inspect
+from typing import Any, Callable, Dict, Sequence, Tuple, Union
+
+import dask.array as da
+import numpy as np
+import xarray as xr
+
+ELEMENTWISE_BLOCK_SIZE = 2**16  # elements per block when applying elementwise ops to numpy arrays (fits L2 caches)
+
+ElementwiseChain = Sequence[Tuple["ElementwiseOp", Dict[str, Any]]]
+
+
+class ElementwiseOp:
+    """An operator applied element by element.
+
+    The wrapped kernel takes a numpy array, the op's options and `inplace`. It may only write to its input if `inplace`
+    and must otherwise return a new array. Consecutive elementwise workflow steps are fused by `run_workflow` into a
+    single pass over the data (see `apply_elementwise`).
+    """
+
+    def __init__(self, kernel: Callable[..., np.ndarray]):
+        self.kernel = kernel
+        self._signature = inspect.signature(kernel)
+        functools.update_wrapper(self, kernel)
+
+    def __call__(self, tensor: Union[np.ndarray, xr.DataArray], *args, **options) -> Union[np.ndarray, xr.DataArray]:
+        # options may be given positionally as well, e.g. `binarize(tensor, 0.5)`
+        arguments = self._signature.bind(tensor, *args, **options).arguments
+        tensor_name = next(iter(self._signature.parameters))
+        return apply_elementwise(tensor, [(self, {k: v for k, v in arguments.items() if k != tensor_name})])
+
+
+def elementwise(kernel: Callable[..., np.ndarray]) -> ElementwiseOp:
+    return ElementwiseOp(kernel)
+
+
+def _apply_chain(x: np.ndarray, chain: ElementwiseChain, inplace: bool) -> np.ndarray:
+    for op, options in chain:
+        x = op.kernel(x, inplace=inplace, **options)
+        inplace = True  # intermediates are owned by the chain
+
+    return x
+
+
+def _apply_chain_blockwise(x: np.ndarray, chain: ElementwiseChain, inplace: bool = False) -> np.ndarray:
+    """apply `chain` in cache sized blocks, such that intermediates never leave the cache"""
+    if x.size <= ELEMENTWISE_BLOCK_SIZE or not x.flags.c_contiguous:
+        return _apply_chain(x, chain, inplace)
+
+    out_dtype = _apply_chain(np.zeros((1,), dtype=x.dtype), chain, False).dtype
+    inplace = inplace and out_dtype == x.dtype and x.flags.writeable
+    out = x if inplace else np.empty(x.shape, dtype=out_dtype)
+    flat_x = x.reshape(-1)
+    flat_out = out.reshape(-1)
+    for start in range(0, x.size, ELEMENTWISE_BLOCK_SIZE):
+        block = slice(start, start + ELEMENTWISE_BLOCK_SIZE)
+        result = _apply_chain(flat_x[block], chain, inplace)
+        if not (inplace and np.may_share_memory(result, flat_out[block])):
+            flat_out[block] = result
+
+    return out
+
+
+def apply_elementwise(
+    tensor: Union[np.ndarray, xr.DataArray], chain: ElementwiseChain, inplace: bool = False
+) -> Union[np.ndarray, xr.DataArray]:
+    """apply a chain of elementwise ops and their options in a single pass
+
+    Dask arrays are mapped block by block (one task per block for the whole chain), numpy arrays are processed in
+    cache sized blocks.
+
+    Args:
+        tensor: input tensor
+        chain: elementwise ops with their options to apply one after the other
+        inplace: If true (and the output dtype matches) the (numpy) input is overwritten with the result.
+    """
+    if not chain:
+        return tensor
+
+    data = tensor.data if isinstance(tensor, xr.DataArray) else tensor
+    if isinstance(data, da.Array):
+        out_dtype = _apply_chain(np.zeros((1,), dtype=data.dtype), chain, False).dtype
+        result = data.map_blocks(_apply_chain_blockwise, chain, dtype=out_dtype)
+    else:
+        result = _apply_chain_blockwise(np.asarray(data), chain, inplace)
+
+    if isinstance(tensor, xr.DataArray):
+        return tensor.copy(deep=False, data=result)
+    else:
+        return result
+
+
+@elementwise
+def binarize(tensor: np.ndarray, threshold: float, *, inplace: bool = False) -> np.ndarray:
+    return tensor > threshold
+
+
+@elementwise
+def scale_linear(
+    tensor: np.ndarray, gain: Union[int, float] = 1, offset: Union[int, float] = 0, *, inplace: bool = False
+) -> np.ndarray:
+    """scale a tensor linearly: `tensor * gain + offset`"""
+    if inplace and np.result_type(tensor, gain, offset) == tensor.dtype:
+        tensor *= gain
+        tensor += offset
+        return tensor
+    else:
+        return tensor * gain + offset
+
+
+@elementwise
+def cast(tensor: np.ndarray, dtype: str, *, inplace: bool = False) -> np.ndarray:
+    """cast a tensor to `dtype`"""
+    return tensor.astype(dtype, copy=not inplace)
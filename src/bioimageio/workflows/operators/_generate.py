@@ -1,15 +1,86 @@
-from typing import Sequence, Union
+from os import PathLike
+from typing import Optional, Sequence, Tuple, Union
 
+import dask.array as da
 import numpy as np
 import xarray as xr
 
+from bioimageio.workflows.utils import load_tensor, save_tensor
+
+
+def _uniform_block(
+    low: Union[int, float],
+    high: Union[int, float],
+    entropy: int,
+    dtype: str,
+    block_info=None,
+) -> np.ndarray:
+    info = block_info[None]
+    rng = np.random.default_rng(np.random.SeedSequence(entropy, spawn_key=tuple(info["chunk-location"])))
+    return _uniform(rng, info["chunk-shape"], low, high, dtype)
+
+
+def _uniform(
+    rng: np.random.Generator, shape: Tuple[int, ...], low: Union[int, float], high: Union[int, float], dtype: str
+) -> np.ndarray:
+    ret = rng.random(shape, dtype=dtype)
+    ret *= high - low
+    ret += low
+    # scaled samples may round up to `high`
+    np.minimum(ret, np.nextafter(np.array(high, dtype=dtype), np.array(low, dtype=dtype)), out=ret)
+    return ret
+
 
 def generate_random_uniform_tensor(
-    shape: Sequence[Union[int, str]], axes: Sequence[str], *, low: Union[int, float] = 0, high: Union[int, float] = 1
+    shape: Sequence[Union[int, str]],
+    axes: Sequence[str],
+    *,
+    low: Union[int, float] = 0,
+    high: Union[int, float] = 1,
+    seed: Optional[int] = None,
+    chunks: Union[None, str, Sequence[int]] = None,
+    dtype: str = "float64",
+    output_path: Optional[Union[str, PathLike]] = None,
 ) -> xr.DataArray:
     """generate a tensor with uniformly distributed samples in the interval [low, high)
+
+    Args:
+        shape: tensor shape
+        axes: tensor axes
+        low: lower bound
+        high: upper bound (exclusive)
+        seed: seed for reproducible output (for given `chunks`). Defaults to a seed drawn from the global numpy
+            random state (such that `np.random.seed` makes the output reproducible as well).
+        chunks: If given, the tensor is a lazy dask array of these chunks ('auto' for dask's default). Each chunk
+            is generated independently (in parallel) from its own random stream derived from `seed` and its
+            chunk location.
+        dtype: 'float32' or 'float64'
+        output_path: If given, the (chunked) tensor is written to this '.npy' (or '.zarr', etc.) file block by block
+            and returned memory mapped (or lazily loaded).
+
     Returns:
         xr.DataArray: random tensor
     """
     assert len(shape) == len(axes)
-    return xr.DataArray(np.random.uniform(low=low, high=high, size=[int(s) for s in shape]), dims=tuple(axes))
+    shape = [int(s) for s in shape]
+    # draw entropy once if no seed is given, such that all chunks derive from the same seed sequence
+    entropy = int(np.random.randint(2**63, dtype=np.int64)) if seed is None else seed
+    if chunks is None and output_path is None:
+        return xr.DataArray(_uniform(np.random.default_rng(entropy), tuple(shape), low, high, dtype), dims=tuple(axes))
+
+    data = da.map_blocks(
+        _uniform_block,
+        low,
+        high,
+        entropy,
+        dtype,
+        chunks=da.core.normalize_chunks("auto" if chunks is None else chunks, shape, dtype=dtype),
+        dtype=dtype,
+        meta=np.empty((0,) * len(shape), dtype=dtype),
+    )
+    tensor = xr.DataArray(data, dims=tuple(axes))
+    if output_path is None:
+        return tensor
+
+    save_tensor(output_path, tensor)
+    return load_tensor(output_path, axes)
@@ -1,32 +1,229 @@
-from dataclasses import dataclass
+import asyncio
+import inspect
+import threading
+import weakref
+from collections import OrderedDict as OrderedDictType
+from dataclasses import dataclass, field
 from os import PathLike
-from typing import Any, Dict, IO, OrderedDict, Sequence, Union
+from types import ModuleType
+from typing import Any, Callable, Dict, IO, Iterator, List, Optional, OrderedDict, Sequence, Tuple, Union
 
+import numpy as np
 import xarray as xr
 from marshmallow import missing
 
 import bioimageio.workflows
-from bioimageio.core import load_resource_description
-from bioimageio.core.resource_io import nodes
-from bioimageio.spec import load_raw_resource_description
+from bioimageio.spec import serialize_raw_resource_description_to_dict
 from bioimageio.spec.model import raw_nodes
 from bioimageio.spec.shared.raw_nodes import ResourceDescription as RawResourceDescription
 from bioimageio.spec.workflow.raw_nodes import Workflow
 from bioimageio.workflows import CURRENT_VERSION, Version
+from bioimageio.workflows.operators._elementwise import ElementwiseOp, apply_elementwise
+from bioimageio.workflows.utils import ProgressTracker, load_cached_raw_resource_description
 
-try:
-    from typing import Literal
-except ImportError:
-    from typing_extensions import Literal
 
+@dataclass
+class WorkflowState:
+    wf_inputs: Dict[str, Any]
+    wf_options: Dict[str, Any]
+    inputs: Tuple[Any, ...]
+    outputs: Tuple[Any, ...]
+    named_outputs: Dict[str, Any]
 
-def run_workflow(
+
+@dataclass(frozen=True)
+class _Slot:
+    """reference to a workflow input, option or named step output of a run by its index"""
+
+    index: int
+
+
+@dataclass(frozen=True)
+class _PlanStep:
+    ops: Tuple[Callable, ...]  # a single op or a chain of fused elementwise ops
+    options: Tuple[Tuple[Tuple[str, Any], ...], ...]  # options (constants or `_Slot`s) of each op
+    inputs: Optional[Tuple[Any, ...]]  # constants or `_Slot`s; None for the outputs of the previous step
+    output_slots: Tuple[int, ...]  # slots of named outputs
+    n_steps: int  # number of workflow steps compiled into this step
+    elementwise: bool
+    description: str  # for error messages
+
+
+class _OpLoop:
+    """event loop in a daemon thread (started on first use) to run all async ops of a plan
+
+    Reusing one loop keeps per-loop resources (e.g. server connections) alive across steps and runs, and allows to run
+    a plan from within a running event loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def __reduce__(self):
+        return _OpLoop, ()  # the loop is not transferred (e.g. to other processes)
+
+    def run(self, awaitable) -> Any:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=_run_loop, args=(self._loop,), name="bioimageio-workflow-ops", daemon=True
+                ).start()
+                weakref.finalize(self, self._loop.call_soon_threadsafe, self._loop.stop)
+
+        # the caller's context (e.g. progress callback and cancellation token) is passed on to the op
+        return asyncio.run_coroutine_threadsafe(_await(awaitable), self._loop).result()
+
+
+def _run_loop(loop: asyncio.AbstractEventLoop):
+    """run `loop` until it is stopped (when its `_OpLoop` is garbage collected), then close it"""
+    try:
+        loop.run_forever()
+        loop.run_until_complete(loop.shutdown_asyncgens())
+    finally:
+        loop.close()
+
+
+@dataclass(frozen=True)
+class WorkflowPlan:
+    """A validated workflow with resolved ops and references, see `compile_workflow`.
+
+    Inputs, options and named step outputs of a run are held in a list of slots, referenced by their index.
+    """
+
+    workflow_id: str
+    input_names: Tuple[str, ...]
+    option_names: Tuple[str, ...]
+    default_options: Tuple[Any, ...]
+    outputs: Tuple[Tuple[str, str, Optional[Tuple[str, ...]]], ...]  # name, type and (tensor) axes of each output
+    steps: Tuple[_PlanStep, ...]
+    named_output_refs: Tuple[str, ...]  # reference names ('<step id>.outputs.<name>') of named output slots
+    n_steps: int
+    func: Optional[Callable] = None  # workflow function to call directly (for workflows without steps or remote runs)
+    _op_loop: _OpLoop = field(default_factory=_OpLoop, init=False, repr=False, compare=False)
+
+    def run(
+        self, inputs: Union[Sequence, Dict[str, Any]] = tuple(), options: Dict[str, Any] = None
+    ) -> OrderedDict[str, Any]:
+        """run the workflow with `inputs` and `options`"""
+        if isinstance(inputs, dict):
+            inputs = [inputs[name] for name in self.input_names]
+
+        if self.func is None:
+            slots = self._get_slots(inputs, options)
+            outputs: Tuple[Any, ...] = tuple(inputs)
+            for _, outputs in self._run_steps(slots):
+                pass
+        else:
+            outputs = _call_op(self.func, tuple(inputs), options or {}, self._op_loop)
+
+        if len(self.outputs) != len(outputs):
+            raise ValueError(f"Expected {len(self.outputs)} outputs, but got {len(outputs)}.")
+
+        return OrderedDictType(
+            (name, _tensor_as_xr(out, axes) if out_type == "tensor" else out)
+            for (name, out_type, axes), out in zip(self.outputs, outputs)
+        )
+
+    def iterate(self, inputs: Sequence = (), options: Dict[str, Any] = None) -> Iterator[WorkflowState]:
+        """run the workflow step by step (consecutive elementwise steps are fused into one)"""
+        slots = self._get_slots(inputs, options)
+        n_inputs = len(self.input_names)
+        n_fixed = n_inputs + len(self.option_names)
+        for step_inputs, outputs in self._run_steps(slots):
+            yield WorkflowState(
+                wf_inputs=dict(zip(self.input_names, slots[:n_inputs])),
+                wf_options=dict(zip(self.option_names, slots[n_inputs:n_fixed])),
+                inputs=step_inputs,
+                outputs=outputs,
+                named_outputs={ref: v for ref, v in zip(self.named_output_refs, slots[n_fixed:]) if v is not _UNSET},
+            )
+
+    def _get_slots(self, inputs: Sequence, options: Optional[Dict[str, Any]]) -> List[Any]:
+        if len(self.input_names) != len(inputs):
+            raise ValueError(f"Expected {len(self.input_names)} inputs, but got {len(inputs)}.")
+
+        wf_options = list(self.default_options)
+        for k, v in (options or {}).items():
+            if k not in self.option_names:
+                raise ValueError(f"Got unknown option {k}, expected one of {set(self.option_names)}.")
+
+            wf_options[self.option_names.index(k)] = v
+
+        return [*inputs, *wf_options, *([_UNSET] * len(self.named_output_refs))]
+
+    def _run_steps(self, slots: List[Any]) -> Iterator[Tuple[Tuple[Any, ...], Tuple[Any, ...]]]:
+        progress = ProgressTracker("steps", total=self.n_steps, min_interval=0)
+        # implicit inputs to a step are the outputs of the previous step.
+        # For the first step these are the workflow inputs.
+        outputs = tuple(slots[: len(self.input_names)])
+        outputs_are_intermediate = False  # outputs of a previous step that are not referenced by name
+        for step in self.steps:
+            if step.inputs is None:
+                step_inputs = outputs
+            else:
+                step_inputs = tuple(_resolve(ipt, slots) for ipt in step.inputs)
+
+            if step.elementwise and len(step_inputs) == 1:
+                chain = [(op, {k: _resolve(v, slots) for k, v in opts}) for op, opts in zip(step.ops, step.options)]
+                inplace = (
+                    step.inputs is None
+                    and outputs_are_intermediate
+                    and _is_disposable(step_inputs[0], [v for v in slots if v is not _UNSET])
+                )
+                outputs = (apply_elementwise(step_inputs[0], chain, inplace=inplace),)
+            else:
+                # fused elementwise steps of multiple inputs are run one by one
+                outputs = step_inputs
+                for op, opts in zip(step.ops, step.options):
+                    outputs = _call_op(op, outputs, {k: _resolve(v, slots) for k, v in opts}, self._op_loop)
+
+            outputs_are_intermediate = not step.output_slots
+            if step.output_slots:
+                if len(step.output_slots) != len(outputs):
+                    n = len(step.output_slots)
+                    raise ValueError(
+                        f"Got {n} step output name{'s' if n > 1 else ''} ({step.description}), "
+                        f"but op returned {len(outputs)} outputs."
+                    )
+
+                for slot, out in zip(step.output_slots, outputs):
+                    slots[slot] = out
+
+            progress.update(step.n_steps)
+            yield step_inputs, outputs
+
+
+_UNSET = object()  # marks named output slots of steps that did not run yet
+
+
+def _resolve(value: Any, slots: List[Any]) -> Any:
+    return slots[value.index] if isinstance(value, _Slot) else value
+
+
+def compile_workflow(
     workflow_rdf: Union[str, PathLike, dict, raw_nodes.URI, RawResourceDescription, IO, bytes],
-    inputs: Union[Sequence, Dict[str, Any]] = tuple(),
-    options: Dict[str, Any] = None,
-) -> OrderedDict[str, Any]:
-    """Run `workflow_rdf` with `inputs` and `options`."""
-    wf = load_raw_resource_description(workflow_rdf)
+    *,
+    test_steps: bool = False,
+    remote_env: Optional[str] = None,
+) -> WorkflowPlan:
+    """Load and validate `workflow_rdf` once into an immutable plan, that can be run repeatedly with new inputs.
+
+    Ops are resolved, `${{ ... }}` references are replaced by slot indices and consecutive elementwise steps are fused,
+    such that `plan.run(inputs, options)` (or `run_workflow(plan, inputs, options)`) only executes the steps.
+
+    Workflows of another bioimageio.workflows version than the current one are run as a whole by the 'default' env
+    submodule service of that version. Inputs are uploaded once, intermediate step outputs stay in the service process
+    and only the workflow outputs are returned.
+
+    Args:
+        workflow_rdf: workflow RDF to compile
+        test_steps: If true, compile the workflow's `test_steps` instead of its `steps`.
+        remote_env: If given, run the workflow as a whole by the submodule service of this env
+            (of the workflow's bioimageio.workflows version).
+    """
+    wf = load_cached_raw_resource_description(workflow_rdf)
     assert isinstance(wf, Workflow)
     wf_id = wf.id
     if wf_id.startswith("bioimageio/"):
@@ -42,117 +239,226 @@ def run_workflow(
     else:
         wf_version = CURRENT_VERSION  # default to current version
 
-    if wf_version == CURRENT_VERSION:
-        workflows = bioimageio.workflows
-    else:
-        raise NotImplementedError("ask hypha server to provide an appropriate env")
+    if wf_version != CURRENT_VERSION and remote_env is None:
+        remote_env = "default"
 
-    outputs = tuple()
-    for state in _iterate_workflow_steps_impl(rdf_source, test_steps=False, inputs=inputs, options=options):
-        outputs = state.outputs
+    if remote_env is not None:
+        if test_steps:
+            raise NotImplementedError("Running test steps of a workflow remotely")
 
-    return outputs
+        from bioimageio.workflows.server import RemoteWorkflow
 
-    workflow = load_resource_description(rdf_source)
-    assert isinstance(workflow, nodes.Workflow)
-    wf_options: Dict[str, Any] = {opt.name: opt.default for opt in workflow.options_spec}
-    if test_steps:
-        assert not inputs
-        assert not options
-        wf_inputs: Dict[str, Any] = {}
-        steps = workflow.test_steps
+        func = RemoteWorkflow(
+            serialize_raw_resource_description_to_dict(wf),
+            [out.name for out in wf.outputs],
+            env_name=remote_env,
+            version=None if wf_version == CURRENT_VERSION else wf_version,
+        )
+        return _get_function_plan(wf, func)
+
+    workflows = bioimageio.workflows
+    if test_steps or getattr(wf, "steps", None):
+        return _compile_workflow(wf, workflows, test_steps=test_steps)
     else:
-        if not len(workflow.inputs_spec) == len(inputs):
-            raise ValueError(f"Expected {len(workflow.inputs_spec)} inputs, but got {len(inputs)}.")
-
-        wf_inputs = {ipt_spec.name: ipt for ipt_spec, ipt in zip(workflow.inputs_spec, inputs)}
-        for k, v in options.items():
-            if k not in wf_options:
-                raise ValueError(f"Got unknown option {k}, expected one of {set(wf_options)}.")
-
-            wf_options[k] = v
-
-        steps = workflow.steps
-
-    named_outputs = {}  # for later referencing
-
-    def map_ref(value):
-        assert isinstance(workflow, nodes.Workflow)
-        if isinstance(value, str) and value.startswith("${{") and value.endswith("}}"):
-            ref = value[4:-2].strip()
-            if ref.startswith("self.inputs."):
-                ref = ref[len("self.inputs.") :]
-                if ref not in wf_inputs:
-                    raise ValueError(f"Invalid workflow input reference {value}.")
-
-                return wf_inputs[ref]
-            elif ref.startswith("self.options."):
-                ref = ref[len("self.options.") :]
-                if ref not in wf_options:
-                    raise ValueError(f"Invalid workflow option reference {value}.")
-
-                return wf_options[ref]
-            elif ref == "self.rdf_source":
-                assert workflow.rdf_source is not missing
-                return str(workflow.rdf_source)
-            elif ref in named_outputs:
-                return named_outputs[ref]
-            else:
-                raise ValueError(f"Invalid reference {value}.")
-        else:
+        return _get_function_plan(wf, getattr(workflows, wf_func_name))
+
+
+def _get_function_plan(workflow: Workflow, func: Callable) -> WorkflowPlan:
+    """plan of a workflow run by a single call of `func`"""
+    return WorkflowPlan(
+        workflow_id=workflow.id,
+        input_names=tuple(ipt.name for ipt in workflow.inputs),
+        option_names=tuple(opt.name for opt in workflow.options),
+        default_options=tuple(opt.default for opt in workflow.options),
+        outputs=_get_output_specs(workflow),
+        steps=(),
+        named_output_refs=(),
+        n_steps=0,
+        func=func,
+    )
+
+
+def _get_output_specs(workflow: Workflow) -> Tuple[Tuple[str, str, Optional[Tuple[str, ...]]], ...]:
+    return tuple(
+        (out.name, out.type, tuple(a.name or a.type for a in out.axes) if out.type == "tensor" else None)
+        for out in workflow.outputs
+    )
+
+
+def _compile_workflow(workflow: Workflow, workflows: ModuleType, *, test_steps: bool) -> WorkflowPlan:
+    input_names = () if test_steps else tuple(ipt.name for ipt in workflow.inputs)
+    option_names = tuple(opt.name for opt in workflow.options)
+    steps = workflow.test_steps if test_steps else workflow.steps
+    named_output_refs: List[str] = []
+    n_fixed = len(input_names) + len(option_names)
+    rdf_source = getattr(workflow, "rdf_source", missing)
+
+    def compile_ref(value):
+        if not (isinstance(value, str) and value.startswith("${{") and value.endswith("}}")):
             return value
 
-    # implicit inputs to a step are the outputs of the previous step.
-    # For the first step these are the workflow inputs.
-    outputs = tuple(inputs)
-    for step in steps:
-        if not hasattr(ops, step.op):
-            raise NotImplementedError(f"{step.op} not implemented in {ops}")
+        ref = value[3:-2].strip()
+        if ref.startswith("self.inputs."):
+            ref = ref[len("self.inputs.") :]
+            if ref not in input_names:
+                raise ValueError(f"Invalid workflow input reference {value}.")
 
-        op = getattr(ops, step.op)
-        if step.inputs is missing:
-            inputs = outputs
+            return _Slot(input_names.index(ref))
+        elif ref.startswith("self.options."):
+            ref = ref[len("self.options.") :]
+            if ref not in option_names:
+                raise ValueError(f"Invalid workflow option reference {value}.")
+
+            return _Slot(len(input_names) + option_names.index(ref))
+        elif ref == "self.rdf_source":
+            assert rdf_source is not missing
+            return str(rdf_source)
+        elif ref in named_output_refs:
+            return _Slot(n_fixed + named_output_refs.index(ref))
         else:
-            inputs = tuple(map_ref(ipt) for ipt in step.inputs)
+            raise ValueError(f"Invalid reference {value}.")
+
+    def compile_options(step) -> Tuple[Tuple[str, Any], ...]:
+        return tuple((k, compile_ref(v)) for k, v in (step.options or {}).items())
+
+    plan_steps: List[_PlanStep] = []
+    i = 0
+    while i < len(steps):
+        first = i
+        ops = [_get_op(steps[i].op, workflows)]
+        options = [compile_options(steps[i])]
+        inputs = None if steps[i].inputs is missing else tuple(compile_ref(ipt) for ipt in steps[i].inputs)
+        elementwise = isinstance(ops[0], ElementwiseOp)
+        if elementwise:
+            # fuse consecutive elementwise steps with implicit inputs; only the last one may have named outputs
+            while not steps[i].outputs and i + 1 < len(steps) and steps[i + 1].inputs is missing:
+                next_op = _get_op(steps[i + 1].op, workflows)
+                if not isinstance(next_op, ElementwiseOp):
+                    break
 
-        assert isinstance(inputs, tuple)
-        options = {k: map_ref(v) for k, v in (step.options or {}).items()}
-        outputs = op(*inputs, **options)
-        if not isinstance(outputs, tuple):
-            outputs = (outputs,)
+                i += 1
+                ops.append(next_op)
+                options.append(compile_options(steps[i]))
 
+        step = steps[i]
+        output_slots = []
         if step.outputs:
             assert step.id is not missing
-            if len(step.outputs) != len(outputs):
-                raise ValueError(
-                    f"Got {len(step.outputs)} step output name{'s' if len(step.outputs) > 1 else ''} ({step.id}.outputs), "
-                    f"but op {step.op} returned {len(outputs)} outputs."
-                )
-
-            named_outputs.update({f"{step.id}.outputs.{out_name}": out for out_name, out in zip(step.outputs, outputs)})
+            for out_name in step.outputs:
+                output_slots.append(n_fixed + len(named_output_refs))
+                named_output_refs.append(f"{step.id}.outputs.{out_name}")
 
-        yield WorkflowState(
-            wf_inputs=wf_inputs, wf_options=wf_options, inputs=inputs, outputs=outputs, named_outputs=named_outputs
+        plan_steps.append(
+            _PlanStep(
+                ops=tuple(ops),
+                options=tuple(options),
+                inputs=inputs,
+                output_slots=tuple(output_slots),
+                n_steps=i - first + 1,
+                elementwise=elementwise,
+                description=f"{step.id}.outputs" if step.id is not missing else step.op,
+            )
         )
-    if len(workflow.outputs_spec) != len(outputs):
-        raise ValueError(f"Expected {len(workflow.outputs_spec)} outputs from last step, but got {len(outputs)}.")
-
-    def tensor_as_xr(tensor, axes: Sequence[nodes.Axis]):
-        spec_axes = [a.name or a.type for a in axes]
-        if isinstance(tensor, xr.DataArray):
-            if list(tensor.dims) != spec_axes:
-                raise ValueError(
-                    f"Last workflow step returned xarray.DataArray with dims {tensor.dims}, but expected dims {spec_axes}."
-                )
+        i += 1
 
-            return tensor
-        else:
-            return xr.DataArray(tensor, dims=tuple(spec_axes))
-
-    outputs = tuple(
-        tensor_as_xr(out, out_spec.axes) if out_spec.type == "tensor" else out
-        for out_spec, out in zip(workflow.outputs_spec, outputs)
-    )
-    yield WorkflowState(
-        wf_inputs=wf_inputs, wf_options=wf_options, inputs=inputs, outputs=outputs, named_outputs=named_outputs
+    return WorkflowPlan(
+        workflow_id=getattr(workflow, "id", ""),
+        input_names=input_names,
+        option_names=option_names,
+        default_options=tuple(opt.default for opt in workflow.options),
+        outputs=_get_output_specs(workflow) if hasattr(workflow, "outputs") else (),
+        steps=tuple(plan_steps),
+        named_output_refs=tuple(named_output_refs),
+        n_steps=len(steps),
     )
+
+
+def run_workflow(
+    workflow_rdf: Union[str, PathLike, dict, raw_nodes.URI, RawResourceDescription, IO, bytes, WorkflowPlan],
+    inputs: Union[Sequence, Dict[str, Any]] = tuple(),
+    options: Dict[str, Any] = None,
+    *,
+    remote_env: Optional[str] = None,
+) -> OrderedDict[str, Any]:
+    """Run `workflow_rdf` with `inputs` and `options`.
+
+    Workflows with `steps` are run step by step, where consecutive elementwise steps are fused into a single pass over
+    the data. Otherwise the workflow function (named by the workflow id) is called directly.
+    Progress of the steps is reported to the current progress callback
+    (see `bioimageio.workflows.utils.progress_scope`).
+    To run the same workflow repeatedly, pass a plan compiled once with `compile_workflow`.
+    Workflows of other bioimageio.workflows versions are run by a submodule service of that version
+    (see `compile_workflow`), or by the submodule service of `remote_env` if given.
+    """
+    if isinstance(workflow_rdf, WorkflowPlan):
+        plan = workflow_rdf
+    else:
+        plan = compile_workflow(workflow_rdf, remote_env=remote_env)
+
+    return plan.run(inputs, options)
+
+
+def _call_op(op, inputs: Tuple[Any, ...], options: Dict[str, Any], op_loop: _OpLoop) -> Tuple[Any, ...]:
+    outputs = op(*inputs, **options)
+    if inspect.isawaitable(outputs):
+        outputs = op_loop.run(outputs)
+
+    if not isinstance(outputs, tuple):
+        outputs = (outputs,)
+
+    return outputs
+
+
+async def _await(awaitable):
+    return await awaitable
+
+
+def _tensor_as_xr(tensor, axes: Sequence[str]) -> xr.DataArray:
+    if isinstance(tensor, xr.DataArray):
+        if list(tensor.dims) != list(axes):
+            raise ValueError(
+                f"Last workflow step returned xarray.DataArray with dims {tensor.dims}, but expected dims {list(axes)}."
+            )
+
+        return tensor
+    else:
+        return xr.DataArray(tensor, dims=tuple(axes))
+
+
+def _get_op(name: str, workflows: ModuleType):
+    from bioimageio.workflows import operators
+
+    for module in (operators, workflows):
+        if hasattr(module, name):
+            return getattr(module, name)
+
+    raise NotImplementedError(f"{name} not implemented in {operators} or {workflows}")
+
+
+def _is_disposable(value: Any, referenced: Sequence[Any]) -> bool:
+    """an intermediate numpy array that may be overwritten, because it is not (part of) any `referenced` value"""
+    data = value.data if isinstance(value, xr.DataArray) else value
+    if not isinstance(data, np.ndarray) or not data.flags.owndata or not data.flags.writeable:
+        return False
+
+    for ref in referenced:
+        ref_data = ref.data if isinstance(ref, xr.DataArray) else ref
+        if isinstance(ref_data, np.ndarray) and np.may_share_memory(data, ref_data):
+            return False
+
+    return True
+
+
+def _iterate_workflow_steps_impl(
+    workflow: Workflow,
+    workflows: ModuleType,
+    *,
+    test_steps: bool,
+    inputs: Sequence = (),
+    options: Dict[str, Any] = None,
+) -> Iterator[WorkflowState]:
+    if test_steps:
+        assert not inputs
+        assert not options
+
+    yield from _compile_workflow(workflow, workflows, test_steps=test_steps).iterate(inputs, options)
@@ -1,15 +1,12 @@
 import logging
-from typing import List, Sequence, Tuple
+from typing import List, Optional, Sequence, Tuple
 
 import numpy as np
 import xarray as xr
-from imageio import imread
-
-logger = logging.getLogger(__name__)
 
+from bioimageio.workflows.utils import get_tensor_stats, load_tensors_concurrently
 
-def binarize(tensor: xr.DataArray, threshold: float):
-    return tensor > threshold
+logger = logging.getLogger(__name__)
 
 
 def select_outputs(*args) -> Tuple:
@@ -23,35 +20,53 @@ def select_outputs(*args) -> Tuple:
     return args
 
 
-def log(*args, log_level: int = logging.INFO, **kwargs) -> Tuple:
+def log(
+    *args,
+    log_level: int = logging.INFO,
+    percentiles: Sequence[float] = (),
+    max_samples: Optional[int] = None,
+    **kwargs,
+) -> Tuple:
     """log any key word arguments (kwargs/options)
 
+    Statistics of tensors (mean, std, min, max, nan count and `percentiles`) are computed in a single fused pass;
+    all dask-backed tensors together. Nothing is computed if `log_level` is disabled.
+
+    Args:
+        log_level: level to log at
+        percentiles: percentiles (0-100) of tensors to log
+        max_samples: compute tensor statistics on at most (roughly) this many evenly spaced samples
+
     Returns:
         tuple: positional inputs to this op
 
     """
+    if not logger.isEnabledFor(log_level):
+        return args
+
+    tensors = {k: v for k, v in kwargs.items() if isinstance(v, (np.ndarray, xr.DataArray))}
+    stats = get_tensor_stats(tensors, percentiles=percentiles, max_samples=max_samples)
     for k, v in kwargs.items():
-        logger.log(
-            log_level,
-            f"{k}: %s",
-            f"{v.shape} mean: {v.mean().item():.4f} std: {v.std().item():.4f}"
-            if isinstance(v, (np.ndarray, xr.DataArray))
-            else v,
-        )
+        if k in stats:
+            s = stats[k]
+            msg = f"{v.shape} mean: {s['mean']:.4f} std: {s['std']:.4f} min: {s['min']:.4f} max: {s['max']:.4f}"
+            msg += "".join(f" p{p:g}: {s[f'p{p:g}']:.4f}" for p in percentiles)
+            if s["nan_count"]:
+                msg += f" nan: {s['nan_count']}"
+        else:
+            msg = v
+
+        logger.log(log_level, f"{k}: %s", msg)
 
     return args
 
 
-def load_tensors(sources: List[str], axes: Sequence[str]) -> List[xr.DataArray]:
-    """load tensors"""
-    assert len(sources) == len(axes)
-    tensors = []
-    for source, ax in zip(sources, axes):
-        if source.split(".")[-1] == ".npy":
-            data = np.load(str(source))
-        else:
-            data = imread(source)
+def load_tensors(
+    sources: List[str], axes: Sequence[str], lazy: bool = True, max_workers: Optional[int] = None
+) -> List[xr.DataArray]:
+    """load tensors concurrently
 
-        tensors.append(xr.DataArray(data, dims=ax))
-
-    return tensors
+    '.npy' files are memory mapped, '.zarr' and tiff files are opened as dask arrays,
+    such that pixels are only read once a step needs them (unless `lazy` is false).
+    """
+    return load_tensors_concurrently(sources, axes, lazy=lazy, max_workers=max_workers)
@@ -1,2 +1,2 @@
-from ._client import RemoteSubmodule
+from ._client import RemoteSubmodule, RemoteWorkflow, get_remote_submodule
 from ._services import register_submodule_service, register_submodule_service_launcher
@@ -3,6 +3,7 @@ import asyncio
 from typing import Optional
 
 from bioimageio.workflows.server import register_submodule_service, register_submodule_service_launcher
+from bioimageio.workflows.server.env_vars import SERVICE_BATCH_WINDOW, SERVICE_MAX_BATCH_SIZE
 
 get_hypha_arg_parser: Optional[callable]
 try:
@@ -22,7 +23,12 @@ async def start_submodule_service_launcher(_):
 
 
 async def start_submodule_service(args):
-    await register_submodule_service(args.submodule_name)
+    await register_submodule_service(
+        args.submodule_name,
+        batch_window=args.batch_window,
+        max_batch_size=args.max_batch_size,
+        service_id=args.service_id,
+    )
 
 
 if __name__ == "__main__":
@@ -59,6 +65,20 @@ if __name__ == "__main__":
     parser_start_submodule_service.add_argument(
         metavar="submodule-name", dest="submodule_name", help="submodule name, e.g. 'stardist'"
     )
+    parser_start_submodule_service.add_argument(
+        "--batch-window",
+        type=float,
+        default=SERVICE_BATCH_WINDOW,
+        help="If > 0, batch concurrent calls to batchable workflow functions within this many seconds.",
+    )
+    parser_start_submodule_service.add_argument(
+        "--max-batch-size", type=int, default=SERVICE_MAX_BATCH_SIZE, help="Maximum number of calls to batch together."
+    )
+    parser_start_submodule_service.add_argument(
+        "--service-id",
+        default=None,
+        help="Service id to register the service under (default: the unversioned service name of the submodule).",
+    )
 
     args = parser.parse_args()
     loop = asyncio.get_event_loop()
@@ -0,0 +1,218 @@
+import asyncio
+import collections
+import collections.abc
+import functools
+import inspect
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import xarray as xr
+
+from bioimageio.workflows.server._utils import compute_tensors
+
+try:
+    from typing import get_args, get_origin
+except ImportError:
+    from typing_extensions import get_args, get_origin  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+BATCH_DIMS = ("b", "batch")
+
+
+class _TensorSlot:
+    def __init__(self, index: int, batch_dim: str):
+        self.index = index
+        self.batch_dim = batch_dim
+
+
+def _get_batch_dim(tensor: xr.DataArray) -> Optional[str]:
+    for d in BATCH_DIMS:
+        if d in tensor.dims:
+            return d
+
+    return None
+
+
+def _split_call(value: Any, tensors: List[xr.DataArray]) -> Any:
+    """replace batchable tensors in (nested) call arguments with `_TensorSlot`s"""
+    if isinstance(value, xr.DataArray):
+        batch_dim = _get_batch_dim(value)
+        if batch_dim is None:
+            return value
+
+        tensors.append(value)
+        return _TensorSlot(len(tensors) - 1, batch_dim)
+    elif isinstance(value, (list, tuple)):
+        return type(value)(_split_call(v, tensors) for v in value)
+    elif isinstance(value, dict):
+        return type(value)((k, _split_call(v, tensors)) for k, v in value.items())
+    else:
+        return value
+
+
+def _fill_call(template: Any, tensors: List[xr.DataArray]) -> Any:
+    if isinstance(template, _TensorSlot):
+        return tensors[template.index]
+    elif isinstance(template, (list, tuple)):
+        return type(template)(_fill_call(v, tensors) for v in template)
+    elif isinstance(template, dict):
+        return type(template)((k, _fill_call(v, tensors)) for k, v in template.items())
+    else:
+        return template
+
+
+def _freeze(value: Any) -> Any:
+    """hashable representation of call arguments to group compatible calls by"""
+    if isinstance(value, _TensorSlot):
+        return ("tensor", value.index, value.batch_dim)
+    elif isinstance(value, xr.DataArray):
+        return ("unbatched tensor", id(value))
+    elif isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    elif isinstance(value, dict):
+        return tuple((k, _freeze(v)) for k, v in sorted(value.items(), key=lambda kv: str(kv[0])))
+
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    else:
+        return value
+
+
+def _split_output(value: Any, sizes: List[int]) -> List[Any]:
+    """split a batched workflow output into outputs for each call"""
+    if isinstance(value, xr.DataArray):
+        batch_dim = _get_batch_dim(value)
+        if batch_dim is None:
+            raise ValueError(f"Cannot split output tensor without batch dimension (dims: {value.dims})")
+
+        starts = [sum(sizes[:i]) for i in range(len(sizes))]
+        return [value[{batch_dim: slice(s, s + n)}] for s, n in zip(starts, sizes)]
+    elif isinstance(value, (list, tuple)):
+        per_value = [_split_output(v, sizes) for v in value]
+        return [type(value)(pv[i] for pv in per_value) for i in range(len(sizes))]
+    elif isinstance(value, dict):
+        per_key = {k: _split_output(v, sizes) for k, v in value.items()}
+        return [type(value)((k, pk[i]) for k, pk in per_key.items()) for i in range(len(sizes))]
+    else:
+        raise ValueError(f"Cannot split output of type {type(value)}")
+
+
+def _is_tensor_annotation(annotation, allow_containers: bool) -> bool:
+    if annotation is xr.DataArray:
+        return True
+
+    if not allow_containers:
+        return False
+
+    orig = get_origin(annotation)
+    args = get_args(annotation)
+    if orig in (dict, collections.OrderedDict):
+        return len(args) == 2 and _is_tensor_annotation(args[1], allow_containers)
+    elif orig in (list, tuple, collections.abc.Sequence):
+        args = tuple(a for a in args if a is not Ellipsis)
+        return bool(args) and all(_is_tensor_annotation(a, allow_containers) for a in args)
+    else:
+        return False
+
+
+def is_batchable(func: Callable) -> bool:
+    """a workflow function is batchable if it takes tensor inputs and only returns tensors"""
+    sig = inspect.signature(func)
+    return _is_tensor_annotation(sig.return_annotation, allow_containers=True) and any(
+        _is_tensor_annotation(p.annotation, allow_containers=True) for p in sig.parameters.values()
+    )
+
+
+class MicroBatcher:
+    """Collect concurrent calls to a workflow function within `window` seconds and run them as one batch.
+
+    Calls are grouped by their non-tensor arguments (e.g. the model) and the shapes of their tensor arguments.
+    Tensor arguments are concatenated along their batch dimension and outputs are split back to the callers.
+    """
+
+    def __init__(self, func: Callable, window: float, max_batch_size: int = 32):
+        assert window > 0
+        assert max_batch_size > 0
+        self.func = func
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.pending: Dict[Any, List[Tuple[Any, List[xr.DataArray], asyncio.Future]]] = {}
+        functools.update_wrapper(self, func)
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(p) for p in self.pending.values())
+
+    async def __call__(self, *args, **kwargs):
+        tensors: List[xr.DataArray] = []
+        template = _split_call((args, kwargs), tensors)
+        if not tensors:
+            return await self._run(*args, **kwargs)
+
+        key = (
+            _freeze(template),
+            tuple((t.dims, tuple(s for d, s in t.sizes.items() if d not in BATCH_DIMS), t.dtype.str) for t in tensors),
+        )
+        loop = asyncio.get_event_loop()
+        fut = loop.create_future()
+        batch = self.pending.get(key)
+        if batch is None:
+            batch = self.pending[key] = []
+            loop.call_later(self.window, lambda: asyncio.ensure_future(self._flush(key, batch)))
+
+        batch.append((template, tensors, fut))
+        if len(batch) >= self.max_batch_size:
+            await self._flush(key, batch)
+
+        return await fut
+
+    async def _run(self, *args, **kwargs):
+        ret = self.func(*args, **kwargs)
+        if inspect.isawaitable(ret):
+            ret = await ret
+
+        return ret
+
+    async def _flush(self, key, calls: List[Tuple[Any, List[xr.DataArray], asyncio.Future]]):
+        if self.pending.get(key) is not calls:
+            return  # already flushed
+
+        del self.pending[key]
+
+        if len(calls) == 1:
+            await self._run_single(calls[0])
+            return
+
+        try:
+            template = calls[0][0]
+            slots = calls[0][1]
+            batched = [xr.concat([c[1][i] for c in calls], dim=_get_batch_dim(slots[i])) for i in range(len(slots))]
+            args, kwargs = _fill_call(template, batched)
+            ret = await self._run(*args, **kwargs)
+            ret = await asyncio.get_event_loop().run_in_executor(None, compute_tensors, ret)
+            sizes = [c[1][0].sizes[_get_batch_dim(c[1][0])] for c in calls]
+            results = _split_output(ret, sizes)
+        except Exception as e:
+            # a single failing call (or a function not supporting batches) must not fail the others;
+            # the failure is not remembered, such that later calls are batched again
+            logger.warning(f"batched call of {len(calls)} calls failed ({e}); retrying calls one by one")
+            await asyncio.gather(*[self._run_single(call) for call in calls])
+        else:
+            for (_, _, fut), res in zip(calls, results):
+                if not fut.done():
+                    fut.set_result(res)
+
+    async def _run_single(self, call: Tuple[Any, List[xr.DataArray], asyncio.Future]):
+        template, tensors, fut = call
+        try:
+            args, kwargs = _fill_call(template, tensors)
+            ret = await self._run(*args, **kwargs)
+        except Exception as e:
+            if not fut.done():
+                fut.set_exception(e)
+        else:
+            if not fut.done():
+                fut.set_result(ret)
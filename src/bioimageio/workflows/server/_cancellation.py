@@ -0,0 +1,129 @@
+import asyncio
+import dataclasses
+import functools
+import inspect
+import logging
+from typing import Any, Callable, Dict, Optional
+
+from bioimageio.workflows.server._utils import compute_tensors
+from bioimageio.workflows.utils import (
+    CancellationToken,
+    ProgressCallback,
+    ProgressInfo,
+    cancellation_scope,
+    get_dask_cancellation_callback,
+    get_dask_progress_callback,
+    progress_scope,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _get_remote_progress_callback(
+    remote_callback: Callable[[Dict[str, Any]], Any], loop: asyncio.AbstractEventLoop
+) -> ProgressCallback:
+    """progress callback (callable from any thread) that forwards progress to a client's callback in `loop`"""
+
+    async def send(info: Dict[str, Any]):
+        try:
+            ret = remote_callback(info)
+            if inspect.isawaitable(ret):
+                await ret
+        except Exception as e:
+            logger.warning(f"failed to report progress: {e}")
+
+    def callback(info: ProgressInfo):
+        loop.call_soon_threadsafe(asyncio.ensure_future, send(dataclasses.asdict(info)))
+
+    return callback
+
+
+def _run_cancellable(
+    func: Callable, args, kwargs, token: CancellationToken, progress_callback: Optional[ProgressCallback] = None
+):
+    """run `func` (in a worker thread) and compute its lazy outputs such that `token` can abort it"""
+    with cancellation_scope(token), progress_scope(progress_callback):
+        ret = func(*args, **kwargs)
+        if inspect.isawaitable(ret):
+            loop = asyncio.new_event_loop()
+            try:
+                ret = loop.run_until_complete(ret)
+            finally:
+                loop.close()
+
+        token.raise_if_cancelled()
+        callbacks = [get_dask_cancellation_callback(token)]
+        if progress_callback is not None:
+            callbacks.append(get_dask_progress_callback("tasks", callback=progress_callback))
+
+        return compute_tensors(ret, callbacks=callbacks)
+
+
+class CancellableCalls:
+    """Make service functions cancellable and bound in time.
+
+    Wrapped functions accept the additional keyword arguments `_bioimageio_call_id` to identify a call for
+    `cancel_call` and `_bioimageio_timeout` (in seconds) after which a call is cancelled.
+    A client may pass `_bioimageio_progress_callback` to receive progress reports (as dicts of `ProgressInfo` fields).
+    Workflows check for cancellation via `bioimageio.workflows.utils.raise_if_cancelled` between expensive steps and
+    lazy (dask) outputs are computed by the service with a callback that aborts the graph between tasks (tiles).
+    Outputs of a cancelled call are discarded.
+    """
+
+    def __init__(self):
+        self.tokens: Dict[str, CancellationToken] = {}
+
+    def cancel_call(self, call_id: str, reason: str = "cancelled by client") -> bool:
+        token = self.tokens.get(call_id)
+        if token is None:
+            return False
+
+        token.cancel(reason)
+        return True
+
+    def wrap(self, func: Callable) -> Callable:
+        # batched calls are run together in the event loop; they cannot be cancelled individually on the service side
+        run_in_thread = not hasattr(func, "queue_depth")
+
+        @functools.wraps(func)
+        async def wrapper(
+            *args,
+            _bioimageio_call_id: Optional[str] = None,
+            _bioimageio_timeout: Optional[float] = None,
+            _bioimageio_progress_callback: Optional[Callable[[Dict[str, Any]], Any]] = None,
+            **kwargs,
+        ):
+            token = CancellationToken()
+            if _bioimageio_call_id is not None:
+                self.tokens[_bioimageio_call_id] = token
+
+            loop = asyncio.get_event_loop()
+            if _bioimageio_progress_callback is None:
+                progress_callback = None
+            else:
+                progress_callback = _get_remote_progress_callback(_bioimageio_progress_callback, loop)
+
+            if _bioimageio_timeout is None:
+                timer = None
+            else:
+                timer = loop.call_later(
+                    _bioimageio_timeout, token.cancel, f"timeout of {_bioimageio_timeout}s exceeded"
+                )
+
+            try:
+                if run_in_thread:
+                    # keeps the service responsive (e.g. to `cancel_call`) while the workflow runs
+                    return await loop.run_in_executor(
+                        None, _run_cancellable, func, args, kwargs, token, progress_callback
+                    )
+                else:
+                    with cancellation_scope(token), progress_scope(progress_callback):
+                        return await func(*args, **kwargs)
+            finally:
+                if timer is not None:
+                    timer.cancel()
+
+                if _bioimageio_call_id is not None:
+                    self.tokens.pop(_bioimageio_call_id, None)
+
+        return wrapper
@@ -1,15 +1,22 @@
-import ast
 import asyncio
 import atexit
+import functools
+import inspect
 import logging
+import os
+import shlex
+import uuid
 import warnings
-from functools import partial
-from pathlib import Path
-from typing import List
+from os import PathLike
+from typing import Any, Dict, Optional, Sequence, Tuple, Type, Union
 
-from bioimageio.workflows.server._utils import ensure_conda_env_exists, get_server
+from packaging.version import Version
+
+from bioimageio.workflows._v import CURRENT_VERSION
+from bioimageio.workflows.server._utils import compute_tensors, ensure_conda_env_exists, get_server
 from bioimageio.workflows.server.env_vars import (
     AUTOSTART_SERVER,
+    REMOTE_CALL_TIMEOUT,
     SERVER_CONDA_ENV,
     SERVER_URL,
     SERVER_URL_VAR_NAME,
@@ -18,46 +25,79 @@ from bioimageio.workflows.server.env_vars import (
     get_env_service_name,
     get_env_specific_server_url_var_name,
     get_server_url,
+    validate_submodule_service_version,
 )
-from bioimageio.workflows.utils import get_ast_tree
+from bioimageio.workflows.utils import ProgressInfo, get_progress_callback, load_env_manifest
+
+try:
+    from websockets.exceptions import ConnectionClosed
+except ImportError:
+    CONNECTION_ERRORS: Tuple[Type[BaseException], ...] = (ConnectionError,)
+else:
+    CONNECTION_ERRORS = (ConnectionError, ConnectionClosed)
 
 logger = logging.getLogger(__name__)
 
 
-class ImportCollector(ast.NodeVisitor):
-    def __init__(self):
-        self.imported: List[str] = []
+def _make_signature(func_manifest: Dict[str, Any]) -> inspect.Signature:
+    """signature of a workflow function from its env manifest entry (annotations are kept as strings)"""
+    params = []
+    for p in func_manifest["parameters"]:
+        if not p["has_default"]:
+            default = inspect.Parameter.empty
+        elif "default" in p:
+            default = p["default"]
+        else:
+            default = p["default_source"]  # non-literal default is only known by its source
 
-    def visit_Import(self, node: ast.Import):
-        raise ValueError("Found 'import' statement. Expected 'from .<local module> import <func>' only")
+        params.append(
+            inspect.Parameter(
+                p["name"],
+                inspect.Parameter.KEYWORD_ONLY
+                if p["kind"] == "keyword_only"
+                else inspect.Parameter.POSITIONAL_OR_KEYWORD,
+                default=default,
+                annotation=inspect.Parameter.empty if p["annotation"] is None else p["annotation"],
+            )
+        )
 
-    def visit_ImportFrom(self, node: ast.ImportFrom):
-        if not node.level:
-            raise ValueError(f"Unsupported absolute import from {node.module}")
+    return_annotation = func_manifest["return_annotation"]
+    return inspect.Signature(
+        params, return_annotation=inspect.Signature.empty if return_annotation is None else return_annotation
+    )
 
-        if "." in node.module:
-            raise ValueError(f"Unsupported nested import from {node.module}")
 
-        for alias_node in node.names:
-            self.imported.append(alias_node.name)
-            if alias_node.asname is not None:
-                raise ValueError(
-                    f"Please import workflow functions without 'as', i.e. use '{alias_node.name}' instead of '{alias_node.asname}'."
-                )
+def _serialize_argument(value: Any, param: Optional[Dict[str, Any]]) -> Any:
+    """prepare an argument of a remote workflow call according to its manifest entry (if known)"""
+    if param is None or param["tensor"]:
+        value = compute_tensors(value)  # send lazy (dask backed) tensors computed
+
+    return os.fspath(value) if isinstance(value, PathLike) else value  # paths are sent as strings
 
 
 class RemoteSubmodule:
-    def __init__(self, env_name: str):
+    """Proxy of an env submodule, calling its workflow functions in the env's submodule service.
+
+    Args:
+        env_name: name of the env submodule
+        version: If given, use a submodule service with this bioimageio.workflows version (e.g. to run workflows of
+            other versions, see `run_workflow`). The workflow functions of other versions may differ from this
+            version's env manifest, so their arguments are passed on without binding them to its signatures.
+    """
+
+    def __init__(self, env_name: str, version: Optional[Union[str, Version]] = None):
         self.server_url = get_server_url(env_name)
         self.env_name = env_name
-        self.env_service_name = get_env_service_name(env_name)
-        self.conda_env_name = get_conda_env_name(env_name)
-        local_src = Path(__file__).parent.parent / "envs" / env_name / "local.py"
-        tree = get_ast_tree(local_src)
-        import_collector = ImportCollector()
-        import_collector.visit(tree)
-        self.__all__ = import_collector.imported
+        self.version = None if version is None else str(validate_submodule_service_version(version))
+        self.env_service_name = get_env_service_name(env_name, self.version)
+        self.conda_env_name = get_conda_env_name(env_name, self.version)
+        self.manifest = load_env_manifest(env_name)
+        # signatures of the env manifest apply to services of the current version only
+        self.bind_arguments = self.version is None or Version(self.version) == CURRENT_VERSION
+        self.__all__ = list(self.manifest["functions"])
         self.service_funcs = {}
+        self._service_funcs_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._cancel_call = None
         self.procs = []
 
         def terminate_procs():
@@ -74,14 +114,49 @@ class RemoteSubmodule:
         atexit.register(terminate_procs)
 
         for name in self.__all__:
-            setattr(self, name, partial(self._service_call, _submodule_func_name=name))
+            setattr(self, name, self._make_proxy(name))
+
+    def _make_proxy(self, name: str):
+        """typed proxy of workflow function `name`, forwarding calls to the remote submodule service"""
+        func_manifest = self.manifest["functions"][name]
+
+        async def proxy(*args, **kwargs):
+            return await self._service_call(*args, _submodule_func_name=name, **kwargs)
+
+        proxy.__name__ = proxy.__qualname__ = name
+        proxy.__module__ = f"bioimageio.workflows.envs.{self.env_name}.remote"
+        proxy.__doc__ = func_manifest["doc"]
+        if self.bind_arguments:
+            proxy.__signature__ = _make_signature(func_manifest)  # type: ignore
+
+        return proxy
+
+    def _serialize_arguments(self, func_name: str, args, kwargs):
+        """bind call arguments to the signature of `func_name` (to fail early) and serialize them per argument"""
+        if not self.bind_arguments:
+            return (
+                tuple(_serialize_argument(a, None) for a in args),
+                {k: _serialize_argument(v, None) for k, v in kwargs.items()},
+            )
+
+        proxy = getattr(self, func_name)
+        bound = proxy.__signature__.bind(*args, **kwargs)
+        params = {p["name"]: p for p in self.manifest["functions"][func_name]["parameters"]}
+        for name, value in bound.arguments.items():
+            bound.arguments[name] = _serialize_argument(value, params[name])
+
+        return bound.args, bound.kwargs
 
     def __await__(self):
         yield from self._ainit().__await__()
 
-    async def _ainit(self):
+    async def _ainit(self, reconnect: bool = False):
+        loop = asyncio.get_event_loop()
+        if not reconnect and self.service_funcs and self._service_funcs_loop is loop:
+            return self  # reuse cached service handles
+
         try:
-            server = await get_server(self.env_name)
+            server = await get_server(self.env_name, reconnect=reconnect)
         except Exception as e:
             error_msg = (
                 f"Failed to connect to {self.server_url} {{details}}."
@@ -98,31 +173,21 @@ class RemoteSubmodule:
                     )
 
                 print("preparing to autostart server")
-                ensure_conda_env_exists(SERVER_CONDA_ENV)
+                python = shlex.quote(ensure_conda_env_exists(SERVER_CONDA_ENV))
                 port = int(self.server_url[len("http://localhost:") :])
-                cmd = (
-                    f"conda run -n {SERVER_CONDA_ENV} "
-                    f"python -m bioimageio.workflows.server start-server --host=0.0.0.0 --port={port}"
-                )
+                cmd = f"{python} -m bioimageio.workflows.server start-server --host=0.0.0.0 --port={port}"
                 print(f"starting server: {cmd}")
                 assert not self.procs
-                self.procs.append(
-                    asyncio.create_subprocess_shell(cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
-                )
+                self.procs.append(await asyncio.create_subprocess_shell(cmd))
                 try:
                     server = await get_server("default")
                 except Exception as e2:
                     raise Exception(error_msg.format(details="after autostarting it")) from e2
 
                 # start submodule service launcher
-                cmd = (
-                    f"conda run -n {SERVER_CONDA_ENV} "
-                    f"python -m bioimageio.workflows.server start-submodule-service-launcher"
-                )
+                cmd = f"{python} -m bioimageio.workflows.server start-submodule-service-launcher"
                 print(f"starting submodule service launcher: {cmd}")
-                self.procs.append(
-                    asyncio.create_subprocess_shell(cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
-                )
+                self.procs.append(await asyncio.create_subprocess_shell(cmd))
             else:
                 raise Exception(error_msg.format(details="")) from e
 
@@ -131,12 +196,113 @@ class RemoteSubmodule:
         except Exception:
             print(f"failed to get {self.env_service_name}. Attempting to start it...")
             launcher_service = await server.get_service(START_SUBMODULE_SERVICE_NAME)
-            await launcher_service.start_submodule_service(self.env_name)
+            await launcher_service.start_submodule_service(self.env_name, self.version)
             submodule_service = await server.get_service(self.env_service_name)
 
-        self.service_funcs = {name: submodule_service[name] for name in self.__all__}
+        # services of other versions may not provide all workflow functions of this version
+        self.service_funcs = {
+            name: submodule_service[name] for name in [*self.__all__, "run_workflow"] if name in submodule_service
+        }
+        self._cancel_call = submodule_service["cancel_call"]
+        self._service_funcs_loop = loop
         return self
 
-    async def _service_call(self, *args, _submodule_func_name, **kwargs):
+    async def _service_call(
+        self, *args, _submodule_func_name, _timeout: Optional[float] = REMOTE_CALL_TIMEOUT, **kwargs
+    ):
+        """call a workflow function of the remote submodule service
+
+        Progress reported by the service is forwarded to the current progress callback
+        (see `bioimageio.workflows.utils.progress_scope`).
+
+        Args:
+            _timeout: Timeout in seconds after which the call is cancelled (on the client and service side).
+        """
+        if _submodule_func_name in self.manifest["functions"]:
+            args, kwargs = self._serialize_arguments(_submodule_func_name, args, kwargs)
+
         await self
-        return await self.service_funcs[_submodule_func_name](*args, **kwargs)
+        if _submodule_func_name not in self.service_funcs:
+            raise NotImplementedError(f"{self.env_service_name} does not provide {_submodule_func_name}")
+
+        try:
+            return await self._cancellable_call(_submodule_func_name, _timeout, args, kwargs)
+        except CONNECTION_ERRORS as e:
+            logger.warning(f"lost connection to {self.server_url} ({e}). Reconnecting...")
+
+        await self._ainit(reconnect=True)
+        return await self._cancellable_call(_submodule_func_name, _timeout, args, kwargs)
+
+    async def run_workflow(
+        self,
+        workflow_rdf: Union[str, Dict[str, Any]],
+        inputs: Union[Sequence, Dict[str, Any]] = (),
+        options: Optional[Dict[str, Any]] = None,
+        *,
+        _timeout: Optional[float] = REMOTE_CALL_TIMEOUT,
+    ) -> Dict[str, Any]:
+        """run a whole workflow in the submodule service
+
+        Inputs are uploaded once with the workflow, all steps run in the service process and only the workflow
+        outputs are returned.
+
+        Args:
+            workflow_rdf: workflow RDF source (as accessible to the service) or serialized workflow RDF
+            inputs: workflow inputs
+            options: workflow options
+            _timeout: Timeout in seconds after which the call is cancelled (on the client and service side).
+        """
+        inputs = compute_tensors(dict(inputs) if isinstance(inputs, dict) else list(inputs))
+        options = compute_tensors(dict(options or {}))
+        return await self._service_call(
+            workflow_rdf, inputs, options, _submodule_func_name="run_workflow", _timeout=_timeout
+        )
+
+    async def _cancellable_call(self, func_name: str, timeout: Optional[float], args, kwargs):
+        call_id = uuid.uuid4().hex
+        progress_callback = get_progress_callback()
+        if progress_callback is not None:
+            kwargs = dict(kwargs, _bioimageio_progress_callback=lambda info: progress_callback(ProgressInfo(**info)))
+
+        call = self.service_funcs[func_name](*args, _bioimageio_call_id=call_id, _bioimageio_timeout=timeout, **kwargs)
+        try:
+            return await asyncio.wait_for(call, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            # propagate cancellation to the service to abort the running workflow
+            try:
+                await self._cancel_call(call_id)
+            except Exception as e:
+                warnings.warn(f"Failed to cancel remote call of {func_name}: {e}")
+
+            raise
+
+
+@functools.lru_cache(maxsize=None)
+def get_remote_submodule(env_name: str, version: Optional[str] = None) -> RemoteSubmodule:
+    """shared `RemoteSubmodule` instance per env name and bioimageio.workflows version"""
+    return RemoteSubmodule(env_name, version)
+
+
+class RemoteWorkflow:
+    """Workflow function that runs a whole workflow in a submodule service (see `RemoteSubmodule.run_workflow`).
+
+    Used by `bioimageio.workflows.operators.compile_workflow` for workflows of other bioimageio.workflows versions
+    (or when asked to run a workflow remotely), such that intermediate step outputs are not transferred.
+    """
+
+    def __init__(
+        self,
+        workflow_rdf: Dict[str, Any],
+        output_names: Sequence[str],
+        env_name: str = "default",
+        version: Optional[Union[str, Version]] = None,
+    ):
+        self.workflow_rdf = workflow_rdf
+        self.output_names = tuple(output_names)
+        self.env_name = env_name
+        self.version = None if version is None else str(version)
+
+    async def __call__(self, *inputs, **options) -> Tuple[Any, ...]:
+        remote = get_remote_submodule(self.env_name, self.version)
+        outputs = await remote.run_workflow(self.workflow_rdf, inputs, options)
+        return tuple(outputs[name] for name in self.output_names)
@@ -0,0 +1,198 @@
+import functools
+import inspect
+import math
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from bioimageio.workflows.utils import get_cache_stats
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # not available on windows
+    resource = None  # type: ignore
+
+try:
+    from typing import Literal
+except ImportError:
+    from typing_extensions import Literal
+
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, math.inf)
+
+MetricsFormat = Literal["json", "prometheus"]
+
+
+def get_memory_usage(pid: Optional[int] = None) -> Dict[str, int]:
+    """memory usage of process `pid` (defaults to current process) in bytes"""
+    if psutil is not None:
+        try:
+            info = psutil.Process(pid).memory_info()
+        except psutil.Error:
+            return {}
+
+        return {"rss_bytes": info.rss, "vms_bytes": info.vms}
+    elif (pid is None or pid == os.getpid()) and resource is not None:
+        # ru_maxrss is given in kilobytes on linux
+        return {"max_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024}
+    else:
+        return {}
+
+
+class FunctionMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.latency_sum = 0.0
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS)
+
+    def observe(self, latency: float, error: bool):
+        self.requests += 1
+        self.errors += int(error)
+        self.latency_sum += latency
+        for i, le in enumerate(LATENCY_BUCKETS):
+            if latency <= le:
+                self.latency_buckets[i] += 1
+
+    def as_dict(self, queue_depth: int = 0) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "queue_depth": queue_depth,
+            "latency_seconds": {
+                "sum": self.latency_sum,
+                "count": self.requests,
+                "buckets": {str(le): n for le, n in zip(LATENCY_BUCKETS, self.latency_buckets)},
+            },
+        }
+
+
+class ServiceMetrics:
+    """request counts, latency histograms, in-flight calls and queue depth of a service's functions"""
+
+    def __init__(self, service_name: str):
+        self.service_name = service_name
+        self.start_time = time.time()
+        self.functions: Dict[str, FunctionMetrics] = {}
+        self.queue_depths: Dict[str, Callable[[], int]] = {}
+
+    def instrument(self, func_name: str, func: Callable) -> Callable:
+        """wrap (async) service function `func` to record its metrics"""
+        metrics = self.functions[func_name] = FunctionMetrics()
+        # find a `MicroBatcher` wrapped by `func` (e.g. by `CancellableCalls.wrap`) to report its queue depth
+        batcher = inspect.unwrap(func, stop=lambda f: hasattr(f, "queue_depth"))
+        if hasattr(batcher, "queue_depth"):
+            self.queue_depths[func_name] = lambda: batcher.queue_depth
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            metrics.in_flight += 1
+            start = time.perf_counter()
+            error = True
+            try:
+                ret = func(*args, **kwargs)
+                if hasattr(ret, "__await__"):
+                    ret = await ret
+
+                error = False
+                return ret
+            finally:
+                metrics.in_flight -= 1
+                metrics.observe(time.perf_counter() - start, error)
+
+        return wrapper
+
+    def get_metrics(self, format: MetricsFormat = "json") -> Union[Dict[str, Any], str]:
+        metrics = {
+            "service": self.service_name,
+            "pid": os.getpid(),
+            "uptime_seconds": time.time() - self.start_time,
+            "memory": get_memory_usage(),
+            "functions": {
+                name: m.as_dict(queue_depth=self.queue_depths.get(name, lambda: 0)())
+                for name, m in self.functions.items()
+            },
+            "caches": get_cache_stats(),
+        }
+        if format == "json":
+            return metrics
+        elif format == "prometheus":
+            return to_prometheus(metrics)
+        else:
+            raise ValueError(f"Unknown metrics format {format}. Expected 'json' or 'prometheus'.")
+
+
+def _prometheus_line(name: str, labels: Dict[str, Any], value: Union[int, float]) -> str:
+    label_str = ",".join(f'{k}="{v}"' for k, v in labels.items())
+    if value == math.inf:
+        value_str = "+Inf"
+    else:
+        value_str = repr(float(value)) if isinstance(value, float) else str(value)
+
+    return f"{name}{{{label_str}}} {value_str}"
+
+
+def to_prometheus(metrics: Dict[str, Any]) -> str:
+    """format (a list of) service metrics as returned by `ServiceMetrics.get_metrics` in Prometheus text format"""
+    lines: Dict[Tuple[str, str], List[str]] = {}
+
+    def add(name: str, type_: str, labels: Dict[str, Any], value: Union[int, float]):
+        lines.setdefault((name, type_), []).append(_prometheus_line(name, labels, value))
+
+    services: Sequence[Dict[str, Any]] = metrics.get("services", [metrics])  # type: ignore
+    for m in services:
+        service = {"service": m["service"]}
+        if "up" in m:
+            add("bioimageio_service_up", "gauge", service, int(m["up"]))
+
+        if "uptime_seconds" in m:
+            add("bioimageio_service_uptime_seconds", "gauge", service, m["uptime_seconds"])
+
+        for mem_key, mem in m.get("memory", {}).items():
+            add(f"bioimageio_service_memory_{mem_key}", "gauge", service, mem)
+
+        for func_name, fm in m.get("functions", {}).items():
+            labels = {**service, "function": func_name}
+            add("bioimageio_workflow_requests_total", "counter", labels, fm["requests"])
+            add("bioimageio_workflow_errors_total", "counter", labels, fm["errors"])
+            add("bioimageio_workflow_in_flight", "gauge", labels, fm["in_flight"])
+            add("bioimageio_workflow_queue_depth", "gauge", labels, fm["queue_depth"])
+            latency = fm["latency_seconds"]
+            for le, n in latency["buckets"].items():
+                add(
+                    "bioimageio_workflow_request_duration_seconds_bucket",
+                    "histogram",
+                    {**labels, "le": "+Inf" if float(le) == math.inf else le},
+                    n,
+                )
+
+            add("bioimageio_workflow_request_duration_seconds_sum", "histogram", labels, latency["sum"])
+            add("bioimageio_workflow_request_duration_seconds_count", "histogram", labels, latency["count"])
+
+        for cache_name, stats in m.get("caches", {}).items():
+            labels = {**service, "cache": cache_name}
+            add("bioimageio_cache_hits_total", "counter", labels, stats["hits"])
+            add("bioimageio_cache_misses_total", "counter", labels, stats["misses"])
+
+    out = []
+    declared = set()
+    for (name, type_), metric_lines in lines.items():
+        base_name = name
+        if type_ == "histogram":
+            for suffix in ("_bucket", "_sum", "_count"):
+                if name.endswith(suffix):
+                    base_name = name[: -len(suffix)]
+
+        if base_name not in declared:
+            out.append(f"# TYPE {base_name} {type_}")
+            declared.add(base_name)
+
+        out.extend(metric_lines)
+
+    return "\n".join(out) + "\n"
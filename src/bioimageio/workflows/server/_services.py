@@ -1,15 +1,24 @@
 import asyncio
 import contextlib
 import logging
+import shlex
 from importlib import import_module
-from inspect import getmembers, isfunction
+from typing import Any, Dict, Optional, Union
 
+from bioimageio.workflows._v import CURRENT_VERSION
+from bioimageio.workflows.server._batching import MicroBatcher
+from bioimageio.workflows.server._cancellation import CancellableCalls
+from bioimageio.workflows.server._metrics import MetricsFormat, ServiceMetrics, get_memory_usage, to_prometheus
 from bioimageio.workflows.server._utils import ensure_conda_env_exists, get_server
+from bioimageio.workflows.server._workflows import WorkflowRunner
 from bioimageio.workflows.server.env_vars import (
+    SERVICE_BATCH_WINDOW,
+    SERVICE_MAX_BATCH_SIZE,
     START_SUBMODULE_SERVICE_NAME,
     get_conda_env_name,
     get_env_service_name,
 )
+from bioimageio.workflows.utils import load_env_manifest
 
 logger = logging.getLogger(__name__)
 
@@ -19,7 +28,7 @@ async def register_submodule_service_launcher():
 
     long_service_name = "BioImageIO Submodule Service Launcher"
     service_name = START_SUBMODULE_SERVICE_NAME
-    launcher = SubmoduleServiceLauncher()
+    launcher = SubmoduleServiceLauncher(server)
     service_config = dict(
         name=long_service_name,
         id=service_name,
@@ -29,28 +38,34 @@ async def register_submodule_service_launcher():
         },
         start_submodule_service=launcher.start_submodule_service,
         health_check=launcher.health_check,
+        get_metrics=launcher.get_metrics,
     )
 
     await server.register_service(service_config)
-
     logger.info(f"{long_service_name} (id: {service_name}) registered at workspace: {server.config.workspace}")
 
 
 class SubmoduleServiceLauncher:
-    def __init__(self):
-        self.procs = []
-
-    async def start_submodule_service(self, env_name: str):
-        conda_env_name = get_conda_env_name(env_name)
-        ensure_conda_env_exists(conda_env_name)
+    def __init__(self, server):
+        self.server = server
+        self.procs: Dict[str, asyncio.subprocess.Process] = {}
+
+    async def start_submodule_service(self, env_name: str, version: Optional[str] = None):
+        """start the service of env submodule `env_name` (in a conda env with bioimageio.workflows `version`)"""
+        service_name = get_env_service_name(env_name, version)
+        proc = self.procs.get(service_name)
+        if proc is not None and await self.is_running(proc):
+            print(f"submodule service {service_name} is already running (pid: {proc.pid})")
+            return
+
+        conda_env_name = get_conda_env_name(env_name, version)
+        python = shlex.quote(ensure_conda_env_exists(conda_env_name, version))
         cmd = (
-            f"conda run -n {conda_env_name} "
-            f"python -m bioimageio.workflows.server start-submodule-service {env_name}"
+            f"{python} -m bioimageio.workflows.server start-submodule-service {shlex.quote(env_name)} "
+            f"--service-id {shlex.quote(service_name)}"
         )
         print(f"starting submodule service: {cmd}")
-        self.procs.append(
-            asyncio.create_subprocess_shell(cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
-        )
+        self.procs[service_name] = await asyncio.create_subprocess_shell(cmd)
 
     @staticmethod
     async def is_running(proc):
@@ -60,19 +75,70 @@ class SubmoduleServiceLauncher:
 
         return proc.returncode is None
 
-    async def health_check(self):
-        return f"procs: {[]}"
+    async def health_check(self) -> Dict[str, Dict[str, Any]]:
+        """process status of all started submodule services (by service name)"""
+        return {
+            service_name: {
+                "pid": proc.pid,
+                "running": await self.is_running(proc),
+                "returncode": proc.returncode,
+                "memory": get_memory_usage(proc.pid),
+            }
+            for service_name, proc in self.procs.items()
+        }
+
+    async def get_metrics(self, format: MetricsFormat = "json") -> Union[Dict[str, Any], str]:
+        """metrics of all started submodule services (request counts, latencies, memory use, cache hits, etc.)"""
+        services = []
+        for service_name, status in (await self.health_check()).items():
+            metrics: Dict[str, Any] = {"service": service_name, "up": status["running"], "memory": status["memory"]}
+            if status["running"]:
+                try:
+                    service = await self.server.get_service(service_name)
+                    metrics.update(await service.get_metrics())
+                except Exception as e:
+                    logger.warning(f"failed to get metrics of {service_name}: {e}")
+                    metrics["up"] = False
+
+            services.append(metrics)
+
+        ret = {"services": services}
+        if format == "json":
+            return ret
+        elif format == "prometheus":
+            return to_prometheus(ret)
+        else:
+            raise ValueError(f"Unknown metrics format {format}. Expected 'json' or 'prometheus'.")
+
+
+async def register_submodule_service(
+    env_name: str,
+    batch_window: float = SERVICE_BATCH_WINDOW,
+    max_batch_size: int = SERVICE_MAX_BATCH_SIZE,
+    service_id: Optional[str] = None,
+):
+    """Start a service per environment name to a hypha server which provides the functionality of that
+    environment specific workflow submodule.
 
+    The service is registered under `service_id` and the versioned service name of the installed
+    bioimageio.workflows version (see `get_env_service_name`). Besides the env's workflow functions it provides `run_workflow` to run whole workflows
+    within the service process.
 
-async def register_submodule_service(env_name: str):
-    """Start a service per environment name to a hypha server which provides the functionality of that
-    environment specific workflow submodule."""
+    Args:
+        env_name: name of the workflow environment submodule
+        batch_window: If > 0, concurrent calls to batchable workflow functions (taking and returning only tensors)
+            with the same non-tensor arguments are collected for `batch_window` seconds and run as one batch.
+        max_batch_size: maximum number of calls to batch together
+        service_id: service id expected by the client requesting this service (e.g. given by the submodule service
+            launcher). Defaults to the unversioned service name of `env_name`.
+    """
 
     server = await get_server(env_name)
 
-    env = import_module(f"bioimageio.workflows.envs.{env_name}.local")  # import local env
     long_service_name = f"BioImageIO {' '.join(n.capitalize() for n in env_name.split('_'))} Submodule Service"
-    service_name = get_env_service_name(env_name)
+    service_name = service_id or get_env_service_name(env_name)
+    metrics = ServiceMetrics(service_name)
+    calls = CancellableCalls()
     service_config = dict(
         name=long_service_name,
         id=service_name,
@@ -80,13 +146,27 @@ async def register_submodule_service(env_name: str):
             "visibility": "public",
             "run_in_executor": True,  # This will make sure all the sync functions run in a separate thread
         },
+        get_metrics=metrics.get_metrics,
+        cancel_call=calls.cancel_call,
+        run_workflow=metrics.instrument("run_workflow", calls.wrap(WorkflowRunner().run_workflow)),
     )
 
-    for func_name, func in getmembers(env, isfunction):
+    # only import the modules defining the workflow functions listed in the env manifest
+    for func_name, func_manifest in load_env_manifest(env_name)["functions"].items():
         assert func_name not in service_config
-        print("registered", func_name)
-        service_config[func_name] = func
+        func = getattr(import_module(f"bioimageio.workflows.envs.{env_name}.{func_manifest['module']}"), func_name)
+        if batch_window > 0 and func_manifest["batchable"]:
+            func = MicroBatcher(func, window=batch_window, max_batch_size=max_batch_size)
+            print("registered", func_name, f"(batching calls within {batch_window}s)")
+        else:
+            print("registered", func_name)
+
+        service_config[func_name] = metrics.instrument(func_name, calls.wrap(func))
 
     await server.register_service(service_config)
+    versioned_service_name = get_env_service_name(env_name, CURRENT_VERSION)
+    if versioned_service_name != service_name:
+        # clients of other bioimageio.workflows versions request a service of this version by its versioned name
+        await server.register_service(dict(service_config, id=versioned_service_name))
 
     logger.info(f"{long_service_name} (id: {service_name}) registered at workspace: {server.config.workspace}")
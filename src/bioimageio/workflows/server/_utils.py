@@ -1,26 +1,162 @@
-import xarray as xr
+import asyncio
+import contextlib
+import hashlib
+import json
+import os
+import re
+import shlex
 import subprocess
+import sys
 from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
 
+import xarray as xr
 from imjoy_rpc.hypha import connect_to_server
 
-from bioimageio.workflows.server.env_vars import AUTOINSTALL_SUBMODULE_ENVS, get_server_url
+from bioimageio.workflows.server.env_vars import (
+    AUTOINSTALL_SUBMODULE_ENVS,
+    CONDA_ENV_REGISTRY_PATH,
+    CONDA_ENV_PREFIX,
+    VERSIONED_CONDA_ENV_FILES_PATH,
+    get_conda_env_name,
+    get_server_url,
+    validate_submodule_service_version,
+)
+from bioimageio.workflows.utils import record_cache_access
+
+STATIC_ENVS = Path(__file__).parent.parent / "static" / "envs"
+# pip requirement of bioimageio.workflows in the default env file (replaced to pin versioned envs)
+WORKFLOWS_PIP_REQUIREMENT = "git+https://github.com/bioimage-io/workflows-bioimage-io-python.git"
+
+# conda env name -> {'env_file_hash': <hash of env file>, 'python': <python executable>}
+_conda_env_registry: Dict[str, Dict[str, str]] = {}
+
+
+def _get_static_env_file(conda_env_name: str) -> Path:
+    if conda_env_name.startswith(CONDA_ENV_PREFIX):
+        env_file = STATIC_ENVS / f"{conda_env_name[len(CONDA_ENV_PREFIX):]}.yaml"
+        if env_file.exists():
+            return env_file
+
+    return STATIC_ENVS / "default.yaml"
+
+
+def get_conda_env_file(conda_env_name: str, version: Optional[str] = None) -> Path:
+    """env file to create `conda_env_name` from; falls back to the default env file for custom env names
+
+    Args:
+        conda_env_name: conda environment name
+        version: If given, the env file is derived from the env file of the env submodule with bioimageio.workflows
+            pinned to `version` (for env names from `get_conda_env_name(<env name>, version)`).
+    """
+    if version is None:
+        return _get_static_env_file(conda_env_name)
+
+    validate_submodule_service_version(version)
+    version_suffix = get_conda_env_name("", version)[len(CONDA_ENV_PREFIX) :]
+    unversioned_name = conda_env_name[: -len(version_suffix)] if conda_env_name.endswith(version_suffix) else ""
+    env_src = _get_static_env_file(unversioned_name).read_text(encoding="utf-8")
+    if WORKFLOWS_PIP_REQUIREMENT not in env_src:
+        raise ValueError(f"Cannot pin bioimageio.workflows=={version} for {conda_env_name}.")
 
+    env_src = re.sub(r"^name: .*$", f"name: {conda_env_name}", env_src, count=1, flags=re.MULTILINE)
+    env_src = env_src.replace(WORKFLOWS_PIP_REQUIREMENT, f"bioimageio.workflows=={version}")
+    env_file = VERSIONED_CONDA_ENV_FILES_PATH / f"{conda_env_name}.yaml"
+    if not env_file.exists() or env_file.read_text(encoding="utf-8") != env_src:
+        env_file.parent.mkdir(parents=True, exist_ok=True)
+        env_file.write_text(env_src, encoding="utf-8")
 
-def ensure_conda_env_exists(conda_env_name: str) -> None:
-    check_env_cmd = f"conda run -n {conda_env_name} python --version"
-    print(f"checking if {conda_env_name} exists: {check_env_cmd}")
-    ret = subprocess.run(check_env_cmd, shell=True, check=not AUTOINSTALL_SUBMODULE_ENVS)
+    return env_file
+
+
+def _get_env_file_hash(env_file: Path) -> str:
+    return hashlib.sha256(env_file.read_bytes()).hexdigest()
+
+
+def _load_conda_env_registry() -> Dict[str, Dict[str, str]]:
+    try:
+        with CONDA_ENV_REGISTRY_PATH.open(encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def _save_conda_env_registry() -> None:
+    registry = _load_conda_env_registry()
+    registry.update(_conda_env_registry)
+    try:
+        CONDA_ENV_REGISTRY_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with CONDA_ENV_REGISTRY_PATH.open("w", encoding="utf-8") as f:
+            json.dump(registry, f, indent=2)
+    except Exception as e:
+        print(f"failed to save conda env registry to {CONDA_ENV_REGISTRY_PATH}: {e}")
+
+
+def _resolve_conda_env_python(conda_env_name: str) -> Optional[str]:
+    """find the python executable of an existing conda environment"""
+    ret = subprocess.run("conda env list --json", shell=True, capture_output=True, text=True)
     if ret.returncode != 0:
-        assert AUTOINSTALL_SUBMODULE_ENVS
-        create_env_cmd = "mamba env create -f " + str(Path(__file__).parent.parent / "static" / "envs" / "default.yaml")
+        return None
+
+    info = json.loads(ret.stdout)
+    for prefix in info.get("envs", []):
+        if Path(prefix).name == conda_env_name or (conda_env_name == "base" and prefix == info.get("root_prefix")):
+            python = Path(prefix) / ("python.exe" if sys.platform == "win32" else "bin/python")
+            if python.exists() and subprocess.run([str(python), "--version"], capture_output=True).returncode == 0:
+                return str(python)
+
+    return None
+
+
+def ensure_conda_env_exists(conda_env_name: str, version: Optional[str] = None) -> str:
+    """ensure conda environment `conda_env_name` exists (create it if missing and allowed to)
+
+    Resolved environments are cached per env name and hash of the corresponding env file in `static/envs`,
+    in memory and in BIOIMAGEIO_CONDA_ENV_REGISTRY_PATH.
+    For a given bioimageio.workflows `version` the env file is derived from the env submodule's env file
+    (see `get_conda_env_file`).
+
+    Returns:
+        path to the python executable of `conda_env_name`, to be invoked directly instead of through `conda run`
+    """
+    env_file = get_conda_env_file(conda_env_name, version)
+    env_file_hash = _get_env_file_hash(env_file)
+    for registry in (_conda_env_registry, _load_conda_env_registry()):
+        entry = registry.get(conda_env_name)
+        if entry is not None and entry["env_file_hash"] == env_file_hash and os.path.exists(entry["python"]):
+            _conda_env_registry[conda_env_name] = entry
+            record_cache_access("conda_env_registry", hit=True)
+            return entry["python"]
+
+    record_cache_access("conda_env_registry", hit=False)
+    print(f"checking if {conda_env_name} exists")
+    python = _resolve_conda_env_python(conda_env_name)
+    if python is None:
+        if not AUTOINSTALL_SUBMODULE_ENVS:
+            raise RuntimeError(f"Missing conda env {conda_env_name}.")
+
+        create_env_cmd = f"mamba env create -n {shlex.quote(conda_env_name)} -f {shlex.quote(str(env_file))}"
         print(f"creating conda env {conda_env_name}: {create_env_cmd}")
-        subprocess.run(
-            create_env_cmd,
-            shell=True,
-            check=True,
-        )
-        subprocess.run(check_env_cmd, shell=True, check=True)
+        subprocess.run(create_env_cmd, shell=True, check=True)
+        python = _resolve_conda_env_python(conda_env_name)
+        if python is None:
+            raise RuntimeError(f"Failed to find python executable of created conda env {conda_env_name}.")
+
+    _conda_env_registry[conda_env_name] = dict(env_file_hash=env_file_hash, python=python)
+    _save_conda_env_registry()
+    return python
+
+
+def compute_tensors(value: Any, **compute_kwargs) -> Any:
+    """compute any lazy (dask backed) tensors in (nested) workflow outputs"""
+    if isinstance(value, xr.DataArray):
+        return value.compute(**compute_kwargs)
+    elif isinstance(value, (list, tuple)):
+        return type(value)(compute_tensors(v, **compute_kwargs) for v in value)
+    elif isinstance(value, dict):
+        return type(value)((k, compute_tensors(v, **compute_kwargs)) for k, v in value.items())
+    else:
+        return value
 
 
 def encode_xarray(obj):
@@ -45,7 +181,53 @@ def decode_xarray(obj):
     )
 
 
-async def get_server(env_name: str = "default"):
-    server = await connect_to_server({"server_url": get_server_url(env_name)})
+# server url -> (event loop, connection task); connections are bound to the event loop they were created in
+_server_connections: Dict[str, Tuple[asyncio.AbstractEventLoop, "asyncio.Future[Any]"]] = {}
+
+
+async def _connect_to_server(server_url: str):
+    server = await connect_to_server({"server_url": server_url})
     server.register_codec({"name": "xarray", "type": xr.DataArray, "encoder": encode_xarray, "decoder": decode_xarray})
     return server
+
+
+async def get_server(env_name: str = "default", reconnect: bool = False):
+    """get a persistent connection to the hypha server for `env_name`, shared per server url
+
+    Args:
+        env_name: workflow environment name to determine the server url from
+        reconnect: If true, discard any existing connection and connect anew (e.g. after a connection failure).
+    """
+    server_url = get_server_url(env_name)
+    loop = asyncio.get_event_loop()
+    if reconnect:
+        await invalidate_server(env_name)
+
+    cached = _server_connections.get(server_url)
+    if cached is not None and cached[0] is loop and not loop.is_closed():
+        connection = cached[1]
+        if not connection.done() or (not connection.cancelled() and connection.exception() is None):
+            record_cache_access("server_connections", hit=True)
+            return await connection
+
+    record_cache_access("server_connections", hit=False)
+    connection = asyncio.ensure_future(_connect_to_server(server_url))
+    _server_connections[server_url] = (loop, connection)
+    try:
+        return await connection
+    except Exception:
+        if _server_connections.get(server_url, (None, None))[1] is connection:
+            del _server_connections[server_url]
+
+        raise
+
+
+async def invalidate_server(env_name: str = "default") -> None:
+    """drop the cached connection to the hypha server for `env_name`"""
+    loop, connection = _server_connections.pop(get_server_url(env_name), (None, None))
+    if connection is None or loop is not asyncio.get_event_loop() or not connection.done():
+        return
+
+    if not connection.cancelled() and connection.exception() is None:
+        with contextlib.suppress(Exception):
+            await connection.result().disconnect()
@@ -0,0 +1,70 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence, Union
+
+from bioimageio.spec import serialize_raw_resource_description_to_dict
+from bioimageio.spec.shared.raw_nodes import ResourceDescription as RawResourceDescription
+from bioimageio.workflows.utils import load_cached_raw_resource_description, record_cache_access
+
+
+class WorkflowRunner:
+    """Run whole workflows in a submodule service process.
+
+    A workflow is compiled once per RDF (see `bioimageio.workflows.operators.compile_workflow`) and its steps are run
+    in this process, such that intermediate step outputs never leave it; only the workflow outputs are returned.
+    """
+
+    def __init__(self, max_plans: int = 32):
+        self.max_plans = max_plans
+        self.plans: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _get_plan_key(workflow_rdf: Union[RawResourceDescription, Dict[str, Any]]) -> str:
+        """key of a workflow by its content, such that changed RDFs are compiled anew"""
+        if isinstance(workflow_rdf, dict):
+            data = workflow_rdf
+        else:
+            data = serialize_raw_resource_description_to_dict(workflow_rdf)
+            data["root_path"] = str(workflow_rdf.root_path)
+
+        return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+    @staticmethod
+    def _compile(workflow_rdf: Union[RawResourceDescription, Dict[str, Any]]):
+        from bioimageio.workflows.operators import compile_workflow
+
+        return compile_workflow(workflow_rdf)
+
+    def get_plan(self, workflow_rdf: Union[str, Dict[str, Any]]):
+        if isinstance(workflow_rdf, str):
+            # RDF sources are (re)loaded from the RDF cache, which detects changed local files by their content hash
+            # and revalidates remote RDFs after BIOIMAGEIO_RDF_CACHE_TTL
+            workflow_rdf = load_cached_raw_resource_description(workflow_rdf)
+
+        key = self._get_plan_key(workflow_rdf)
+        with self._lock:
+            plan = self.plans.get(key)
+            if plan is not None:
+                self.plans.move_to_end(key)
+
+        record_cache_access("workflow_plans", hit=plan is not None)
+        if plan is None:
+            plan = self._compile(workflow_rdf)
+            with self._lock:
+                self.plans[key] = plan
+                while len(self.plans) > self.max_plans:
+                    self.plans.popitem(last=False)
+
+        return plan
+
+    def run_workflow(
+        self,
+        workflow_rdf: Union[str, Dict[str, Any]],
+        inputs: Union[Sequence, Dict[str, Any]] = (),
+        options: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """run a workflow (given by its RDF source or serialized RDF) and return its outputs by name"""
+        return dict(self.get_plan(workflow_rdf).run(inputs, options))
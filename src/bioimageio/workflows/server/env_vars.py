@@ -1,4 +1,10 @@
 import os
+from pathlib import Path
+from typing import Optional, Union
+
+from packaging.version import Version
+
+from bioimageio.spec.shared.common import BIOIMAGEIO_CACHE_PATH
 
 DEFAULT_SERVER_URL = "http://127.0.0.1:9527"  # default from hypha
 SERVER_URL_VAR_NAME = "BIOIMAGEIO_SERVER_URL"
@@ -9,6 +15,18 @@ AUTOSTART_ENV_SERVICES_VAR_NAME = "BIOIMAGEIO_AUTOSTART_ENV_SERVICES"
 AUTOSTART_ENV_SERVICES = os.getenv(AUTOSTART_SERVER_VAR_NAME, "true").lower() in ("true", "1")
 AUTOINSTALL_SUBMODULE_ENVS = os.getenv("BIOIMAGEIO_AUTOINSTALL_SUBMODULE_ENVS", "true").lower() in ("true", "1")
 START_SUBMODULE_SERVICE_NAME = "bioimageio-wf-start-service"
+REMOTE_CALL_TIMEOUT = float(os.getenv("BIOIMAGEIO_REMOTE_CALL_TIMEOUT", "0")) or None
+SERVICE_BATCH_WINDOW = float(os.getenv("BIOIMAGEIO_SERVICE_BATCH_WINDOW", "0"))
+SERVICE_MAX_BATCH_SIZE = int(os.getenv("BIOIMAGEIO_SERVICE_MAX_BATCH_SIZE", "32"))
+CONDA_ENV_PREFIX = "bioimageio_wf_env_"
+# first bioimageio.workflows version with submodule services providing `run_workflow` under versioned service ids
+MIN_SUBMODULE_SERVICE_VERSION = Version("0.1.0")
+VERSIONED_CONDA_ENV_FILES_PATH = Path(
+    os.getenv("BIOIMAGEIO_VERSIONED_CONDA_ENV_FILES_PATH", BIOIMAGEIO_CACHE_PATH / "workflows_conda_envs")
+)
+CONDA_ENV_REGISTRY_PATH = Path(
+    os.getenv("BIOIMAGEIO_CONDA_ENV_REGISTRY_PATH", BIOIMAGEIO_CACHE_PATH / "workflows_conda_env_registry.json")
+)
 
 
 def get_env_specific_server_url_var_name(env_name) -> str:
@@ -19,12 +37,32 @@ def get_server_url(env_name: str) -> str:
     return os.getenv(get_env_specific_server_url_var_name(env_name), SERVER_URL)
 
 
-def get_env_service_name(env_name: str) -> str:
-    return f"bioimageio-wf-service-{env_name}"
+def get_env_service_name(env_name: str, version: Optional[Union[str, Version]] = None) -> str:
+    """service name of an env submodule (providing a specific bioimageio.workflows version)"""
+    if version is None:
+        return f"bioimageio-wf-service-{env_name}"
+    else:
+        return f"bioimageio-wf-service-{env_name}-v{version}"
+
+
+def validate_submodule_service_version(version: Union[str, Version]) -> Version:
+    """raise a ValueError if submodule services of bioimageio.workflows `version` cannot be used"""
+    version = Version(str(version))
+    if version < MIN_SUBMODULE_SERVICE_VERSION:
+        raise ValueError(
+            f"Submodule services of bioimageio.workflows {version} are not supported "
+            f"(requires bioimageio.workflows>={MIN_SUBMODULE_SERVICE_VERSION})."
+        )
+
+    return version
 
 
-def get_conda_env_name(env_name: str) -> str:
-    return f"bioimageio_wf_env_{env_name}"
+def get_conda_env_name(env_name: str, version: Optional[Union[str, Version]] = None) -> str:
+    """conda env name of an env submodule (with a specific bioimageio.workflows version)"""
+    if version is None:
+        return f"{CONDA_ENV_PREFIX}{env_name}"
+    else:
+        return f"{CONDA_ENV_PREFIX}{env_name}_v{str(version).replace('.', '_')}"
 
 
 SERVER_CONDA_ENV = os.getenv("BIOIMAGE_SERVER_CONDA_ENV", get_conda_env_name("default"))
@@ -1,9 +1,35 @@
 from ._ast import get_ast_tree
+from ._cache_stats import get_cache_stats, record_cache_access
+from ._cancel import (
+    CancellationToken,
+    WorkflowCancelledError,
+    cancellation_scope,
+    get_cancellation_token,
+    get_dask_cancellation_callback,
+    raise_if_cancelled,
+)
+from ._env_manifest import ImportCollector, generate_env_manifest, load_env_manifest, save_env_manifest
+from ._io import get_zarr_compressor, load_tensor, load_tensors_concurrently, save_tensor
+from ._progress import (
+    DaskProgress,
+    ProgressCallback,
+    ProgressInfo,
+    ProgressTracker,
+    TqdmProgressCallback,
+    get_dask_progress_callback,
+    get_progress_callback,
+    progress_scope,
+)
+from ._rdf_cache import clear_rdf_cache, load_cached_raw_resource_description
+from ._stats import get_tensor_stats
 from ._tiling import (
+    SPACE_TIME_AXES,
+    TileGrid,
     get_chunk,
     get_corrected_chunks,
     get_default_input_tile,
     get_output_rois,
+    get_tile_grid,
     transpose_sequence,
     tuple_roi_to_slices,
 )
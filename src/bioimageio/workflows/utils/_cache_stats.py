@@ -0,0 +1,17 @@
+import threading
+from collections import defaultdict
+from typing import Dict
+
+_lock = threading.Lock()
+_cache_stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0})
+
+
+def record_cache_access(cache_name: str, hit: bool) -> None:
+    """count a hit or miss of an in-process cache, e.g. to be reported by a service's metrics"""
+    with _lock:
+        _cache_stats[cache_name]["hits" if hit else "misses"] += 1
+
+
+def get_cache_stats() -> Dict[str, Dict[str, int]]:
+    with _lock:
+        return {name: dict(stats) for name, stats in _cache_stats.items()}
@@ -0,0 +1,68 @@
+import contextlib
+import threading
+from contextvars import ContextVar
+from typing import Callable, Iterator, Optional, Tuple
+
+from dask.callbacks import Callback
+
+
+class WorkflowCancelledError(RuntimeError):
+    pass
+
+
+class CancellationToken:
+    """thread-safe flag to request cancellation of a running workflow"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason = ""
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        self.reason = reason
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise WorkflowCancelledError(self.reason)
+
+
+_current_cancellation_token: ContextVar[Optional[CancellationToken]] = ContextVar(
+    "bioimageio_workflows_cancellation_token", default=None
+)
+
+
+def get_cancellation_token() -> Optional[CancellationToken]:
+    return _current_cancellation_token.get()
+
+
+@contextlib.contextmanager
+def cancellation_scope(token: CancellationToken) -> Iterator[CancellationToken]:
+    """make `token` the current cancellation token checked by `raise_if_cancelled`"""
+    reset_token = _current_cancellation_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_cancellation_token.reset(reset_token)
+
+
+def raise_if_cancelled() -> None:
+    """to be called by workflows between expensive steps to abort them if the current call got cancelled"""
+    token = _current_cancellation_token.get()
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+def get_dask_cancellation_callback(token: CancellationToken) -> Tuple[Optional[Callable], ...]:
+    """dask callback to abort the computation of a dask graph before starting the next task once `token` is cancelled
+
+    Pass it explicitly as `.compute(callbacks=[get_dask_cancellation_callback(token)])` to only affect that computation.
+    """
+
+    def pretask(key, dsk, state):
+        token.raise_if_cancelled()
+
+    return Callback(pretask=pretask)._callback
@@ -0,0 +1,245 @@
+import ast
+import functools
+import hashlib
+import json
+import warnings
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+WF = Path(__file__).parent.parent
+ENVS = WF / "envs"
+ENV_MANIFESTS = WF / "static" / "env_manifests"
+WORKFLOW_RDFS = WF / "static" / "workflow_rdfs"
+
+TENSOR_NAMES = ("DataArray", "ndarray")
+SEQUENCE_NAMES = ("List", "list", "Tuple", "tuple", "Sequence")
+MAPPING_NAMES = ("Dict", "dict", "OrderedDict")
+
+
+class ImportCollector(ast.NodeVisitor):
+    """collect workflow functions (by module) imported in an env's 'local.py'"""
+
+    def __init__(self):
+        self.imported: Dict[str, str] = {}
+
+    def visit_Import(self, node: ast.Import):
+        raise ValueError("Found 'import' statement. Expected 'from .<local module> import <func>' only")
+
+    def visit_ImportFrom(self, node: ast.ImportFrom):
+        if not node.level:
+            raise ValueError(f"Unsupported absolute import from {node.module}")
+
+        if "." in node.module:
+            raise ValueError(f"Unsupported nested import from {node.module}")
+
+        for alias_node in node.names:
+            self.imported[alias_node.name] = node.module
+            if alias_node.asname is not None:
+                raise ValueError(
+                    f"Please import workflow functions without 'as', i.e. use '{alias_node.name}' instead of '{alias_node.asname}'."
+                )
+
+
+def get_name(node: ast.expr) -> Optional[str]:
+    """last component of a (dotted) name, e.g. 'DataArray' for `xr.DataArray`"""
+    if isinstance(node, ast.Name):
+        return node.id
+    elif isinstance(node, ast.Attribute):
+        return node.attr
+    else:
+        return None
+
+
+def _unparse(node: ast.expr, src: str) -> Optional[str]:
+    if hasattr(ast, "unparse"):  # python >= 3.9
+        return ast.unparse(node)
+
+    segment = getattr(ast, "get_source_segment", lambda *_: None)(src, node)  # python >= 3.8
+    return None if segment is None else " ".join(segment.split())
+
+
+def get_subscript_args(node: ast.Subscript) -> List[ast.expr]:
+    slice_ = node.slice
+    if isinstance(slice_, getattr(ast, "Index", ())):  # python < 3.9 wraps the slice in ast.Index
+        slice_ = slice_.value  # type: ignore
+
+    return list(slice_.elts) if isinstance(slice_, ast.Tuple) else [slice_]
+
+
+def get_aliases(env_dir: Path, module_name: str) -> Dict[str, ast.expr]:
+    """module level type aliases of an env module, including those imported from other modules of the env"""
+    env_package = f"bioimageio.workflows.envs.{env_dir.name}."
+    aliases: Dict[str, ast.expr] = {}
+    for node in ast.parse((env_dir / f"{module_name}.py").read_text(encoding="utf-8")).body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            aliases[node.targets[0].id] = node.value
+        elif isinstance(node, ast.ImportFrom) and node.module is not None:
+            if node.level == 1:
+                imported_module = node.module
+            elif node.level == 0 and node.module.startswith(env_package):
+                imported_module = node.module[len(env_package) :]
+            else:
+                continue
+
+            if "." not in imported_module and imported_module != module_name:
+                imported_aliases = get_aliases(env_dir, imported_module)
+                for alias_node in node.names:
+                    if alias_node.name in imported_aliases:
+                        aliases[alias_node.asname or alias_node.name] = imported_aliases[alias_node.name]
+
+    return aliases
+
+
+def _resolve_alias(annotation: ast.expr, aliases: Dict[str, ast.expr]) -> ast.expr:
+    if isinstance(annotation, ast.Constant) and isinstance(annotation.value, str):
+        annotation = ast.parse(annotation.value, mode="eval").body  # forward reference
+
+    name = get_name(annotation)
+    return _resolve_alias(aliases[name], aliases) if name in aliases else annotation
+
+
+def _has_tensor(annotation: ast.expr, aliases: Dict[str, ast.expr]) -> bool:
+    """if a tensor is part of the annotation, e.g. `Optional[xr.DataArray]` or `Sequence[xr.DataArray]`"""
+    annotation = _resolve_alias(annotation, aliases)
+    if isinstance(annotation, ast.Subscript):
+        return any(_has_tensor(a, aliases) for a in get_subscript_args(annotation))
+
+    return get_name(annotation) in TENSOR_NAMES
+
+
+def _is_batchable_annotation(annotation: ast.expr, aliases: Dict[str, ast.expr]) -> bool:
+    """static counterpart of `bioimageio.workflows.server._batching._is_tensor_annotation` (with containers)"""
+    annotation = _resolve_alias(annotation, aliases)
+    if not isinstance(annotation, ast.Subscript):
+        return get_name(annotation) == "DataArray"
+
+    orig = get_name(annotation.value)
+    args = [a for a in get_subscript_args(annotation) if not (isinstance(a, ast.Constant) and a.value is Ellipsis)]
+    if orig in MAPPING_NAMES:
+        return len(args) == 2 and _is_batchable_annotation(args[1], aliases)
+    elif orig in SEQUENCE_NAMES:
+        return bool(args) and all(_is_batchable_annotation(a, aliases) for a in args)
+    else:
+        return False
+
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, (list, tuple)):
+        return [_to_json(v) for v in value]
+    elif isinstance(value, dict):
+        return {k: _to_json(v) for k, v in value.items()}
+    else:
+        return value
+
+
+def _load_workflow_rdf(wf_name: str) -> Optional[Dict[str, Any]]:
+    path = WORKFLOW_RDFS / f"{wf_name}.yaml"
+    if not path.exists():
+        return None
+
+    from bioimageio.spec.shared import yaml
+
+    with path.open(encoding="utf-8") as f:
+        return _to_json(yaml.load(f))
+
+
+def _get_parameters(
+    func: Union[ast.FunctionDef, ast.AsyncFunctionDef], src: str, aliases: Dict[str, ast.expr], rdf: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    rdf_params = {p["name"]: p for p in [*rdf.get("inputs", []), *rdf.get("options", [])]}
+    args = func.args
+    positional = getattr(args, "posonlyargs", []) + args.args
+    defaults: List[Optional[ast.expr]] = [None] * (len(positional) - len(args.defaults)) + list(args.defaults)
+    params = []
+    for kind, arg, default in [
+        *[("positional_or_keyword", a, d) for a, d in zip(positional, defaults)],
+        *[("keyword_only", a, d) for a, d in zip(args.kwonlyargs, args.kw_defaults)],
+    ]:
+        param: Dict[str, Any] = dict(
+            name=arg.arg,
+            kind=kind,
+            annotation=None if arg.annotation is None else _unparse(arg.annotation, src),
+            tensor=arg.annotation is not None and _has_tensor(arg.annotation, aliases),
+            has_default=default is not None,
+        )
+        if default is not None:
+            try:
+                param["default"] = _to_json(ast.literal_eval(default))
+            except ValueError:
+                param["default_source"] = _unparse(default, src)
+
+        rdf_param = rdf_params.get(arg.arg, {})
+        param["type"] = rdf_param.get("type")
+        param["axes"] = rdf_param.get("axes")
+        params.append(param)
+
+    return params
+
+
+def generate_env_manifest(env_name: str) -> Dict[str, Any]:
+    """describe the workflow functions of an env submodule by static analysis of its sources and workflow RDFs"""
+    env_dir = ENVS / env_name
+    local_src = (env_dir / "local.py").read_text(encoding="utf-8")
+    import_collector = ImportCollector()
+    import_collector.visit(ast.parse(local_src))
+    source_hash = hashlib.sha256(local_src.encode("utf-8"))
+    modules: Dict[str, ast.Module] = {}
+    module_srcs: Dict[str, str] = {}
+    for module_name in sorted(set(import_collector.imported.values())):
+        module_srcs[module_name] = (env_dir / f"{module_name}.py").read_text(encoding="utf-8")
+        modules[module_name] = ast.parse(module_srcs[module_name])
+        source_hash.update(module_srcs[module_name].encode("utf-8"))
+
+    functions = {}
+    for func_name, module_name in import_collector.imported.items():
+        module, src = modules[module_name], module_srcs[module_name]
+        aliases = get_aliases(env_dir, module_name)
+        func = next(
+            node
+            for node in module.body
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name == func_name
+        )
+        rdf = _load_workflow_rdf(func_name) or {}
+        parameters = _get_parameters(func, src, aliases, rdf)
+        functions[func_name] = dict(
+            module=module_name,
+            is_async=isinstance(func, ast.AsyncFunctionDef),
+            doc=(ast.get_docstring(func) or "").split("\n")[0],
+            parameters=parameters,
+            return_annotation=None if func.returns is None else _unparse(func.returns, src),
+            batchable=func.returns is not None
+            and _is_batchable_annotation(func.returns, aliases)
+            and any(
+                a.annotation is not None and _is_batchable_annotation(a.annotation, aliases)
+                for a in [*getattr(func.args, "posonlyargs", []), *func.args.args, *func.args.kwonlyargs]
+            ),
+            outputs=[dict(name=o["name"], type=o["type"], axes=o.get("axes")) for o in rdf.get("outputs", [])],
+        )
+
+    return dict(env_name=env_name, source_hash=source_hash.hexdigest(), functions=functions)
+
+
+def save_env_manifest(env_name: str) -> Path:
+    path = ENV_MANIFESTS / f"{env_name}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as f:
+        json.dump(generate_env_manifest(env_name), f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+    load_env_manifest.cache_clear()
+    return path
+
+
+@functools.lru_cache(maxsize=None)
+def load_env_manifest(env_name: str) -> Dict[str, Any]:
+    """load the generated manifest of an env submodule's workflow functions (see `scripts/generate_env_manifests.py`)
+
+    Falls back to analysing the env sources if no manifest was generated (yet).
+    """
+    path = ENV_MANIFESTS / f"{env_name}.json"
+    try:
+        with path.open(encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        warnings.warn(f"Missing env manifest {path}. Generating it on the fly.")
+        return generate_env_manifest(env_name)
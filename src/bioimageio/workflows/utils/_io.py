@@ -0,0 +1,236 @@
+import itertools
+from concurrent.futures import Future, ThreadPoolExecutor
+from os import PathLike
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+from urllib.parse import urlparse
+
+import dask
+import dask.array as da
+import numpy as np
+import xarray as xr
+from bioimageio.core.image_helper import save_image
+from imageio import imread
+
+try:
+    import tifffile
+except ImportError:
+    tifffile = None
+
+try:
+    import zarr
+except ImportError:
+    zarr = None
+
+TIFF_SUFFIXES = (".tif", ".tiff")
+
+
+def _load_tiff_lazily(path: Path) -> da.Array:
+    assert tifffile is not None
+    if zarr is not None:
+        try:
+            store = tifffile.imread(str(path), aszarr=True)
+        except (ImportError, ValueError):
+            pass  # incompatible tifffile and zarr versions
+        else:
+            # chunked by tiles/strips of the tiff file
+            return da.from_zarr(store)
+
+    with tifffile.TiffFile(str(path)) as tif:
+        series = tif.series[0]
+        shape, dtype = series.shape, series.dtype
+
+    return da.from_delayed(dask.delayed(tifffile.imread)(str(path)), shape=shape, dtype=dtype)
+
+
+def load_tensor(source: Union[str, PathLike], axes: Sequence[str], lazy: bool = True) -> xr.DataArray:
+    """load a tensor from file
+
+    Args:
+        source: file path or URL. Local '.npy' files are memory mapped, local '.zarr' and tiff files are opened as
+            dask arrays (if `lazy`). Any other file or URL is read with imageio.
+        axes: dimension names of the tensor
+        lazy: If false, always read the tensor into memory.
+
+    Returns:
+        the loaded tensor
+    """
+    if isinstance(source, str) and len(urlparse(source).scheme) > 1:  # not a (windows) file path
+        return xr.DataArray(imread(source), dims=tuple(axes))
+
+    path = Path(source)
+    suffix = path.suffix.lower()
+    data: Union[np.ndarray, da.Array]
+    if suffix == ".npy":
+        data = np.load(str(path), mmap_mode="r" if lazy else None)
+    elif suffix == ".zarr" or (path / ".zarray").exists():
+        data = da.from_zarr(str(path))
+        if not lazy:
+            data = data.compute()
+    elif lazy and suffix in TIFF_SUFFIXES and tifffile is not None:
+        data = _load_tiff_lazily(path)
+    else:
+        data = imread(str(path))
+
+    return xr.DataArray(data, dims=tuple(axes))
+
+
+def load_tensors_concurrently(
+    sources: Sequence[Union[str, PathLike]],
+    axes: Sequence[Sequence[str]],
+    lazy: bool = True,
+    max_workers: Optional[int] = None,
+) -> List[xr.DataArray]:
+    """load many tensors concurrently on a thread pool (see `load_tensor`)"""
+    assert len(sources) == len(axes)
+    if len(sources) <= 1:
+        return [load_tensor(s, a, lazy=lazy) for s, a in zip(sources, axes)]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda sa: load_tensor(*sa, lazy=lazy), zip(sources, axes)))
+
+
+def _get_tiff_tile(chunks: Tuple[Tuple[int, ...], ...]) -> Tuple[int, int]:
+    """tiff tile shape close to the dask chunks of the last two dimensions (multiples of 16 as required by tiff)"""
+    return tuple(max(16, round(c[0] / 16) * 16) for c in chunks[-2:])  # type: ignore
+
+
+def _get_chunk_slices(chunks: Sequence[int]) -> List[slice]:
+    stops = np.cumsum(chunks)
+    return [slice(int(stop - c), int(stop)) for c, stop in zip(chunks, stops)]
+
+
+def _iter_prefetched(arrays: Iterator[da.Array], num_workers: Optional[int]) -> Iterator[np.ndarray]:
+    """compute dask arrays one after the other, always computing the next one while the current one is consumed"""
+    with ThreadPoolExecutor(max_workers=1) as prefetcher:
+        pending: Optional[Future] = None
+        for array in itertools.chain(arrays, [None]):
+            prefetched = (
+                None
+                if array is None
+                else prefetcher.submit(array.compute, scheduler="threads", num_workers=num_workers)
+            )
+            if pending is not None:
+                yield pending.result()
+
+            pending = prefetched
+
+
+def _iter_tiff_tiles(data: da.Array, tile: Tuple[int, int], num_workers: Optional[int]) -> Iterator[np.ndarray]:
+    """yield tiles in tiff order (plane by plane) while computing each dask block exactly once
+
+    Blocks are computed row by row (of blocks) and rows of the plane to be written next are streamed.
+    Memory is bounded by one row of blocks plus the rows of planes that are computed ahead of being written,
+    which only happens for leading (non-yx) dimensions with chunks larger than 1.
+    """
+    th, tw = tile
+    height, width = data.shape[-2:]
+
+    def iter_tiles(rows: np.ndarray) -> Iterator[np.ndarray]:
+        for y0 in range(0, rows.shape[0], th):
+            for x0 in range(0, width, tw):
+                yield rows[y0 : y0 + th, x0 : x0 + tw]
+
+    plane_index = np.arange(int(np.prod(data.shape[:-2]))).reshape(data.shape[:-2])
+    block_slices = [
+        (lead, row)
+        for lead in itertools.product(*[_get_chunk_slices(c) for c in data.chunks[:-2]])
+        for row in _get_chunk_slices(data.chunks[-2])
+    ]
+    computed_blocks = _iter_prefetched((data[lead + (row, slice(None))] for lead, row in block_slices), num_workers)
+    buffered_rows: Dict[int, List[np.ndarray]] = {}
+    complete_planes = set()
+    next_plane = 0
+    for (lead, row), computed in zip(block_slices, computed_blocks):
+        for p, plane in zip(plane_index[lead].ravel(), computed.reshape(-1, *computed.shape[-2:])):
+            buffered_rows.setdefault(p, []).append(plane)
+            if row.stop == height:
+                complete_planes.add(p)
+
+        while next_plane in buffered_rows:
+            rows = np.concatenate(buffered_rows[next_plane])
+            if next_plane in complete_planes:
+                yield from iter_tiles(rows)
+                del buffered_rows[next_plane]
+                next_plane += 1
+            else:
+                # only write complete tile rows
+                n_complete = rows.shape[0] // th * th
+                yield from iter_tiles(rows[:n_complete])
+                buffered_rows[next_plane] = [rows[n_complete:]]
+                break
+
+
+def get_zarr_compressor(codec: Optional[str] = None, level: int = 5):
+    """get a numcodecs compressor for zarr arrays
+
+    Args:
+        codec: 'none' for no compression, a blosc codec name ('zstd', 'lz4', 'lz4hc', 'blosclz', 'zlib') or
+            None for zarr's default compressor.
+        level: compression level (1-9)
+    """
+    if codec is None:
+        return "default"
+    elif codec == "none":
+        return None
+
+    from numcodecs import Blosc, blosc
+
+    if codec not in blosc.list_compressors():
+        raise ValueError(f"Unknown codec {codec}. Expected 'none' or one of {blosc.list_compressors()}.")
+
+    # bit shuffling works well for sparse integer data like label images and for floats alike
+    return Blosc(cname=codec, clevel=level, shuffle=Blosc.BITSHUFFLE)
+
+
+def save_tensor(
+    path: Union[str, PathLike],
+    tensor: xr.DataArray,
+    num_workers: Optional[int] = None,
+    codec: Optional[str] = None,
+    compression_level: int = 5,
+    chunks: Optional[Sequence[int]] = None,
+) -> None:
+    """save a tensor to file
+
+    Dask backed tensors are computed and written block by block in parallel with bounded memory if saved as
+    '.zarr', '.npy' (into a memory map) or '.tif'/'.tiff' (as tiled (OME-)TIFF; bands of tiles are computed while
+    the previous band is written). Any other tensor is saved with `bioimageio.core.image_helper.save_image`.
+
+    Args:
+        path: output file path
+        tensor: tensor to save
+        num_workers: number of threads to compute and write blocks with. Defaults to the number of cores.
+        codec: (only for '.zarr') compression codec, see `get_zarr_compressor`.
+        compression_level: (only for '.zarr') compression level of `codec`
+        chunks: (only for '.zarr') chunk shape to store. Defaults to the dask chunks or dask's 'auto' chunking.
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    data = tensor.data
+    if suffix == ".zarr":
+        if zarr is None:
+            raise ImportError("Saving tensors as '.zarr' requires zarr to be installed.")
+
+        if not isinstance(data, da.Array):
+            data = da.from_array(data, chunks="auto" if chunks is None else tuple(chunks))
+        elif chunks is not None:
+            data = data.rechunk(tuple(chunks))
+
+        data.to_zarr(
+            str(path), overwrite=True, compute=False, compressor=get_zarr_compressor(codec, compression_level)
+        ).compute(scheduler="threads", num_workers=num_workers)
+    elif not isinstance(data, da.Array):
+        save_image(str(path), tensor)
+    elif suffix == ".npy":
+        out = np.lib.format.open_memmap(str(path), mode="w+", dtype=data.dtype, shape=data.shape)
+        da.store(data, out, lock=False, scheduler="threads", num_workers=num_workers)
+        out.flush()
+        del out
+    elif suffix in TIFF_SUFFIXES and tifffile is not None and data.ndim >= 2:
+        tile = _get_tiff_tile(data.chunks)
+        tifffile.imwrite(
+            str(path), _iter_tiff_tiles(data, tile, num_workers), shape=data.shape, dtype=data.dtype, tile=tile
+        )
+    else:
+        save_image(str(path), tensor.compute(scheduler="threads", num_workers=num_workers))
@@ -0,0 +1,185 @@
+import contextlib
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, Optional, Sequence, Tuple
+
+from dask.callbacks import Callback
+from tqdm import tqdm
+
+
+@dataclass
+class ProgressInfo:
+    """progress of a unit of work, e.g. the tiles of an inference or the steps of a workflow"""
+
+    description: str
+    done: int
+    total: Optional[int]
+    elements: int  # processed elements, e.g. output pixels of the tiles done
+    elapsed: float  # seconds since start
+    elements_per_second: float
+    eta: Optional[float]  # estimated remaining seconds
+
+    @property
+    def finished(self) -> bool:
+        return self.total is not None and self.done >= self.total
+
+
+ProgressCallback = Callable[[ProgressInfo], None]
+
+_current_progress_callback: ContextVar[Optional[ProgressCallback]] = ContextVar(
+    "bioimageio_workflows_progress_callback", default=None
+)
+
+
+def get_progress_callback() -> Optional[ProgressCallback]:
+    return _current_progress_callback.get()
+
+
+@contextlib.contextmanager
+def progress_scope(callback: Optional[ProgressCallback]) -> Iterator[Optional[ProgressCallback]]:
+    """make `callback` the current progress callback reported to by `ProgressTracker`s (and `DaskProgress`)"""
+    reset_callback = _current_progress_callback.set(callback)
+    try:
+        yield callback
+    finally:
+        _current_progress_callback.reset(reset_callback)
+
+
+class ProgressTracker:
+    """Track progress and estimate the remaining time of `total` units of work.
+
+    Updates are reported to `callback` (defaults to the current progress callback) at most every `min_interval`
+    seconds; the first and the final update are always reported.
+    """
+
+    def __init__(
+        self,
+        description: str,
+        total: Optional[int] = None,
+        callback: Optional[ProgressCallback] = None,
+        min_interval: float = 0.1,
+    ):
+        self.description = description
+        self.total = total
+        self.callback = get_progress_callback() if callback is None else callback
+        self.min_interval = min_interval
+        self.done = 0
+        self.elements = 0
+        self.start = time.perf_counter()
+        self._last_report: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def get_info(self) -> ProgressInfo:
+        elapsed = time.perf_counter() - self.start
+        if self.total is None or self.done == 0:
+            eta = None
+        else:
+            eta = max(0.0, elapsed / self.done * (self.total - self.done))
+
+        return ProgressInfo(
+            description=self.description,
+            done=self.done,
+            total=self.total,
+            elements=self.elements,
+            elapsed=elapsed,
+            elements_per_second=self.elements / elapsed if elapsed > 0 else 0.0,
+            eta=eta,
+        )
+
+    def update(self, n: int = 1, elements: int = 0) -> None:
+        with self._lock:
+            self.done += n
+            self.elements += elements
+            if self.callback is None:
+                return
+
+            now = time.perf_counter()
+            finished = self.total is not None and self.done >= self.total
+            if not finished and self._last_report is not None and now - self._last_report < self.min_interval:
+                return
+
+            self._last_report = now
+            info = self.get_info()
+
+        self.callback(info)
+
+
+class DaskProgress(Callback):
+    """Report progress of dask computations (run by a local scheduler) to a progress callback.
+
+    Only tasks whose key name starts with one of `key_prefixes` are counted, e.g. the tiles of an inference graph.
+    By default all tasks are counted. Use as context manager to track all computations within it (see
+    `get_dask_progress_callback` to track a single computation).
+    """
+
+    def __init__(
+        self,
+        description: str = "tasks",
+        key_prefixes: Optional[Sequence[str]] = None,
+        callback: Optional[ProgressCallback] = None,
+        min_interval: float = 0.1,
+    ):
+        super().__init__()
+        self.description = description
+        self.key_prefixes = None if key_prefixes is None else tuple(key_prefixes)
+        self.callback = get_progress_callback() if callback is None else callback
+        self.min_interval = min_interval
+        self.tracker: Optional[ProgressTracker] = None
+
+    def _is_tracked(self, key) -> bool:
+        if self.key_prefixes is None:
+            return True
+
+        # block keys are tuples of the layer name and block indices
+        return isinstance(key, tuple) and len(key) > 1 and str(key[0]).startswith(self.key_prefixes)
+
+    def _start_state(self, dsk, state):
+        total = sum(self._is_tracked(k) for k in [*state["ready"], *state["waiting"]])
+        self.tracker = ProgressTracker(self.description, total, self.callback, self.min_interval)
+
+    def _posttask(self, key, result, dsk, state, worker_id):
+        if self.tracker is not None and self._is_tracked(key):
+            self.tracker.update(1, elements=getattr(result, "size", 0))
+
+
+def get_dask_progress_callback(
+    description: str = "tasks",
+    key_prefixes: Optional[Sequence[str]] = None,
+    callback: Optional[ProgressCallback] = None,
+) -> Tuple[Optional[Callable], ...]:
+    """dask callback reporting the progress of a computation, see `DaskProgress`
+
+    Pass it explicitly as `.compute(callbacks=[get_dask_progress_callback(...)])` to only affect that computation.
+    """
+    return DaskProgress(description, key_prefixes, callback)._callback
+
+
+class TqdmProgressCallback:
+    """progress callback showing a tqdm progress bar per progress description"""
+
+    def __init__(self, **tqdm_kwargs):
+        self.tqdm_kwargs = tqdm_kwargs
+        self.bars: Dict[str, tqdm] = {}
+
+    def __call__(self, info: ProgressInfo) -> None:
+        bar = self.bars.get(info.description)
+        if bar is None or (bar.total is not None and bar.n > info.done):
+            if bar is not None:
+                bar.close()
+
+            bar = self.bars[info.description] = tqdm(desc=info.description, total=info.total, **self.tqdm_kwargs)
+
+        bar.total = info.total
+        bar.set_postfix_str(f"{info.elements_per_second / 1e6:.2f} M elements/s", refresh=False)
+        bar.update(info.done - bar.n)
+        if info.finished:
+            bar.close()
+            del self.bars[info.description]
+
+    def close(self) -> None:
+        for bar in self.bars.values():
+            bar.close()
+
+        self.bars.clear()
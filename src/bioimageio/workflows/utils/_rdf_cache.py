@@ -0,0 +1,203 @@
+import contextlib
+import copy
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+import urllib.request
+import warnings
+import zipfile
+from os import PathLike
+from pathlib import Path
+from typing import Any, Dict, IO, Optional, Union
+
+from bioimageio.spec import load_raw_resource_description, serialize_raw_resource_description_to_dict
+from bioimageio.spec.shared import yaml
+from bioimageio.spec.shared.common import BIOIMAGEIO_CACHE_PATH
+from bioimageio.spec.shared.raw_nodes import ResourceDescription as RawResourceDescription, URI
+from bioimageio.workflows.utils._cache_stats import record_cache_access
+
+USE_RDF_CACHE = os.getenv("BIOIMAGEIO_USE_RDF_CACHE", "true").lower() in ("true", "yes", "1")
+RDF_CACHE_PATH = Path(os.getenv("BIOIMAGEIO_RDF_CACHE_PATH", BIOIMAGEIO_CACHE_PATH / "workflows_rdf_cache"))
+RDF_CACHE_TTL = float(os.getenv("BIOIMAGEIO_RDF_CACHE_TTL", str(24 * 60 * 60)))
+RDF_CACHE_MAX_ENTRIES = int(os.getenv("BIOIMAGEIO_RDF_CACHE_MAX_ENTRIES", "256"))
+REMOTE_RDF_TIMEOUT = 10  # seconds to wait for a remote RDF when revalidating a cache entry
+
+# cache entries of this process by entry key. Entries hold serialized RDFs, such that each call gets its own node.
+_memory_cache: Dict[str, Dict[str, Any]] = {}
+_lock = threading.Lock()
+
+
+def _dump_node(node: RawResourceDescription) -> Dict[str, Any]:
+    """serialized (validated) RDF with the root path to resolve its relative paths against"""
+    rdf = serialize_raw_resource_description_to_dict(node)
+    rdf["root_path"] = str(node.root_path)
+    return rdf
+
+
+def _load_node(rdf: Dict[str, Any]) -> RawResourceDescription:
+    return load_raw_resource_description(copy.deepcopy(rdf))
+
+
+def _hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _fetch_remote(uri: str) -> Optional[bytes]:
+    """content of a remote RDF (None for sources resolved by bioimageio.spec only, e.g. bioimageio ids or DOIs)"""
+    if not uri.startswith(("http://", "https://")):
+        return None
+
+    with urllib.request.urlopen(uri, timeout=REMOTE_RDF_TIMEOUT) as r:
+        return r.read()
+
+
+def _get_entry_path(key: str) -> Path:
+    return RDF_CACHE_PATH / f"{key}.json"
+
+
+def _load_entry(key: str) -> Optional[Dict[str, Any]]:
+    entry = _memory_cache.get(key)
+    if entry is not None:
+        return entry
+
+    path = _get_entry_path(key)
+    try:
+        with path.open(encoding="utf-8") as f:
+            entry = json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        warnings.warn(f"Ignoring invalid RDF cache entry {path}: {e}")
+        _remove(path)
+        return None
+
+    _memory_cache[key] = entry
+    return entry
+
+
+def _save_entry(key: str, entry: Dict[str, Any]) -> None:
+    _memory_cache[key] = entry
+    try:
+        data = json.dumps(entry, ensure_ascii=False).encode("utf-8")
+        RDF_CACHE_PATH.mkdir(parents=True, exist_ok=True)
+        tmp_path = _get_entry_path(key).with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, _get_entry_path(key))  # atomic, such that concurrent processes never read partial entries
+        _evict()
+    except Exception as e:
+        warnings.warn(f"Failed to save RDF cache entry for {entry['uri']}: {e}")
+
+
+def _remove(path: Path) -> None:
+    with contextlib.suppress(FileNotFoundError):
+        path.unlink()
+
+
+def _touch(key: str) -> None:
+    """mark an entry as recently used (for least recently used eviction)"""
+    try:
+        os.utime(_get_entry_path(key))
+    except OSError:
+        pass
+
+
+def _evict() -> None:
+    """remove the least recently used entries beyond `RDF_CACHE_MAX_ENTRIES`"""
+    entries = sorted(RDF_CACHE_PATH.glob("*.json"), key=lambda p: p.stat().st_mtime)
+    for path in entries[: max(0, len(entries) - RDF_CACHE_MAX_ENTRIES)]:
+        _remove(path)
+        _memory_cache.pop(path.stem, None)
+
+
+def clear_rdf_cache() -> None:
+    with _lock:
+        _memory_cache.clear()
+        for path in RDF_CACHE_PATH.glob("*.json"):
+            _remove(path)
+
+
+def load_cached_raw_resource_description(
+    source: Union[str, PathLike, dict, IO, bytes, URI, RawResourceDescription],
+    update_to_format: Optional[str] = None,
+) -> RawResourceDescription:
+    """`load_raw_resource_description` with a persistent cache of validated RDFs.
+
+    Entries are keyed by source URI (and `update_to_format`) and store the validated RDF (as JSON) and the hash of the
+    RDF content it was validated from. Local files are rehashed on every call, remote RDFs are trusted for `BIOIMAGEIO_RDF_CACHE_TTL` seconds and
+    then revalidated by their content hash. If a remote RDF cannot be fetched (offline) an expired entry is used.
+    The least recently used entries beyond `BIOIMAGEIO_RDF_CACHE_MAX_ENTRIES` are evicted.
+    Other sources (dicts, streams, yaml strings, raw nodes) are loaded without caching.
+    """
+    if isinstance(source, URI):
+        source = str(source)
+    elif isinstance(source, PathLike):
+        source = str(Path(source).absolute())
+
+    if not USE_RDF_CACHE or not isinstance(source, str) or "\n" in source:
+        return load_raw_resource_description(source, update_to_format=update_to_format)
+
+    local = not source.startswith(("http://", "https://")) and Path(source).is_file()
+    uri = str(Path(source).absolute()) if local else source
+    key = _hash(f"{uri}|{update_to_format}".encode())
+    with _lock:
+        entry = _load_entry(key)
+
+    content: Optional[bytes] = None
+    if local:
+        content = Path(uri).read_bytes()
+        hit = entry is not None and entry["content_hash"] == _hash(content)
+    elif entry is not None and time.time() - entry["validated"] < RDF_CACHE_TTL:
+        hit = True
+    elif entry is not None:
+        try:
+            content = _fetch_remote(uri)
+        except Exception as e:
+            warnings.warn(f"Using expired RDF cache entry for {uri}, because it could not be fetched: {e}")
+            hit = True
+        else:
+            hit = content is not None and entry["content_hash"] == _hash(content)
+            if hit:
+                entry["validated"] = time.time()
+                with _lock:
+                    _save_entry(key, entry)
+    else:
+        hit = False
+
+    record_cache_access("rdf", hit)
+    if hit:
+        assert entry is not None
+        _touch(key)
+        return _load_node(entry["rdf"])
+
+    if content is None and not local:
+        try:
+            content = _fetch_remote(uri)
+        except Exception:
+            content = None  # let bioimageio.spec report the error (or resolve the source)
+
+    # validate the content we hashed, instead of letting bioimageio.spec read (or download) the source again
+    if content is None or zipfile.is_zipfile(io.BytesIO(content)):
+        content_hash = None if content is None else _hash(content)
+        rdf_source: Any = source  # packaged resources are extracted by bioimageio.spec
+    else:
+        content_hash = _hash(content)
+        rdf_source = yaml.load(content.decode("utf-8"))
+        if isinstance(rdf_source, dict):
+            rdf_source["root_path"] = str(Path(uri).parent) if local else str(URI(uri_string=uri).parent)
+
+    try:
+        node = load_raw_resource_description(rdf_source, update_to_format=update_to_format)
+    except Exception as e:
+        if local or entry is None:
+            raise
+
+        warnings.warn(f"Using expired RDF cache entry for {uri}, because it could not be loaded: {e}")
+        return _load_node(entry["rdf"])
+
+    with _lock:
+        _save_entry(key, dict(uri=uri, content_hash=content_hash, validated=time.time(), rdf=_dump_node(node)))
+
+    return node
@@ -0,0 +1,147 @@
+import warnings
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import dask
+import dask.array as da
+import numpy as np
+import xarray as xr
+
+NUMPY_BLOCK_SIZE = 2**20  # elements per block when reducing numpy arrays; keeps intermediate copies cache friendly
+PERCENTILE_SAMPLES = 10**6  # default number of samples to estimate percentiles of dask arrays from
+
+# partial statistics of a block: (count, nan count, mean, sum of squared deviations from mean, min, max)
+_Partial = Tuple[int, int, float, float, float, float]
+_EMPTY: _Partial = (0, 0, 0.0, 0.0, np.inf, -np.inf)
+
+
+def _block_stats(block: np.ndarray) -> _Partial:
+    block = np.asarray(block).ravel()
+    nans = 0
+    if block.dtype.kind in "fc":
+        nan_mask = np.isnan(block)
+        nans = int(np.count_nonzero(nan_mask))
+        if nans:
+            block = block[~nan_mask]
+
+    n = block.size
+    if n == 0:
+        return (0, nans, 0.0, 0.0, np.inf, -np.inf)
+
+    mean = block.mean(dtype="float64")
+    deviation = block.astype("float64") - mean
+    return (n, nans, float(mean), float(np.dot(deviation, deviation)), float(block.min()), float(block.max()))
+
+
+def _combine(partials: Sequence[_Partial]) -> _Partial:
+    """combine partial statistics with the parallel algorithm of Chan et al."""
+    n, nans, mean, m2, mi, ma = _EMPTY
+    for pn, pnans, pmean, pm2, pmi, pma in partials:
+        nans += pnans
+        if pn == 0:
+            continue
+
+        total = n + pn
+        delta = pmean - mean
+        mean += delta * pn / total
+        m2 += pm2 + delta**2 * n * pn / total
+        n = total
+        mi = min(mi, pmi)
+        ma = max(ma, pma)
+
+    return (n, nans, mean, m2, mi, ma)
+
+
+def _finalize(partial: _Partial, percentiles: Sequence[float], samples: Optional[np.ndarray]) -> Dict[str, float]:
+    n, nans, mean, m2, mi, ma = partial
+    stats = {
+        "count": n,
+        "nan_count": nans,
+        "mean": mean if n else np.nan,
+        "std": float(np.sqrt(m2 / n)) if n else np.nan,
+        "min": mi if n else np.nan,
+        "max": ma if n else np.nan,
+    }
+    if percentiles:
+        assert samples is not None
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # all-nan samples
+            values = np.nanpercentile(samples, percentiles) if samples.size else [np.nan] * len(percentiles)
+        stats.update({f"p{p:g}": float(v) for p, v in zip(percentiles, values)})
+
+    return stats
+
+
+def _sample_numpy(data: np.ndarray, max_samples: Optional[int]) -> np.ndarray:
+    flat = data.reshape(-1)
+    if max_samples is None or flat.size <= max_samples:
+        return flat
+
+    return flat[:: -(-flat.size // max_samples)]
+
+
+def _numpy_stats(data: np.ndarray, max_samples: Optional[int]) -> _Partial:
+    flat = _sample_numpy(data, max_samples)
+    return _combine([_block_stats(flat[i : i + NUMPY_BLOCK_SIZE]) for i in range(0, flat.size, NUMPY_BLOCK_SIZE)])
+
+
+def _sample_dask_blocks(data: da.Array, max_samples: Optional[int]) -> List[Any]:
+    """(delayed) evenly spaced blocks of `data` that hold at least `max_samples` elements"""
+    # without graph optimization blocks keep their keys, such that blocks shared between tensors are computed once
+    blocks = list(data.to_delayed(optimize_graph=False).ravel()) if data.size else []
+    if max_samples is None or data.size <= max_samples:
+        return blocks
+
+    block_size = data.size / len(blocks)
+    n_blocks = min(len(blocks), int(np.ceil(max_samples / block_size)))
+    return [blocks[i] for i in np.linspace(0, len(blocks) - 1, n_blocks).round().astype(int)]
+
+
+def _strided_sample(block: np.ndarray, step: int) -> np.ndarray:
+    return np.asarray(block).reshape(-1)[::step]
+
+
+def get_tensor_stats(
+    tensors: Dict[str, Union[np.ndarray, da.Array, xr.DataArray]],
+    percentiles: Sequence[float] = (),
+    max_samples: Optional[int] = None,
+) -> Dict[str, Dict[str, float]]:
+    """Compute count, nan count, mean, std, min, max (and percentiles) of each tensor in a single fused pass.
+
+    Statistics of all dask-backed tensors are computed together with one `dask.compute` call; each block is read
+    once and reduced to partial statistics which are then combined.
+
+    Args:
+        tensors: tensors by name
+        percentiles: percentiles (0-100) to compute. For dask arrays these are estimated from a sample of at most
+            `max_samples` (or `PERCENTILE_SAMPLES`) elements.
+        max_samples: If given, statistics are computed on (roughly) evenly spaced samples of at most this many
+            elements (whole blocks for dask arrays) instead of all elements.
+    """
+    results: Dict[str, Dict[str, float]] = {}
+    lazy: Dict[str, Tuple[Any, Any]] = {}
+    for name, tensor in tensors.items():
+        data = tensor.data if isinstance(tensor, xr.DataArray) else tensor
+        if isinstance(data, da.Array):
+            blocks = _sample_dask_blocks(data, max_samples)
+            partial = dask.delayed(_combine)([dask.delayed(_block_stats)(b) for b in blocks])
+            if percentiles:
+                n_samples = max_samples or PERCENTILE_SAMPLES
+                step = max(1, -(-data.size * len(blocks) // data.npartitions // n_samples))
+                samples = dask.delayed(np.concatenate)(
+                    [dask.delayed(_strided_sample)(b, step) for b in blocks] or [np.empty((0,))]
+                )
+            else:
+                samples = None
+
+            lazy[name] = (partial, samples)
+        else:
+            data = np.asarray(data)
+            samples = _sample_numpy(data, max_samples) if percentiles else None
+            results[name] = _finalize(_numpy_stats(data, max_samples), percentiles, samples)
+
+    if lazy:
+        (computed,) = dask.compute(lazy)
+        for name, (partial, samples) in computed.items():
+            results[name] = _finalize(partial, percentiles, samples)
+
+    return {name: results[name] for name in tensors}
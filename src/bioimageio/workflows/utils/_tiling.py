@@ -1,12 +1,17 @@
+import functools
 import math
 import warnings
 from collections import defaultdict
+from dataclasses import dataclass
+from fractions import Fraction
 from typing import Dict, List, Sequence, Tuple, TypeVar
 
 import numpy as np
 
 from bioimageio.spec.model import raw_nodes
 
+SPACE_TIME_AXES = ("x", "y", "z", "t", "time")
+
 TA = TypeVar("TA")
 TS = TypeVar("TS")
 
@@ -21,14 +26,28 @@ def transpose_sequence(sequence: Sequence[TS], axes: Sequence[TA], desired_axes:
     return [default if ia not in axes else sequence[axes.index(ia)] for ia in desired_axes]
 
 
+def _get_input_step(scale: float) -> int:
+    """smallest number of input pixels that yields a whole number of output pixels, e.g. 2 for scale 0.5"""
+    return Fraction(scale).limit_denominator(1000).denominator
+
+
 def get_chunk(
-    chunk, ipt: raw_nodes.InputTensor, outputs: Sequence[raw_nodes.OutputTensor], tensor
+    chunk,
+    ipt: raw_nodes.InputTensor,
+    outputs: Sequence[raw_nodes.OutputTensor],
+    tensor,
+    valid_axes: Sequence[str] = (),
 ) -> Tuple[Dict[str, int], Dict[int, int], Dict[str, Tuple[int, int]]]:
-    """correct chunk to account for offset and halo
+    """correct chunk to account for offset, halo and scale of all outputs referencing `ipt`
+
+    Overlap and chunk are multiples of the input pixels that yield whole output pixels (for fractional scales).
+    Positive (space/time) offsets are cut off tiles like a halo. To keep them at the image edges the input is padded
+    accordingly, except for `valid_axes` (axes without border padding).
 
     Returns:
         corrected chunk: to tile the input array with
         overlap: overlap of corrected chunks (yields original chunks)
+        padding: padding of the input tensor
     """
     ipt_shape = np.array([chunk[a] for a in ipt.axes], dtype=int)
     referencing_outputs = [
@@ -43,37 +62,41 @@ def get_chunk(
             defaultdict(lambda: (0, 0)),
         )
 
-    if len(referencing_outputs) > 1:
-        raise NotImplementedError("more than one output references an input")
-
-    sohs = [
-        (
-            np.array(transpose_sequence(ot.shape.scale, ot.axes, ipt.axes, 1.0)),
-            np.array(transpose_sequence(ot.shape.offset, ot.axes, ipt.axes, 0.0)),
-            np.array(transpose_sequence(ot.halo, ot.axes, ipt.axes, 0.0)),
-        )
-        for ot in referencing_outputs
-    ]
-    scale, offset, halo = sohs[0]
-    if any((s != scale).any() or (off != offset).any() or (h != halo).any() for s, off, h in sohs[1:]):
-        # todo: ignore any new dimensions denoted by scale entry of None
+    overlap = np.zeros(len(ipt.axes), dtype=int)
+    edge_padding = np.zeros(len(ipt.axes), dtype=int)
+    step = np.ones(len(ipt.axes), dtype=int)
+    for ot in referencing_outputs:
+        scale = [1.0 if sc is None else sc for sc in ot.shape.scale]
+        halo = ot.halo if isinstance(ot.halo, list) else [0] * len(ot.axes)
+        for a, sc, off, h in zip(ot.axes, scale, ot.shape.offset, halo):
+            if a not in ipt.axes or a not in SPACE_TIME_AXES:
+                continue
+
+            if h < 0 or sc <= 0:
+                raise ValueError(f"Invalid halo {h} or scale {sc} for axis {a} of output {ot.name}.")
+
+            i = ipt.axes.index(a)
+            step[i] = np.lcm(step[i], _get_input_step(sc))
+            overlap[i] = max(overlap[i], math.ceil(max(h - off, 0) / sc))  # no negative overlap
+            if off > 0 and a not in valid_axes:
+                edge_padding[i] = max(edge_padding[i], math.ceil(off / sc))
+
+    # round up to whole output pixels
+    overlap = -(-overlap // step) * step
+    edge_padding = -(-edge_padding // step) * step
+    corrected_chunk = ipt_shape - 2 * overlap
+    invalid = [a for a, c, st in zip(ipt.axes, corrected_chunk, step) if c <= 0 or c % st]
+    if invalid:
         raise ValueError(
-            f"Incompatible output specs referencing same input tensor with different scale/offset/halo: {[out.name for out in referencing_outputs]}."
+            f"Tile {dict(zip(ipt.axes, ipt_shape))} of input {ipt.name} is invalid for axes {invalid}: without an "
+            f"overlap of {dict(zip(ipt.axes, overlap))} on both sides it needs to be a positive multiple of "
+            f"{dict(zip(ipt.axes, step))}."
         )
 
-    if any(off > 0 for a, off in zip(offset, ipt.axes) if a in ("x", "y", "z", "t", "time")):
-        raise NotImplementedError(
-            "offset>0; space/time output is larger than input. todo: cut offset on tiles, but leave at image edge."
-        )
-
-    assert all(h >= 0 for h in halo)
-    overlap = np.maximum((halo - offset) / scale, 0)  # no negative overlap
-    overlap = np.ceil(overlap).astype(int)
-    corrected_chunk = ipt_shape - 2 * overlap
     t_shape = np.array(tensor.shape, dtype=int)
     assert len(t_shape) == len(ipt_shape)
-    padding_total = (corrected_chunk - (t_shape % corrected_chunk)) % corrected_chunk
-    padding = [(0, p) for p in padding_total]
+    padding_total = (corrected_chunk - ((t_shape + 2 * edge_padding) % corrected_chunk)) % corrected_chunk
+    padding = [(int(e), int(e + p)) for e, p in zip(edge_padding, padding_total)]
 
     return (
         dict(zip(ipt.axes, corrected_chunk)),
@@ -123,7 +146,13 @@ def get_output_rois(
     input_overlaps: Dict[str, Dict[int, int]],
     input_paddings: Dict[str, Dict[str, Tuple[int, int]]],
     ipt_by_name: Dict[str, raw_nodes.InputTensor],
+    valid_axes: Sequence[str] = (),
 ) -> Tuple[Sequence[Tuple[int, int]], Sequence[Tuple[int, int]]]:
+    """regions to trim off each output tile (its effective halo) and off the stitched output (padding and offset)
+
+    Positive offsets are kept at the image edges (see `get_chunk`), except for `valid_axes` (axes without border
+    padding).
+    """
     if isinstance(out.shape, raw_nodes.ImplicitOutputShape):
         scale = np.array([1.0 if s is None else s for s in out.shape.scale])
         offset: Sequence[float] = out.shape.offset
@@ -146,7 +175,7 @@ def get_output_rois(
             errors_in = (["halo"] if eff_halo_float[i] else []) + (["offset"] if offset[i] else [])
             if errors_in:
                 raise ValueError(f"invalid {' and '.join(errors_in)} for batch dimension of output {out.name}")
-        elif a in ("x", "y", "z", "t", "time"):
+        elif a in SPACE_TIME_AXES:
             pass
         elif a in ("i", "index", "c", "channel"):
             # ignore offset. As we cannot tile across these dimensions, offsets should be returned, not trimmed.
@@ -160,42 +189,155 @@ def get_output_rois(
         output_chunk_roi.append(get_asymmetric_halolike(eff_halo_float[i]))
 
     # undo input padding for the resulting final output tensor
-    # also trim any negative offset, which we padded for each chunk
+    # also trim any negative offset, which we padded for each chunk, but keep positive offsets at the image edges
     output_roi = []
     for a, s, off in zip(out.axes, scale, offset):
         p0, p1 = ref_input_padding_dict.get(a, (0, 0))
-        off0, off1 = get_asymmetric_halolike(-min(off, 0))
-        output_roi.append((math.ceil(p0 * s + off0), math.ceil(p1 * s + off1)))
+        if off > 0 and a in SPACE_TIME_AXES and a not in valid_axes:
+            off0, off1 = get_asymmetric_halolike(off)
+            output_roi.append((math.ceil(p0 * s) - off0, math.ceil(p1 * s) - off1))
+        else:
+            off0, off1 = get_asymmetric_halolike(-min(off, 0))
+            output_roi.append((math.ceil(p0 * s + off0), math.ceil(p1 * s + off1)))
 
     return output_chunk_roi, output_roi
 
 
+def _trim_blocks(blocks: np.ndarray, roi: Tuple[int, int]) -> np.ndarray:
+    """index, crop start and crop stop of each block (given by its size) that remains after trimming `roi`
+
+    Returns:
+        array of shape (remaining blocks, 3)
+    """
+    stops = np.cumsum(blocks)
+    starts = stops - blocks
+    total = int(stops[-1]) if len(stops) else 0
+    crop_starts = np.maximum(starts, roi[0])
+    crop_stops = np.minimum(stops, total - roi[1])
+    kept = np.flatnonzero(crop_starts < crop_stops)
+    if not len(kept):
+        raise ValueError(f"Trimming too much from output {total} with roi {roi}")
+
+    return np.stack([kept, crop_starts[kept] - starts[kept], crop_stops[kept] - starts[kept]], axis=1)
+
+
 def get_corrected_chunks(chunks: Dict[int, Sequence[int]], shape: Sequence[int], roi: Sequence[Tuple[int, int]]):
     """adapt `chunks` chunking `shape` for `shape[roi]`"""
     corrected_chunks = []
     rechunk = False
-    for i, (s, roi) in enumerate(zip(shape, roi)):
-        c = chunks[i]
-        assert s == sum(c), (s, c)
-        if sum(roi):
-            c = list(c)
-            r0 = roi[0]
-            while r0 >= c[0]:
-                r0 -= c[0]
-                c = c[1:]
-                if not c:
-                    raise ValueError(f"Trimming too much from output {shape} with roi {roi}")
-
-            c[0] -= r0
-
-            r1 = roi[1]
-            while r1 >= c[-1]:
-                r1 -= c[-1]
-                c = c[:-1]
-                if not c:
-                    raise ValueError(f"Trimming too much from output {shape} with roi {roi}")
-
-            c[-1] -= r1
-
-        corrected_chunks.append(c)
+    for i, (s, r) in enumerate(zip(shape, roi)):
+        c = np.asarray(chunks[i], dtype=int)
+        assert s == c.sum(), (s, c)
+        if sum(r):
+            kept = _trim_blocks(c, r)
+            c = kept[:, 2] - kept[:, 1]
+
+        corrected_chunks.append([int(cc) for cc in c])
+
     return corrected_chunks, rechunk
+
+
+@dataclass(frozen=True, eq=False)
+class TileGrid:
+    """Geometry of all tiles of a (padded) input and of the output blocks they yield
+
+    Tiles are windows at multiples of `step`. Each tile yields an output block of shape `out_block`; the concatenated
+    output blocks are trimmed by `out_roi`. All geometry is computed per axis as numpy arrays (see `create`) and
+    combined for all tiles with `input_slices`, `crops` and `output_slices`.
+    """
+
+    window: Tuple[int, ...]  # input window shape
+    step: Tuple[int, ...]  # distance between windows (per input axis)
+    n_tiles: Tuple[int, ...]  # number of windows per input axis
+    out_to_in: Tuple[int, ...]  # input axis index of each output axis
+    out_block: Tuple[int, ...]  # output block shape (per output axis) of each window
+    out_roi: Tuple[Tuple[int, int], ...]  # region to trim off the concatenated output blocks (per axis and side)
+    kept: Tuple[np.ndarray, ...]  # per output axis: tile index, crop start and crop stop of each kept output block
+
+    @classmethod
+    def create(
+        cls,
+        shape: Sequence[int],
+        window: Sequence[int],
+        step: Sequence[int],
+        out_to_in: Sequence[int],
+        out_block: Sequence[int],
+        out_roi: Sequence[Tuple[int, int]],
+    ) -> "TileGrid":
+        assert len(window) == len(step) == len(shape)
+        assert len(out_to_in) == len(out_block) == len(out_roi)
+        n_tiles = tuple(int((s - w) // st + 1) for s, w, st in zip(shape, window, step))
+        assert all(n >= 1 for n in n_tiles), (shape, window)
+        assert all(
+            n == 1 for i, n in enumerate(n_tiles) if i not in out_to_in
+        ), "untiled input axes must fit one window"
+        kept = []
+        for in_axis, block, r in zip(out_to_in, out_block, out_roi):
+            k = _trim_blocks(np.full(n_tiles[in_axis], block, dtype=int), r)
+            k.flags.writeable = False  # shared by all users of a cached grid
+            kept.append(k)
+
+        return cls(
+            window=tuple(int(w) for w in window),
+            step=tuple(int(st) for st in step),
+            n_tiles=n_tiles,
+            out_to_in=tuple(int(i) for i in out_to_in),
+            out_block=tuple(int(b) for b in out_block),
+            out_roi=tuple((int(r0), int(r1)) for r0, r1 in out_roi),
+            kept=tuple(kept),
+        )
+
+    @property
+    def blocks_shape(self) -> Tuple[int, ...]:
+        """number of output blocks per output axis"""
+        return tuple(len(k) for k in self.kept)
+
+    @property
+    def output_chunks(self) -> Tuple[Tuple[int, ...], ...]:
+        return tuple(tuple(int(c) for c in k[:, 2] - k[:, 1]) for k in self.kept)
+
+    @property
+    def output_shape(self) -> Tuple[int, ...]:
+        return tuple(int((k[:, 2] - k[:, 1]).sum()) for k in self.kept)
+
+    def _combine(self, per_axis: Sequence[np.ndarray]) -> np.ndarray:
+        """combine per output axis values of the output blocks to shape (number of output blocks, output ndim, ...)"""
+        grids = np.meshgrid(*[np.arange(n) for n in self.blocks_shape], indexing="ij")
+        return np.stack([v[g.ravel()] for v, g in zip(per_axis, grids)], axis=1)
+
+    def tile_indices(self) -> np.ndarray:
+        """tile index per input axis of each output block (in C order), shape: (output blocks, input ndim)"""
+        indices = np.zeros((int(np.prod(self.blocks_shape)), len(self.window)), dtype=int)
+        indices[:, list(self.out_to_in)] = self._combine([k[:, 0] for k in self.kept])
+        return indices
+
+    def input_slices(self) -> np.ndarray:
+        """start and stop of the input window of each output block (in C order), shape: (output blocks, input ndim, 2)"""
+        starts = self.tile_indices() * np.array(self.step)
+        return np.stack([starts, starts + np.array(self.window)], axis=-1)
+
+    def crops(self) -> np.ndarray:
+        """start and stop within its tile's output of each output block, shape: (output blocks, output ndim, 2)"""
+        return self._combine([k[:, 1:] for k in self.kept])
+
+    def output_slices(self) -> np.ndarray:
+        """start and stop in the trimmed output of each output block, shape: (output blocks, output ndim, 2)"""
+        per_axis = []
+        for k in self.kept:
+            stops = np.cumsum(k[:, 2] - k[:, 1])
+            per_axis.append(np.stack([stops - (k[:, 2] - k[:, 1]), stops], axis=1))
+
+        return self._combine(per_axis)
+
+
+@functools.lru_cache(maxsize=64)
+def get_tile_grid(
+    shape: Tuple[int, ...],
+    window: Tuple[int, ...],
+    step: Tuple[int, ...],
+    out_to_in: Tuple[int, ...],
+    out_block: Tuple[int, ...],
+    out_roi: Tuple[Tuple[int, int], ...],
+) -> TileGrid:
+    """cached `TileGrid.create`, i.e. per model (tile halo, offset and scale), (padded) input shape and tile"""
+    return TileGrid.create(shape, window, step, out_to_in, out_block, out_roi)
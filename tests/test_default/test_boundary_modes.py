@@ -0,0 +1,165 @@
+import numpy as np
+import pytest
+import xarray as xr
+import yaml
+from numpy.testing import assert_array_almost_equal
+
+RADIUS = 2  # of the mean filter "model"; smaller than the model's halo
+
+
+class MeanFilterModelAdapter:
+    """stand-in for a model adapter applying a (2 * RADIUS + 1)^2 mean filter (wrapping around at tile borders)"""
+
+    def __init__(self, bioimageio_model, devices=None):
+        self.bioimageio_model = bioimageio_model
+
+    def forward(self, tensor):
+        shifts = range(-RADIUS, RADIUS + 1)
+        data = sum(np.roll(tensor, (dy, dx), axis=(-2, -1)) for dy in shifts for dx in shifts) / len(shifts) ** 2
+        return [tensor.copy(data=data) if isinstance(tensor, xr.DataArray) else data]
+
+
+def mean_filter(image: np.ndarray, mode: str) -> np.ndarray:
+    padded = np.pad(image, RADIUS, mode=mode)
+    filtered = MeanFilterModelAdapter(None).forward(padded)[0]
+    return filtered[RADIUS:-RADIUS, RADIUS:-RADIUS]
+
+
+@pytest.fixture
+def model_rdf(tmp_path, monkeypatch):
+    from bioimageio.workflows.envs.default import _inference
+
+    monkeypatch.setattr(_inference, "create_model_adapter", MeanFilterModelAdapter)
+    np.save(tmp_path / "test_input.npy", np.zeros((1, 1, 64, 64), dtype="float32"))
+    np.save(tmp_path / "test_output.npy", np.zeros((1, 1, 64, 64), dtype="float32"))
+    (tmp_path / "weights.pt").write_bytes(b"")
+    (tmp_path / "README.md").write_text("mean filter model")
+    tensor = dict(axes="bcyx", data_type="float32", data_range=[-np.inf, np.inf])
+    rdf = dict(
+        format_version="0.4.9",
+        type="model",
+        name="mean filter",
+        description="mean filter model",
+        authors=[{"name": "bioimage.io"}],
+        cite=[{"text": "BioImage.IO", "url": "https://doi.org/10.1101/2022.06.07.495102"}],
+        license="MIT",
+        documentation="README.md",
+        timestamp="2023-01-01T00:00:00",
+        test_inputs=["test_input.npy"],
+        test_outputs=["test_output.npy"],
+        inputs=[dict(name="input", shape=dict(min=[1, 1, 32, 32], step=[0, 0, 32, 32]), **tensor)],
+        outputs=[
+            dict(
+                name="output",
+                halo=[0, 0, 4, 4],
+                shape=dict(reference_tensor="input", scale=[1, 1, 1, 1], offset=[0, 0, 0, 0]),
+                **tensor,
+            )
+        ],
+        weights=dict(torchscript=dict(source="weights.pt")),
+    )
+    (tmp_path / "rdf.yaml").write_text(yaml.safe_dump(rdf))
+    return tmp_path / "rdf.yaml"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("fuse_tiles", [True, False])
+@pytest.mark.parametrize("mode", ["reflect", "constant", "edge"])
+async def test_boundary_modes(model_rdf, mode, fuse_tiles):
+    from bioimageio.workflows.envs.default import inference_with_dask
+
+    image = np.random.rand(48, 72).astype("float32")  # multiples of the tile shape without halo (24x24)
+    outputs = await inference_with_dask(
+        model_rdf,
+        [xr.DataArray(image[None, None], dims=tuple("bcyx"))],
+        boundary_mode=mode,
+        tiles=[dict(b=1, c=1, y=32, x=32)],
+        enable_preprocessing=False,
+        enable_postprocessing=False,
+        scheduler="synchronous",
+        fuse_tiles=fuse_tiles,
+    )
+    expected = mean_filter(image, "symmetric" if mode == "reflect" else mode)
+    assert_array_almost_equal(outputs["output"][0, 0], expected, decimal=5)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("fuse_tiles", [True, False])
+async def test_boundary_mode_none_per_axis(model_rdf, fuse_tiles):
+    from bioimageio.workflows.envs.default import inference_with_dask
+
+    image = np.random.rand(50, 70).astype("float32")
+    outputs = await inference_with_dask(
+        model_rdf,
+        [xr.DataArray(image[None, None], dims=tuple("bcyx"))],
+        boundary_mode=[{"y": "none", "x": "edge"}],
+        tiles=[dict(b=1, c=1, y=32, x=32)],
+        enable_preprocessing=False,
+        enable_postprocessing=False,
+        scheduler="synchronous",
+        fuse_tiles=fuse_tiles,
+    )
+    # valid-only output along y (without its halo of 4 on either side), edge padded along x
+    expected = mean_filter(np.pad(image, [(0, 0), (RADIUS, RADIUS)], mode="edge"), "constant")
+    assert_array_almost_equal(outputs["output"][0, 0], expected[4:-4, RADIUS:-RADIUS], decimal=5)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("stitching", ["cosine", "gaussian"])
+async def test_blended_stitching(model_rdf, stitching):
+    from bioimageio.workflows.envs.default import inference_with_dask
+
+    image = np.random.RandomState(0).rand(60, 90).astype("float32")
+    kwargs = dict(
+        tiles=[dict(b=1, c=1, y=32, x=32)],
+        enable_preprocessing=False,
+        enable_postprocessing=False,
+        scheduler="synchronous",
+    )
+    tensors = [xr.DataArray(image[None, None], dims=tuple("bcyx"))]
+    expected = mean_filter(image, "symmetric")
+
+    # a halo smaller than the filter radius yields seams that blending reduces
+    cropped = (await inference_with_dask(model_rdf, tensors, halo=dict(y=1, x=1), **kwargs))["output"][0, 0]
+    with pytest.warns(UserWarning, match="Overlapping tiles differ"):
+        blended = (
+            await inference_with_dask(
+                model_rdf, tensors, stitching=stitching, halo=dict(y=1, x=1), seam_tolerance=1e-3, **kwargs
+            )
+        )["output"][0, 0]
+
+    assert blended.shape == expected.shape
+    assert np.abs(blended - expected).mean() < np.abs(cropped - expected).mean()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("prefetch", [True, False])
+@pytest.mark.parametrize("mode", ["reflect", "constant", "edge", [{"y": "none", "x": "edge"}]])
+async def test_inference_tiled(model_rdf, mode, prefetch):
+    from bioimageio.workflows.envs.default import inference_tiled, inference_with_dask
+
+    image = np.random.rand(50, 70).astype("float32")
+    tensors = [xr.DataArray(image[None, None], dims=tuple("bcyx"))]
+    kwargs = dict(
+        boundary_mode=mode, tiles=[dict(b=1, c=1, y=32, x=32)], enable_preprocessing=False, enable_postprocessing=False
+    )
+    outputs = await inference_tiled(model_rdf, tensors, prefetch=prefetch, **kwargs)
+    expected = await inference_with_dask(model_rdf, tensors, scheduler="synchronous", **kwargs)
+    assert_array_almost_equal(outputs["output"], expected["output"], decimal=5)
+
+
+@pytest.mark.asyncio
+async def test_inference_tiled_to_memmap(model_rdf, tmp_path):
+    from bioimageio.workflows.envs.default import inference_tiled
+
+    image = np.random.rand(48, 72).astype("float32")
+    outputs = await inference_tiled(
+        model_rdf,
+        [xr.DataArray(image[None, None], dims=tuple("bcyx"))],
+        tiles=[dict(b=1, c=1, y=32, x=32)],
+        enable_preprocessing=False,
+        enable_postprocessing=False,
+        output_path=tmp_path / "output.npy",
+    )
+    assert isinstance(outputs["output"].data, np.memmap)
+    assert_array_almost_equal(np.load(tmp_path / "output.npy")[0, 0], mean_filter(image, "symmetric"), decimal=5)
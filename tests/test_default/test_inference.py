@@ -1,3 +1,6 @@
+import collections
+from types import SimpleNamespace
+
 import numpy as np
 import pytest
 from numpy.testing import assert_array_almost_equal
@@ -28,3 +31,73 @@ async def test_inference_with_dask():
     outputs = [outputs[model.outputs[0].name].data.compute(scheduler="single-threaded")]
     for exp, act in zip(expected_outputs, outputs):
         assert_array_almost_equal(exp[halo], act[halo])
+
+
+def test_model_adapter_created_once_per_process(monkeypatch):
+    from bioimageio.workflows.envs.default import _inference
+
+    created = []
+    monkeypatch.setattr(_inference, "load_cached_raw_resource_description", lambda source, **kwargs: source)
+    monkeypatch.setattr(
+        _inference, "create_model_adapter", lambda bioimageio_model, devices: created.append(object()) or created[-1]
+    )
+    monkeypatch.setattr(_inference, "_model_adapters", collections.OrderedDict())
+    for _ in range(3):
+        _inference._get_model_adapter("model.yaml", "model.yaml", ("cpu",))
+
+    assert len(created) == 1
+
+
+def test_model_adapters_are_least_recently_used_cache(monkeypatch):
+    from bioimageio.workflows.envs.default import _inference
+
+    created = []
+    monkeypatch.setattr(_inference, "load_cached_raw_resource_description", lambda source, **kwargs: source)
+    monkeypatch.setattr(
+        _inference,
+        "create_model_adapter",
+        lambda bioimageio_model, devices: created.append(bioimageio_model) or bioimageio_model,
+    )
+    monkeypatch.setattr(_inference, "_model_adapters", collections.OrderedDict())
+    monkeypatch.setattr(_inference, "MODEL_ADAPTER_CACHE_SIZE", 2)
+    for source in ["a", "b", "a", "c", "a", "b"]:
+        _inference._get_model_adapter(source, source, ("cpu",))
+
+    assert created == ["a", "b", "c", "b"]
+    assert [key for key, _ in _inference._model_adapters] == ["a", "b"]
+    _inference.clear_model_adapters()
+    assert not _inference._model_adapters
+
+
+def test_distributed_clusters_are_closed(monkeypatch):
+    from bioimageio.workflows.envs.default import _inference
+
+    closed = []
+
+    class Closable:
+        def __init__(self, name):
+            self.name = name
+
+        def close(self):
+            closed.append(self.name)
+
+    class LocalCluster(Closable):
+        def __init__(self, n_workers, **kwargs):
+            super().__init__(f"cluster{n_workers}")
+
+    class Client(Closable):
+        status = "running"
+
+        def __init__(self, cluster, **kwargs):
+            super().__init__(f"client{cluster.name[len('cluster'):]}")
+            self.cluster = cluster
+
+    monkeypatch.setattr(_inference, "distributed", SimpleNamespace(LocalCluster=LocalCluster, Client=Client))
+    monkeypatch.setattr(_inference, "_distributed_clients", {})
+    client = _inference._get_distributed_client(1)
+    assert _inference._get_distributed_client(1) is client
+    _inference._get_distributed_client(2)
+    assert closed == ["client1", "cluster1"]
+    _inference.close_distributed_clients()
+    assert closed == ["client1", "cluster1", "client2", "cluster2"]
+    assert not _inference._distributed_clients
@@ -0,0 +1,163 @@
+import numpy as np
+import pytest
+import xarray as xr
+import yaml
+from numpy.testing import assert_allclose, assert_array_equal
+
+
+def downsample(tensor):
+    return tensor[..., ::2, ::2]
+
+
+def pad_edge(tensor):  # output with a positive offset of 3
+    return np.pad(tensor, [(0, 0), (0, 0), (3, 3), (3, 3)], mode="edge")
+
+
+@pytest.fixture
+def make_model_rdf(tmp_path, monkeypatch):
+    """model RDF of a 'model' applying `func` (and the funcs of `extra_outputs`) to its input
+
+    The (hashes of the) input tiles the model is called with are recorded in `make.calls`.
+    """
+    from bioimageio.workflows.envs.default import _inference
+
+    def make(func, scale, offset, extra_outputs=()):
+        outputs = [(func, scale, offset), *extra_outputs]  # func, scale and offset per output
+
+        class ModelAdapter:
+            def __init__(self, bioimageio_model, devices=None):
+                self.bioimageio_model = bioimageio_model
+
+            def forward(self, tensor):
+                make.calls.append(hash(np.asarray(tensor).tobytes()))
+                return [xr.DataArray(f(np.asarray(tensor)), dims=tensor.dims) for f, _, _ in outputs]
+
+        make.calls.clear()
+        monkeypatch.setattr(_inference, "create_model_adapter", ModelAdapter)
+        np.save(tmp_path / "test_input.npy", np.zeros((1, 1, 64, 64), dtype="float32"))
+        for i, (f, _, _) in enumerate(outputs):
+            np.save(tmp_path / f"test_output{i}.npy", f(np.zeros((1, 1, 64, 64), dtype="float32")))
+
+        (tmp_path / "weights.pt").write_bytes(b"")
+        (tmp_path / "README.md").write_text(f"{func.__name__} model")
+        tensor = dict(axes="bcyx", data_type="float32", data_range=[-np.inf, np.inf])
+        rdf = dict(
+            format_version="0.4.9",
+            type="model",
+            name=func.__name__,
+            description=f"{func.__name__} model",
+            authors=[{"name": "bioimage.io"}],
+            cite=[{"text": "BioImage.IO", "url": "https://doi.org/10.1101/2022.06.07.495102"}],
+            license="MIT",
+            documentation="README.md",
+            timestamp="2023-01-01T00:00:00",
+            test_inputs=["test_input.npy"],
+            test_outputs=[f"test_output{i}.npy" for i in range(len(outputs))],
+            inputs=[dict(name="input", shape=dict(min=[1, 1, 16, 16], step=[0, 0, 16, 16]), **tensor)],
+            outputs=[
+                dict(
+                    name=f"output{i}" if i else "output",
+                    halo=[0, 0, 0, 0],
+                    shape=dict(reference_tensor="input", scale=sc, offset=off),
+                    **tensor,
+                )
+                for i, (_, sc, off) in enumerate(outputs)
+            ],
+            weights=dict(torchscript=dict(source="weights.pt")),
+        )
+        (tmp_path / "rdf.yaml").write_text(yaml.safe_dump(rdf))
+        return tmp_path / "rdf.yaml"
+
+    make.calls = []
+    return make
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("fuse_tiles", [True, False])
+async def test_downsampling_model(make_model_rdf, fuse_tiles):
+    from bioimageio.workflows.envs.default import inference_with_dask
+
+    model_rdf = make_model_rdf(downsample, scale=[1, 1, 0.5, 0.5], offset=[0, 0, 0, 0])
+    image = np.random.rand(1, 1, 60, 90).astype("float32")
+    outputs = await inference_with_dask(
+        model_rdf,
+        [xr.DataArray(image, dims=tuple("bcyx"))],
+        tiles=[dict(b=1, c=1, y=32, x=32)],
+        enable_preprocessing=False,
+        enable_postprocessing=False,
+        scheduler="synchronous",
+        fuse_tiles=fuse_tiles,
+    )
+    assert_array_equal(outputs["output"], downsample(image))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("fuse_tiles", [True, False])
+async def test_positive_offset_model(make_model_rdf, fuse_tiles):
+    from bioimageio.workflows.envs.default import inference_with_dask
+
+    model_rdf = make_model_rdf(pad_edge, scale=[1, 1, 1, 1], offset=[0, 0, 3, 3])
+    image = np.random.rand(1, 1, 60, 90).astype("float32")
+    outputs = await inference_with_dask(
+        model_rdf,
+        [xr.DataArray(image, dims=tuple("bcyx"))],
+        boundary_mode="edge",
+        tiles=[dict(b=1, c=1, y=32, x=32)],
+        enable_preprocessing=False,
+        enable_postprocessing=False,
+        scheduler="synchronous",
+        fuse_tiles=fuse_tiles,
+    )
+    # the offset is cut off the tiles, but kept at the image edges (from the padded input)
+    assert_array_equal(outputs["output"], pad_edge(image))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("engine", ["fused", "blockwise", "tiled"])
+async def test_multiple_outputs(make_model_rdf, engine):
+    from bioimageio.workflows.envs.default import inference_tiled, inference_with_dask
+
+    model_rdf = make_model_rdf(
+        downsample, scale=[1, 1, 0.5, 0.5], offset=[0, 0, 0, 0], extra_outputs=[(pad_edge, [1, 1, 1, 1], [0, 0, 3, 3])]
+    )
+    image = np.random.rand(1, 1, 60, 90).astype("float32")
+    kwargs = dict(
+        boundary_mode="edge",
+        tiles=[dict(b=1, c=1, y=32, x=32)],
+        enable_preprocessing=False,
+        enable_postprocessing=False,
+    )
+    tensors = [xr.DataArray(image, dims=tuple("bcyx"))]
+    if engine == "tiled":
+        outputs = await inference_tiled(model_rdf, tensors, **kwargs)
+    else:
+        outputs = await inference_with_dask(
+            model_rdf, tensors, scheduler="synchronous", fuse_tiles=engine == "fused", **kwargs
+        )
+
+    assert list(outputs) == ["output", "output1"]
+    assert_array_equal(outputs["output"], downsample(image))
+    assert_array_equal(outputs["output1"], pad_edge(image))
+    assert len(make_model_rdf.calls) == len(set(make_model_rdf.calls))  # the model runs once per tile
+
+
+@pytest.mark.asyncio
+async def test_multiple_outputs_blended(make_model_rdf):
+    from bioimageio.workflows.envs.default import inference_with_dask
+
+    model_rdf = make_model_rdf(
+        downsample, scale=[1, 1, 0.5, 0.5], offset=[0, 0, 0, 0], extra_outputs=[(np.negative, [1, 1, 1, 1], [0] * 4)]
+    )
+    image = np.random.rand(1, 1, 60, 90).astype("float32")
+    outputs = await inference_with_dask(
+        model_rdf,
+        [xr.DataArray(image, dims=tuple("bcyx"))],
+        tiles=[dict(b=1, c=1, y=32, x=32)],
+        enable_preprocessing=False,
+        enable_postprocessing=False,
+        scheduler="synchronous",
+        stitching="cosine",
+        halo=dict(y=4, x=4),
+    )
+    assert_allclose(outputs["output"], downsample(image), rtol=1e-6)
+    assert_allclose(outputs["output1"], -image, rtol=1e-6)
@@ -0,0 +1,58 @@
+import dask.array as da
+import numpy as np
+import pytest
+from numpy.testing import assert_allclose, assert_array_equal
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_tiled_map(lazy):
+    from bioimageio.workflows.envs.default._tile_graph import tiled_map
+
+    data = np.random.rand(2, 70, 50)
+    halo = 4
+    padded = np.pad(data, [(0, 0), (halo, halo + 10), (halo, halo + 14)], mode="symmetric")  # 80x64 = 4x4 tiles
+    if lazy:
+        padded = da.from_array(padded, chunks=(1, 13, 17))
+
+    def func(window):
+        assert window.shape == (1, 20 + 2 * halo, 16 + 2 * halo)
+        return window[:, halo:-halo, halo:-halo].transpose(2, 1, 0)  # output axes: x, y, b
+
+    result = tiled_map(
+        func,
+        padded,
+        window=(1, 20 + 2 * halo, 16 + 2 * halo),
+        step=(1, 20, 16),
+        out_to_in=(2, 1, 0),
+        out_block=(16, 20, 1),
+        out_roi=[(0, 14), (0, 10), (0, 0)],
+        dtype=data.dtype,
+        name="test",
+    )
+    assert result.chunks == ((16, 16, 16, 2), (20, 20, 20, 10), (1, 1))
+    assert len(result.__dask_graph__().layers[result.name]) == 1 + (not lazy) + 4 * 4 * 2  # func, input, tiles
+    assert_array_equal(result.compute(), data.transpose(2, 1, 0))
+
+
+@pytest.mark.parametrize("blending", ["cosine", "gaussian"])
+def test_blended_tiled_map(blending):
+    from bioimageio.workflows.envs.default._tile_graph import blended_tiled_map
+
+    data = np.random.rand(70, 50)
+    halo = 4
+    padded = np.pad(data, [(halo, halo + 10), (halo, halo + 14)], mode="symmetric")  # 80x64 = 4x4 tiles
+    result = blended_tiled_map(
+        lambda window: window[1:-1, :],  # outputs all but one pixel of the halo along the first axis
+        padded,
+        window=(20 + 2 * halo, 16 + 2 * halo),
+        step=(20, 16),
+        out_to_in=(0, 1),
+        out_block=(20, 16),
+        out_margin=[(halo - 1, halo - 1), (halo, halo)],
+        out_roi=[(0, 10), (0, 14)],
+        dtype=data.dtype,
+        name="test",
+        blending=blending,
+    )
+    assert result.chunks == ((20, 20, 20, 10), (16, 16, 16, 2))
+    assert_allclose(result.compute(), data)
@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+
+import dask.array as da
+import numpy as np
+import xarray as xr
+from marshmallow import missing
+from numpy.testing import assert_array_equal
+
+
+def test_fused_elementwise_steps():
+    import bioimageio.workflows
+    from bioimageio.workflows.operators._run import _iterate_workflow_steps_impl
+
+    def step(op, outputs=None, **options):
+        return SimpleNamespace(op=op, id="step", inputs=missing, options=options, outputs=outputs)
+
+    workflow = SimpleNamespace(
+        inputs=[SimpleNamespace(name="raw")],
+        options=[],
+        steps=[
+            step("scale_linear", gain=2.0, offset=-1.0),
+            step("binarize", threshold=0.2),
+            step("cast", outputs=["mask"], dtype="uint8"),
+        ],
+    )
+    raw = np.random.rand(300, 400).astype("float32")
+    expected = ((raw * 2 - 1) > 0.2).astype("uint8")
+    for ipt in (raw, xr.DataArray(da.from_array(raw, chunks=100), dims=("y", "x"))):
+        states = list(
+            _iterate_workflow_steps_impl(workflow, bioimageio.workflows, test_steps=False, inputs=[ipt], options={})
+        )
+        assert len(states) == 1  # all steps fused
+        (mask,) = states[-1].outputs
+        assert mask.dtype == np.uint8
+        assert_array_equal(np.asarray(mask), expected)
+        assert_array_equal(raw, ipt)  # workflow inputs are not overwritten
+
+
+def test_elementwise_op_positional_options():
+    from bioimageio.workflows.operators import binarize, scale_linear
+
+    tensor = np.arange(4.0)
+    assert_array_equal(binarize(tensor, 1.5), binarize(tensor, threshold=1.5))
+    assert_array_equal(scale_linear(tensor, 2.0, 1.0), tensor * 2 + 1)
+    assert_array_equal(scale_linear(tensor, 2.0, offset=1.0), tensor * 2 + 1)
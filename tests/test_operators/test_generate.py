@@ -0,0 +1,40 @@
+import dask.array as da
+import numpy as np
+
+
+def test_generate_random_uniform_tensor_chunked(tmp_path):
+    from bioimageio.workflows.operators import generate_random_uniform_tensor
+
+    kwargs = dict(shape=[50, 70], axes="yx", low=-1, high=3, seed=42, chunks=(20, 30), dtype="float32")
+    tensor = generate_random_uniform_tensor(**kwargs)
+    assert isinstance(tensor.data, da.Array)
+    assert tensor.dtype == np.float32
+    values = tensor.values
+    assert values.min() >= -1 and values.max() < 3
+    np.testing.assert_array_equal(values, generate_random_uniform_tensor(**kwargs).values)  # reproducible
+    assert not np.array_equal(values[:20, :30], values[20:40, :30])  # independent chunk streams
+
+    memmapped = generate_random_uniform_tensor(**kwargs, output_path=tmp_path / "random.npy")
+    assert isinstance(memmapped.data, np.memmap)
+    np.testing.assert_array_equal(memmapped.values, values)
+
+
+def test_generate_random_uniform_tensor_excludes_high():
+    from bioimageio.workflows.operators._generate import _uniform
+
+    class MaxRng:
+        def random(self, shape, dtype):
+            return np.full(shape, np.nextafter(np.float32(1), np.float32(0)), dtype=dtype)
+
+    for dtype in ("float32", "float64"):
+        assert _uniform(MaxRng(), (2,), 1, 2, dtype).max() < 2
+
+
+def test_generate_random_uniform_tensor_uses_global_seed():
+    from bioimageio.workflows.operators import generate_random_uniform_tensor
+
+    for chunks in (None, (2, 3)):
+        np.random.seed(0)
+        first = generate_random_uniform_tensor([4, 6], "yx", chunks=chunks).values
+        np.random.seed(0)
+        np.testing.assert_array_equal(generate_random_uniform_tensor([4, 6], "yx", chunks=chunks).values, first)
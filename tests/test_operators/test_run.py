@@ -0,0 +1,98 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from marshmallow import missing
+from numpy.testing import assert_array_equal
+
+
+def test_compiled_workflow_plan():
+    import bioimageio.workflows
+    from bioimageio.workflows.operators._run import _Slot, _compile_workflow
+
+    def step(op, inputs=missing, outputs=None, id="step", **options):
+        return SimpleNamespace(op=op, id=id, inputs=inputs, options=options, outputs=outputs)
+
+    tensor = dict(
+        type="tensor", axes=[SimpleNamespace(name="y", type="space"), SimpleNamespace(name="x", type="space")]
+    )
+    workflow = SimpleNamespace(
+        id="bioimageio/plan_test",
+        inputs=[SimpleNamespace(name="raw")],
+        options=[SimpleNamespace(name="gain", default=2.0), SimpleNamespace(name="threshold", default=0.5)],
+        outputs=[SimpleNamespace(name="mask", **tensor), SimpleNamespace(name="scaled", **tensor)],
+        steps=[
+            step("scale_linear", gain="${{ self.options.gain }}", outputs=["scaled"], id="scale"),
+            step("binarize", threshold="${{ self.options.threshold }}"),
+            step("cast", dtype="uint8", outputs=["mask"], id="binarize"),
+            step("select_outputs", inputs=["${{ binarize.outputs.mask }}", "${{ scale.outputs.scaled }}"]),
+        ],
+    )
+    plan = _compile_workflow(workflow, bioimageio.workflows, test_steps=False)
+    assert len(plan.steps) == 3  # binarize and cast are fused
+    assert plan.steps[0].options[0] == (("gain", _Slot(1)),)
+    assert plan.steps[2].inputs == (_Slot(4), _Slot(3))
+    with pytest.raises(Exception):
+        plan.steps = ()  # immutable
+
+    for gain in (2.0, 3.0):  # the same plan runs repeatedly with new inputs and options
+        raw = np.random.rand(30, 40)
+        states = list(plan.iterate([raw], dict(gain=gain)))
+        assert states[-1].named_outputs["scale.outputs.scaled"] is states[1].inputs[0]
+        assert_array_equal(states[1].outputs[0], (raw * gain > 0.5).astype("uint8"))
+        outputs = plan.run({"raw": raw}, dict(gain=gain))
+        assert list(outputs) == ["mask", "scaled"]
+        assert outputs["mask"].dims == ("y", "x")
+        assert_array_equal(outputs["mask"], states[1].outputs[0])
+
+    with pytest.raises(ValueError):
+        list(plan.iterate([raw], dict(unknown=1)))
+
+    with pytest.raises(ValueError):
+        _compile_workflow(
+            SimpleNamespace(inputs=[], options=[], steps=[step("binarize", threshold="${{ self.options.t }}")]),
+            bioimageio.workflows,
+            test_steps=False,
+        )
+
+
+def test_async_ops_share_one_event_loop():
+    import asyncio
+    import gc
+    import time
+    from types import ModuleType
+
+    from bioimageio.workflows.operators._run import _compile_workflow
+
+    loops = []
+
+    async def add_one(tensor):
+        loops.append(asyncio.get_running_loop())
+        return tensor + 1
+
+    workflows = ModuleType("workflows")
+    workflows.add_one = add_one
+    workflow = SimpleNamespace(
+        inputs=[SimpleNamespace(name="raw")],
+        options=[],
+        steps=[SimpleNamespace(op="add_one", id="step", inputs=missing, options={}, outputs=None) for _ in range(2)],
+    )
+    plan = _compile_workflow(workflow, workflows, test_steps=False)
+
+    async def run_in_running_loop():
+        return list(plan.iterate([np.zeros(3)]))[-1].outputs[0]
+
+    assert_array_equal(list(plan.iterate([np.zeros(3)]))[-1].outputs[0], 2)
+    assert_array_equal(asyncio.run(run_in_running_loop()), 2)
+    assert len(loops) == 4
+    assert all(loop is loops[0] for loop in loops)
+
+    del plan
+    gc.collect()
+    for _ in range(100):
+        if loops[0].is_closed():
+            break
+
+        time.sleep(0.01)
+
+    assert loops[0].is_closed()
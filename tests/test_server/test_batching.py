@@ -0,0 +1,74 @@
+import asyncio
+import collections
+from typing import OrderedDict, Sequence
+
+import numpy as np
+import xarray as xr
+from numpy.testing import assert_array_equal
+
+
+def test_micro_batcher():
+    from bioimageio.workflows.server._batching import MicroBatcher, is_batchable
+
+    calls = []
+
+    async def add(tensors: Sequence[xr.DataArray], value: float = 1.0) -> OrderedDict[str, xr.DataArray]:
+        calls.append(tensors[0].sizes["b"])
+        return collections.OrderedDict(output=tensors[0] + value)
+
+    assert is_batchable(add)
+    batcher = MicroBatcher(add, window=0.05)
+    tensors = [xr.DataArray(np.full((1, 4), i, dtype=float), dims=("b", "x")) for i in range(3)]
+
+    async def run():
+        return await asyncio.gather(
+            *[batcher([t]) for t in tensors], batcher([tensors[0]], value=2.0), batcher([tensors[0][:, :2]])
+        )
+
+    results = asyncio.run(run())
+    # one batch of 3 calls and one single call for each other option or shape
+    assert sorted(calls) == [1, 1, 3]
+    for i, t in enumerate(tensors):
+        assert_array_equal(results[i]["output"], t + 1)
+
+    assert_array_equal(results[3]["output"], tensors[0] + 2)
+    assert results[4]["output"].shape == (1, 2)
+
+
+def test_micro_batcher_retries_failed_batch_one_by_one():
+    from bioimageio.workflows.server._batching import MicroBatcher
+
+    calls = []
+
+    async def check_positive(tensors: Sequence[xr.DataArray]) -> OrderedDict[str, xr.DataArray]:
+        calls.append(tensors[0].sizes["b"])
+        if (tensors[0] < 0).any():
+            raise ValueError("negative values")
+
+        return collections.OrderedDict(output=tensors[0])
+
+    batcher = MicroBatcher(check_positive, window=0.05)
+    tensors = [xr.DataArray(np.full((1, 4), i, dtype=float), dims=("b", "x")) for i in (1, -1, 2)]
+
+    async def run(tensors):
+        return await asyncio.gather(*[batcher([t]) for t in tensors], return_exceptions=True)
+
+    results = asyncio.run(run(tensors))
+    assert calls == [3, 1, 1, 1]  # failed batch is retried call by call
+    assert_array_equal(results[0]["output"], tensors[0])
+    assert isinstance(results[1], ValueError)
+    assert_array_equal(results[2]["output"], tensors[2])
+
+    # later calls are batched again
+    calls.clear()
+    results = asyncio.run(run([tensors[0], tensors[2]]))
+    assert calls == [2]
+
+
+def test_is_batchable():
+    from bioimageio.workflows.server._batching import is_batchable
+
+    async def hello(msg: str) -> str:
+        return msg
+
+    assert not is_batchable(hello)
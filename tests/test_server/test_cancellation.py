@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+import dask.array as da
+import pytest
+import xarray as xr
+
+
+def test_cancellable_call_timeout():
+    from bioimageio.workflows.server._cancellation import CancellableCalls
+    from bioimageio.workflows.utils import WorkflowCancelledError
+
+    computed_chunks = []
+
+    def slow_chunk(block):
+        time.sleep(0.01)
+        computed_chunks.append(block.shape)
+        return block
+
+    async def slow_workflow() -> xr.DataArray:
+        return xr.DataArray(da.ones((1000,), chunks=1).map_blocks(slow_chunk), dims=("x",))
+
+    calls = CancellableCalls()
+    wrapped = calls.wrap(slow_workflow)
+
+    with pytest.raises(WorkflowCancelledError):
+        asyncio.run(wrapped(_bioimageio_call_id="test", _bioimageio_timeout=0.1))
+
+    assert 0 < len(computed_chunks) < 1000
+    assert not calls.tokens
+
+
+def test_cancel_call():
+    from bioimageio.workflows.server._cancellation import CancellableCalls
+    from bioimageio.workflows.utils import WorkflowCancelledError, raise_if_cancelled
+
+    calls = CancellableCalls()
+
+    async def workflow(steps: int) -> int:
+        for step in range(steps):
+            time.sleep(0.01)
+            raise_if_cancelled()
+
+        return steps
+
+    wrapped = calls.wrap(workflow)
+
+    async def run():
+        assert await wrapped(1, _bioimageio_call_id="fast") == 1
+        call = asyncio.ensure_future(wrapped(1000, _bioimageio_call_id="slow"))
+        await asyncio.sleep(0.05)
+        assert calls.cancel_call("slow")
+        await call
+
+    with pytest.raises(WorkflowCancelledError):
+        asyncio.run(run())
+
+
+def test_progress_forwarded_to_client():
+    from bioimageio.workflows.server._cancellation import CancellableCalls
+    from bioimageio.workflows.utils import ProgressTracker
+
+    async def workflow(steps: int) -> xr.DataArray:
+        progress = ProgressTracker("steps", total=steps, min_interval=0)
+        for _ in range(steps):
+            progress.update()
+
+        return xr.DataArray(da.ones((8,), chunks=2), dims=("x",))
+
+    reports = []
+
+    async def run():
+        ret = await CancellableCalls().wrap(workflow)(3, _bioimageio_progress_callback=reports.append)
+        await asyncio.sleep(0)  # progress reports are sent by the event loop
+        return ret
+
+    out = asyncio.run(run())
+    assert out.shape == (8,)
+    steps = [r for r in reports if r["description"] == "steps"]
+    assert [r["done"] for r in steps] == [1, 2, 3]
+    assert reports[-1]["description"] == "tasks" and reports[-1]["done"] == reports[-1]["total"]
@@ -0,0 +1,40 @@
+import inspect
+from pathlib import Path
+
+import dask.array as da
+import pytest
+import xarray as xr
+
+
+def test_remote_submodule_proxies():
+    from bioimageio.workflows.server import RemoteSubmodule
+
+    remote = RemoteSubmodule("default")
+    assert "hello" in remote.__all__
+    sig = inspect.signature(remote.hello)
+    assert list(sig.parameters) == ["msg", "tensor"]
+    assert sig.parameters["msg"].default == "Hello!"
+    assert remote.hello.__doc__ == "dummy workflow printing msg"
+
+    tensor = xr.DataArray(da.ones((2, 3), chunks=1), dims=("b", "x"))
+    args, kwargs = remote._serialize_arguments("hello", (Path("msg"),), dict(tensor=tensor))
+    assert not kwargs
+    assert args[0] == "msg"  # pathlike argument sent as string
+    assert not isinstance(args[1].data, da.Array)  # lazy tensor computed before sending
+    xr.testing.assert_equal(args[1], tensor)
+
+    with pytest.raises(TypeError):
+        remote._serialize_arguments("hello", (), dict(unknown=1))
+
+
+def test_versioned_remote_submodule_does_not_bind_arguments():
+    from bioimageio.workflows.server import RemoteSubmodule
+
+    remote = RemoteSubmodule("default", version="99.0.0")  # workflow functions may differ from this version's
+    assert "hello" in remote.__all__
+    tensor = xr.DataArray(da.ones((2, 3), chunks=1), dims=("b", "x"))
+    args, kwargs = remote._serialize_arguments("hello", (Path("msg"),), dict(image=tensor, new_option=1))
+    assert args == ("msg",)
+    assert kwargs["new_option"] == 1  # unknown to this version's manifest
+    assert not isinstance(kwargs["image"].data, da.Array)  # lazy tensors are computed by value
+    xr.testing.assert_equal(kwargs["image"], tensor)
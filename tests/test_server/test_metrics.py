@@ -0,0 +1,37 @@
+import asyncio
+
+import pytest
+
+
+def test_service_metrics():
+    from bioimageio.workflows.server._metrics import ServiceMetrics
+
+    metrics = ServiceMetrics("test-service")
+
+    async def ok(x: int) -> int:
+        return x
+
+    async def fail():
+        raise ValueError("fail")
+
+    instrumented_ok = metrics.instrument("ok", ok)
+    instrumented_fail = metrics.instrument("fail", fail)
+
+    async def run():
+        assert await instrumented_ok(1) == 1
+        assert await instrumented_ok(2) == 2
+        with pytest.raises(ValueError):
+            await instrumented_fail()
+
+    asyncio.run(run())
+    m = metrics.get_metrics()
+    assert m["functions"]["ok"]["requests"] == 2
+    assert m["functions"]["ok"]["errors"] == 0
+    assert m["functions"]["ok"]["in_flight"] == 0
+    assert m["functions"]["ok"]["latency_seconds"]["buckets"]["inf"] == 2
+    assert m["functions"]["fail"]["errors"] == 1
+
+    prometheus = metrics.get_metrics(format="prometheus")
+    assert 'bioimageio_workflow_requests_total{service="test-service",function="ok"} 2' in prometheus
+    assert "# TYPE bioimageio_workflow_request_duration_seconds histogram" in prometheus
+    assert 'le="+Inf"' in prometheus
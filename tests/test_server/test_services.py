@@ -0,0 +1,78 @@
+import asyncio
+from types import SimpleNamespace
+from typing import List, Sequence
+
+import numpy as np
+import xarray as xr
+
+
+class DummyServer:
+    def __init__(self):
+        self.config = SimpleNamespace(workspace="public")
+        self.services = {}
+
+    async def register_service(self, config):
+        self.services[config["id"]] = config
+
+
+def test_register_submodule_service_launcher(monkeypatch):
+    from bioimageio.workflows.server import _services
+    from bioimageio.workflows.server.env_vars import START_SUBMODULE_SERVICE_NAME
+
+    server = DummyServer()
+
+    async def get_server(env_name="default"):
+        return server
+
+    monkeypatch.setattr(_services, "get_server", get_server)
+    asyncio.run(_services.register_submodule_service_launcher())
+    assert list(server.services) == [START_SUBMODULE_SERVICE_NAME]
+
+
+def test_register_submodule_service_reports_queue_depth(monkeypatch):
+    from bioimageio.workflows.envs.default import _inference
+    from bioimageio.workflows.server import _services
+    from bioimageio.workflows.server.env_vars import get_env_service_name
+
+    server = DummyServer()
+
+    async def get_server(env_name="default"):
+        return server
+
+    async def inference_with_dask(model_rdf: str, tensors: Sequence[xr.DataArray]) -> List[xr.DataArray]:
+        return list(tensors)
+
+    monkeypatch.setattr(_services, "get_server", get_server)
+    monkeypatch.setattr(_inference, "inference_with_dask", inference_with_dask)
+
+    async def run():
+        await _services.register_submodule_service("default", batch_window=0.2)
+        service = server.services[get_env_service_name("default")]
+        call = asyncio.ensure_future(
+            service["inference_with_dask"]("model", [xr.DataArray(np.zeros((1, 4)), dims=("b", "x"))])
+        )
+        await asyncio.sleep(0.05)
+        assert service["get_metrics"]()["functions"]["inference_with_dask"]["queue_depth"] == 1
+        await call
+        assert service["get_metrics"]()["functions"]["inference_with_dask"]["queue_depth"] == 0
+
+    asyncio.run(run())
+
+
+def test_launcher_passes_service_id(monkeypatch):
+    from bioimageio.workflows.server import _services
+    from bioimageio.workflows.server.env_vars import get_env_service_name
+
+    cmds = []
+
+    async def create_subprocess_shell(cmd):
+        cmds.append(cmd)
+        return SimpleNamespace(pid=0, returncode=None)
+
+    monkeypatch.setattr(_services, "ensure_conda_env_exists", lambda conda_env_name, version: "python")
+    monkeypatch.setattr(_services.asyncio, "create_subprocess_shell", create_subprocess_shell)
+    launcher = _services.SubmoduleServiceLauncher(DummyServer())
+    asyncio.run(launcher.start_submodule_service("default", "0.1.0"))
+    assert cmds == [
+        f"python -m bioimageio.workflows.server start-submodule-service default --service-id {get_env_service_name('default', '0.1.0')}"
+    ]
@@ -0,0 +1,93 @@
+import asyncio
+import sys
+
+import pytest
+
+
+def test_ensure_conda_env_exists_is_cached(tmp_path, monkeypatch):
+    from bioimageio.workflows.server import _utils
+
+    monkeypatch.setattr(_utils, "CONDA_ENV_REGISTRY_PATH", tmp_path / "registry.json")
+    monkeypatch.setattr(_utils, "_conda_env_registry", {})
+    resolved = []
+
+    def resolve(conda_env_name):
+        resolved.append(conda_env_name)
+        return sys.executable
+
+    monkeypatch.setattr(_utils, "_resolve_conda_env_python", resolve)
+    assert _utils.ensure_conda_env_exists("bioimageio_wf_env_default") == sys.executable
+    assert _utils.ensure_conda_env_exists("bioimageio_wf_env_default") == sys.executable
+    assert resolved == ["bioimageio_wf_env_default"]
+
+    # persisted registry is used by other processes
+    monkeypatch.setattr(_utils, "_conda_env_registry", {})
+    assert _utils.ensure_conda_env_exists("bioimageio_wf_env_default") == sys.executable
+    assert resolved == ["bioimageio_wf_env_default"]
+
+
+def test_get_server_reuses_connection(monkeypatch):
+    from bioimageio.workflows.server import _utils
+
+    connected = []
+
+    class DummyServer:
+        def register_codec(self, codec):
+            pass
+
+        async def disconnect(self):
+            pass
+
+    async def connect_to_server(config):
+        connected.append(config["server_url"])
+        return DummyServer()
+
+    monkeypatch.setattr(_utils, "connect_to_server", connect_to_server)
+    monkeypatch.setattr(_utils, "_server_connections", {})
+
+    async def run():
+        servers = await asyncio.gather(*[_utils.get_server("default") for _ in range(3)])
+        assert all(s is servers[0] for s in servers)
+        assert len(connected) == 1
+        reconnected = await _utils.get_server("default", reconnect=True)
+        assert reconnected is not servers[0]
+        assert len(connected) == 2
+
+    asyncio.run(run())
+
+
+def test_versioned_conda_env_file(tmp_path, monkeypatch):
+    from bioimageio.workflows.server import _utils
+    from bioimageio.workflows.server.env_vars import get_conda_env_name
+
+    monkeypatch.setattr(_utils, "VERSIONED_CONDA_ENV_FILES_PATH", tmp_path)
+    conda_env_name = get_conda_env_name("default", "0.1.0")
+    env_src = _utils.get_conda_env_file(conda_env_name, "0.1.0").read_text()
+    assert f"name: {conda_env_name}" in env_src
+    assert "bioimageio.workflows==0.1.0" in env_src
+    assert _utils.WORKFLOWS_PIP_REQUIREMENT not in env_src
+
+
+def test_versioned_conda_env_file_of_env_submodule(tmp_path, monkeypatch):
+    from bioimageio.workflows.server import _utils
+    from bioimageio.workflows.server.env_vars import get_conda_env_name
+
+    monkeypatch.setattr(_utils, "VERSIONED_CONDA_ENV_FILES_PATH", tmp_path)
+    conda_env_name = get_conda_env_name("stardist", "0.1.0")
+    env_src = _utils.get_conda_env_file(conda_env_name, "0.1.0").read_text()
+    assert env_src.startswith(f"name: {conda_env_name}\n")
+    assert "- stardist" in env_src
+    assert "tensorflow" in env_src
+    assert "bioimageio.workflows==0.1.0" in env_src
+    assert _utils.WORKFLOWS_PIP_REQUIREMENT not in env_src
+
+
+def test_versioned_conda_env_file_requires_submodule_service_version(tmp_path, monkeypatch):
+    from bioimageio.workflows.server import _utils
+    from bioimageio.workflows.server.env_vars import get_conda_env_name
+
+    monkeypatch.setattr(_utils, "VERSIONED_CONDA_ENV_FILES_PATH", tmp_path)
+    with pytest.raises(ValueError, match="not supported"):
+        _utils.get_conda_env_file(get_conda_env_name("default", "0.0.9"), "0.0.9")
+
+    assert not list(tmp_path.iterdir())
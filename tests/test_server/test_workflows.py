@@ -0,0 +1,75 @@
+import asyncio
+from collections import OrderedDict
+
+import dask.array as da
+import numpy as np
+import xarray as xr
+
+
+def test_remote_workflow_runs_whole_workflow_in_service(monkeypatch):
+    from bioimageio.workflows.server import RemoteWorkflow, _client
+    from bioimageio.workflows.server._workflows import WorkflowRunner
+
+    compiled = []
+
+    class Plan:  # stand-in for a compiled workflow plan; all its steps run in the service process
+        def run(self, inputs, options):
+            assert isinstance(inputs[0].data, np.ndarray)  # lazy inputs are computed before upload
+            return OrderedDict(mask=inputs[0] > options["threshold"], mean=float(inputs[0].mean()))
+
+    def compile_workflow(workflow_rdf):
+        compiled.append(workflow_rdf)
+        return Plan()
+
+    runner = WorkflowRunner()
+    monkeypatch.setattr(runner, "_compile", compile_workflow)
+    calls = []
+
+    async def run_workflow_service(workflow_rdf, inputs, options, _bioimageio_call_id, _bioimageio_timeout):
+        calls.append(workflow_rdf)
+        return runner.run_workflow(workflow_rdf, inputs, options)
+
+    remote = _client.RemoteSubmodule("default", version="0.1.0")
+    assert remote.env_service_name == "bioimageio-wf-service-default-v0.1.0"
+    assert remote.conda_env_name == "bioimageio_wf_env_default_v0_1_0"
+    monkeypatch.setattr(_client, "get_remote_submodule", lambda env_name, version: remote)
+    workflow = RemoteWorkflow({"id": "bioimageio/threshold/0.0.1"}, ["mean", "mask"], version="0.1.0")
+
+    async def run():
+        remote.service_funcs = {"run_workflow": run_workflow_service}
+        remote._service_funcs_loop = asyncio.get_event_loop()
+        tensor = xr.DataArray(da.arange(4, chunks=2), dims=("x",))
+        return [await workflow(tensor, threshold=1) for _ in range(2)]
+
+    for mean, mask in asyncio.run(run()):
+        assert mean == 1.5
+        np.testing.assert_array_equal(mask, [False, False, True, True])
+
+    assert len(calls) == 2  # one call per workflow run
+    assert len(compiled) == 1  # compiled once per workflow RDF
+
+
+def test_workflow_runner_recompiles_changed_rdf(tmp_path, monkeypatch):
+    from bioimageio.workflows.server._workflows import WorkflowRunner
+    from bioimageio.workflows.utils import _rdf_cache
+
+    monkeypatch.setattr(_rdf_cache, "RDF_CACHE_PATH", tmp_path / "cache")
+    monkeypatch.setattr(_rdf_cache, "_memory_cache", {})
+    compiled = []
+    runner = WorkflowRunner()
+    monkeypatch.setattr(runner, "_compile", lambda workflow_rdf: compiled.append(workflow_rdf.name) or object())
+    rdf = """format_version: 0.2.3
+type: dataset
+name: {name}
+description: stand-in for a workflow RDF
+authors: [{{name: bioimage.io}}]
+cite: [{{text: BioImage.IO, url: "https://doi.org/10.1101/2022.06.07.495102"}}]
+license: MIT
+"""
+    rdf_path = tmp_path / "rdf.yaml"
+    rdf_path.write_text(rdf.format(name="first"))
+    plan = runner.get_plan(str(rdf_path))
+    assert runner.get_plan(str(rdf_path)) is plan
+    rdf_path.write_text(rdf.format(name="second"))  # edited RDF
+    assert runner.get_plan(str(rdf_path)) is not plan
+    assert compiled == ["first", "second"]
@@ -0,0 +1,37 @@
+import ast
+import inspect
+import json
+
+import pytest
+
+
+@pytest.mark.skipif(not hasattr(ast, "unparse"), reason="annotations are unparsed differently before python 3.9")
+@pytest.mark.parametrize("env_name", ["default", "stardist"])
+def test_env_manifest_is_up_to_date(env_name):
+    from bioimageio.workflows.utils._env_manifest import ENV_MANIFESTS, generate_env_manifest
+
+    with (ENV_MANIFESTS / f"{env_name}.json").open(encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    assert manifest == generate_env_manifest(env_name), "run 'python scripts/generate_env_manifests.py'"
+
+
+def test_default_env_manifest():
+    from bioimageio.workflows.envs.default import local
+    from bioimageio.workflows.server._batching import is_batchable
+    from bioimageio.workflows.utils import load_env_manifest
+
+    manifest = load_env_manifest("default")
+    assert set(manifest["functions"]) == {n for n, v in vars(local).items() if inspect.isfunction(v)}
+    for name, func_manifest in manifest["functions"].items():
+        func = getattr(local, name)
+        assert func_manifest["is_async"] == inspect.iscoroutinefunction(func)
+        assert func_manifest["batchable"] == is_batchable(func)
+        assert [p["name"] for p in func_manifest["parameters"]] == list(inspect.signature(func).parameters)
+
+    hello_params = {p["name"]: p for p in manifest["functions"]["hello"]["parameters"]}
+    assert hello_params["msg"]["default"] == "Hello!"
+    assert not hello_params["msg"]["tensor"]
+    assert hello_params["tensor"]["tensor"]
+    assert hello_params["tensor"]["type"] == "tensor"
+    assert hello_params["tensor"]["axes"][0] == {"type": "batch"}
@@ -0,0 +1,87 @@
+import dask.array as da
+import imageio
+import numpy as np
+import pytest
+from numpy.testing import assert_array_equal
+
+
+def test_load_tensors_concurrently(tmp_path):
+    from bioimageio.workflows.utils import load_tensors_concurrently
+
+    data = np.arange(4 * 5, dtype="uint8").reshape(4, 5)
+    np.save(tmp_path / "a.npy", data)
+    imageio.imwrite(tmp_path / "b.png", data)
+    tensors = load_tensors_concurrently([tmp_path / "a.npy", tmp_path / "b.png"], ["yx", "yx"])
+    assert isinstance(tensors[0].data, np.memmap)
+    for t in tensors:
+        assert t.dims == ("y", "x")
+        assert_array_equal(t, data)
+
+
+def test_load_tensor_from_url(monkeypatch):
+    from bioimageio.workflows.utils import _io
+
+    data = np.arange(6, dtype="uint8").reshape(2, 3)
+    read = []
+
+    def imread(uri):
+        read.append(uri)
+        return data
+
+    monkeypatch.setattr(_io, "imread", imread)
+    tensor = _io.load_tensor("https://example.com/data/image.npy", "yx")
+    assert read == ["https://example.com/data/image.npy"]
+    assert_array_equal(tensor, data)
+
+
+def test_load_tensor_lazy_tiff_and_zarr(tmp_path):
+    tifffile = pytest.importorskip("tifffile")
+    from bioimageio.workflows.utils import load_tensor
+
+    data = np.random.rand(2, 64, 64).astype("float32")
+    tifffile.imwrite(tmp_path / "a.tif", data, tile=(32, 32))
+    tensor = load_tensor(tmp_path / "a.tif", "cyx")
+    assert isinstance(tensor.data, da.Array)
+    assert_array_equal(tensor, data)
+
+    pytest.importorskip("zarr")
+    da.from_array(data, chunks=(1, 32, 32)).to_zarr(str(tmp_path / "a.zarr"))
+    tensor = load_tensor(tmp_path / "a.zarr", "cyx")
+    assert isinstance(tensor.data, da.Array)
+    assert_array_equal(tensor, data)
+    assert isinstance(load_tensor(tmp_path / "a.zarr", "cyx", lazy=False).data, np.ndarray)
+
+
+@pytest.mark.parametrize("extension", [".npy", ".tif", ".zarr"])
+def test_save_tensor_blockwise(tmp_path, extension):
+    if extension == ".tif":
+        pytest.importorskip("tifffile")
+    elif extension == ".zarr":
+        pytest.importorskip("zarr")
+
+    import xarray as xr
+
+    from bioimageio.workflows.utils import load_tensor, save_tensor
+
+    data = np.random.rand(2, 3, 100, 130).astype("float32")
+    tensor = xr.DataArray(da.from_array(data, chunks=(1, 2, 40, 50)), dims=tuple("bcyx"))
+    path = tmp_path / f"out{extension}"
+    save_tensor(path, tensor)
+    assert_array_equal(load_tensor(path, "bcyx", lazy=False), data)
+
+
+@pytest.mark.parametrize("codec", ["none", "zstd"])
+def test_save_tensor_zarr_codec_and_chunks(tmp_path, codec):
+    zarr = pytest.importorskip("zarr")
+    import xarray as xr
+
+    from bioimageio.workflows.utils import save_tensor
+
+    data = np.zeros((1, 64, 80), dtype="uint16")
+    data[0, 10:20, 30:50] = 7
+    path = tmp_path / "labels.zarr"
+    save_tensor(path, xr.DataArray(data, dims=tuple("byx")), codec=codec, compression_level=3, chunks=(1, 32, 40))
+    stored = zarr.open(str(path), mode="r")
+    assert stored.chunks == (1, 32, 40)
+    assert (stored.compressor is None) == (codec == "none")
+    assert_array_equal(stored[:], data)
@@ -0,0 +1,22 @@
+import dask.array as da
+import numpy as np
+
+
+def test_dask_progress_counts_tiles():
+    from bioimageio.workflows.utils import ProgressTracker, get_dask_progress_callback, progress_scope
+
+    infos = []
+    tiles = da.ones((64, 64), chunks=16).map_blocks(lambda b: b * 2, name="tiles-test")
+    with progress_scope(infos.append):
+        tracker = ProgressTracker("steps", total=2, min_interval=0)
+        tracker.update()
+        assert infos[-1].eta is not None and infos[-1].done == 1
+        callback = get_dask_progress_callback("tiles", key_prefixes=["tiles-"])
+        (tiles + 1).compute(scheduler="synchronous", optimize_graph=False, callbacks=[callback])
+
+    tile_infos = [info for info in infos if info.description == "tiles"]
+    assert tile_infos[-1].finished
+    assert tile_infos[-1].done == tile_infos[-1].total == 16
+    assert tile_infos[-1].elements == 64 * 64
+    assert tile_infos[-1].eta == 0
+    assert np.isfinite(tile_infos[-1].elements_per_second)
@@ -0,0 +1,74 @@
+import pytest
+from marshmallow import missing
+
+RDF = """format_version: 0.2.3
+type: dataset
+name: {name}
+description: dataset to test the RDF cache
+authors: [{{name: bioimage.io}}]
+cite: [{{text: BioImage.IO, url: "https://doi.org/10.1101/2022.06.07.495102"}}]
+license: MIT
+"""
+
+
+def test_load_cached_raw_resource_description(tmp_path, monkeypatch):
+    from bioimageio.workflows.utils import _rdf_cache, get_cache_stats, load_cached_raw_resource_description
+
+    monkeypatch.setattr(_rdf_cache, "RDF_CACHE_PATH", tmp_path / "cache")
+    monkeypatch.setattr(_rdf_cache, "RDF_CACHE_MAX_ENTRIES", 1)
+    monkeypatch.setattr(_rdf_cache, "_memory_cache", {})
+
+    def load(path):
+        hits = get_cache_stats().get("rdf", {}).get("hits", 0)
+        node = load_cached_raw_resource_description(path)
+        return node, get_cache_stats()["rdf"]["hits"] > hits
+
+    rdf_path = tmp_path / "rdf.yaml"
+    rdf_path.write_text(RDF.format(name="first"))
+    node, hit = load(rdf_path)
+    assert not hit and node.name == "first"
+
+    _rdf_cache._memory_cache.clear()  # e.g. a new process
+    node, hit = load(rdf_path)
+    assert hit and node.name == "first"
+    assert node.root_path == rdf_path.parent.resolve()
+    assert node.documentation is missing  # unset fields remain `missing` when rebuilt from the cache
+    node.name = "changed"  # each call gets its own copy
+    assert load(rdf_path)[0].name == "first"
+
+    rdf_path.write_text(RDF.format(name="second"))  # changed content invalidates the entry
+    node, hit = load(rdf_path)
+    assert not hit and node.name == "second"
+
+    other_path = tmp_path / "other.yaml"
+    other_path.write_text(RDF.format(name="other"))
+    load(other_path)
+    assert len(list((tmp_path / "cache").glob("*.json"))) == 1  # least recently used entry got evicted
+    with pytest.raises(Exception):
+        load_cached_raw_resource_description(tmp_path / "does_not_exist.yaml")
+
+
+def test_remote_rdf_is_fetched_once(tmp_path, monkeypatch):
+    from bioimageio.workflows.utils import _rdf_cache, load_cached_raw_resource_description
+
+    monkeypatch.setattr(_rdf_cache, "RDF_CACHE_PATH", tmp_path / "cache")
+    monkeypatch.setattr(_rdf_cache, "_memory_cache", {})
+    fetched = []
+
+    def fetch_remote(uri):
+        fetched.append(uri)
+        return RDF.format(name=f"fetch {len(fetched)}").encode()
+
+    monkeypatch.setattr(_rdf_cache, "_fetch_remote", fetch_remote)
+    uri = "https://example.com/rdfs/rdf.yaml"
+    node = load_cached_raw_resource_description(uri)
+    assert fetched == [uri]
+    assert node.name == "fetch 1"
+    assert str(node.root_path) == "https://example.com/rdfs"
+
+    _rdf_cache._memory_cache.clear()  # e.g. a new process
+    node = load_cached_raw_resource_description(uri)
+    assert fetched == [uri]
+    assert node.name == "fetch 1"
+    assert str(node.root_path) == "https://example.com/rdfs"
+    assert not list((tmp_path / "cache").glob("*.pickle"))
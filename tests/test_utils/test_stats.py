@@ -0,0 +1,43 @@
+import dask.array as da
+import numpy as np
+import pytest
+import xarray as xr
+
+
+def test_get_tensor_stats():
+    from bioimageio.workflows.utils import get_tensor_stats
+
+    data = np.random.rand(60, 70).astype("float32")
+    data[3, 4] = np.nan
+    stats = get_tensor_stats(
+        {"np": data, "dask": xr.DataArray(da.from_array(data, chunks=(25, 30)), dims=("y", "x"))},
+        percentiles=[50],
+    )
+    for s in stats.values():
+        assert s["nan_count"] == 1
+        assert s["count"] == data.size - 1
+        assert s["mean"] == pytest.approx(np.nanmean(data))
+        assert s["std"] == pytest.approx(np.nanstd(data))
+        assert s["min"] == np.nanmin(data)
+        assert s["max"] == np.nanmax(data)
+        assert s["p50"] == pytest.approx(np.nanpercentile(data, 50))
+
+
+def test_log_computes_lazy_tensors_once(caplog):
+    pytest.importorskip("bioimageio.spec.workflow")
+    import logging
+
+    from bioimageio.workflows.operators import log
+
+    computed = []
+
+    def block(x):
+        computed.append(x.shape)
+        return x
+
+    tensor = xr.DataArray(da.ones((10, 10), chunks=5).map_blocks(block, meta=np.ones(0)), dims=("y", "x"))
+    with caplog.at_level(logging.INFO):
+        assert log(1, a=tensor, b=tensor + 1, percentiles=[99]) == (1,)
+
+    assert len(computed) == 4
+    assert "a: (10, 10) mean: 1.0000 std: 0.0000 min: 1.0000 max: 1.0000 p99: 1.0000" in caplog.text
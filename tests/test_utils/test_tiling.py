@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from bioimageio.spec.model import raw_nodes
+
+
+def make_output(name="output", scale=(1, 1, 1, 1), offset=(0, 0, 0, 0), halo=(0, 0, 0, 0)):
+    return raw_nodes.OutputTensor(
+        name=name,
+        axes=list("bcyx"),
+        data_type="float32",
+        shape=raw_nodes.ImplicitOutputShape(reference_tensor="input", scale=list(scale), offset=list(offset)),
+        halo=list(halo),
+    )
+
+
+@pytest.fixture
+def ipt():
+    return raw_nodes.InputTensor(name="input", axes=list("bcyx"), data_type="float32", shape=[1, 1, 64, 64])
+
+
+def test_get_chunk_with_positive_offset(ipt):
+    from bioimageio.workflows.utils import get_chunk, get_output_rois
+
+    out = make_output(offset=(0, 0, 2, 3), halo=(0, 0, 4, 2))
+    tensor = np.empty((1, 1, 100, 100))
+    chunk, overlap, padding = get_chunk(dict(b=1, c=1, y=64, x=64), ipt, [out], tensor)
+    assert overlap == {0: 0, 1: 0, 2: 2, 3: 0}
+    assert chunk == dict(b=1, c=1, y=60, x=64)
+    assert padding == dict(b=(0, 0), c=(0, 0), y=(2, 2 + 16), x=(3, 3 + 22))
+
+    output_tile_roi, output_roi = get_output_rois(
+        out, input_overlaps={"input": overlap}, input_paddings={"input": padding}, ipt_by_name={"input": ipt}
+    )
+    assert output_tile_roi == [(0, 0), (0, 0), (4, 4), (3, 3)]
+    # 120 x 128 output blocks trimmed to the image plus offset: 104 x 106
+    assert output_roi == [(0, 0), (0, 0), (0, 16), (0, 22)]
+
+
+def test_get_chunk_with_fractional_scale_and_multiple_outputs(ipt):
+    from bioimageio.workflows.utils import get_chunk
+
+    outputs = [make_output("full", halo=(0, 0, 3, 3)), make_output("half", scale=(1, 1, 0.5, 0.25), halo=(0, 0, 2, 1))]
+    chunk, overlap, padding = get_chunk(dict(b=1, c=1, y=64, x=64), ipt, outputs, np.empty((1, 1, 100, 100)))
+    assert overlap == {0: 0, 1: 0, 2: 4, 3: 4}  # whole output pixels of 'half'
+    assert chunk == dict(b=1, c=1, y=56, x=56)
+    assert padding["y"] == (0, 12)
+
+    with pytest.raises(ValueError, match="multiple"):
+        get_chunk(dict(b=1, c=1, y=64, x=62), ipt, outputs, np.empty((1, 1, 100, 100)))
+
+
+def test_tile_grid():
+    from bioimageio.workflows.utils import get_tile_grid
+
+    # 2 x 80 x 64 padded input (with halo 4), 4 x 4 tiles of 28 x 24, output axes: x, y, b
+    grid = get_tile_grid((2, 88, 72), (1, 28, 24), (1, 20, 16), (2, 1, 0), (16, 20, 1), ((0, 14), (2, 10), (0, 0)))
+    assert (
+        get_tile_grid((2, 88, 72), (1, 28, 24), (1, 20, 16), (2, 1, 0), (16, 20, 1), ((0, 14), (2, 10), (0, 0))) is grid
+    )
+    assert grid.n_tiles == (2, 4, 4)
+    assert grid.blocks_shape == (4, 4, 2)
+    assert grid.output_chunks == ((16, 16, 16, 2), (18, 20, 20, 10), (1, 1))
+    assert grid.output_shape == (50, 68, 2)
+
+    tiles, input_slices, crops, output_slices = (
+        grid.tile_indices(),
+        grid.input_slices(),
+        grid.crops(),
+        grid.output_slices(),
+    )
+    for i, out_idx in enumerate(np.ndindex(*grid.blocks_shape)):
+        x, y, b = out_idx
+        assert tiles[i].tolist() == [b, y, x]
+        assert input_slices[i].tolist() == [[b, b + 1], [20 * y, 20 * y + 28], [16 * x, 16 * x + 24]]
+        assert crops[i, 1].tolist() == ([2, 20] if y == 0 else [0, 10] if y == 3 else [0, 20])
+        assert output_slices[i, 0].tolist() == [16 * x, 16 * x + (2 if x == 3 else 16)]
+
+
+def test_get_corrected_chunks():
+    from bioimageio.workflows.utils import get_corrected_chunks
+
+    chunks, _ = get_corrected_chunks({0: (10, 10, 10), 1: (5, 5)}, [30, 10], [(12, 9), (0, 0)])
+    assert chunks == [[8, 1], [5, 5]]
+    with pytest.raises(ValueError, match="Trimming too much"):
+        get_corrected_chunks({0: (10, 10)}, [20], [(12, 8)])